@@ -0,0 +1,82 @@
+# analytics.py
+# 강의 단위 출석 분석 엔진: 학생 x 주차 출석 행렬을 한 번에 읽고 열 단위로 계산
+from sqlalchemy.orm import Session
+import models
+
+ATTENDED = (1, 4)   # 출석, 공결
+LATE = 2
+ABSENT = 3
+APPROVED = 4
+LATE_PER_ABSENT = 3  # 3지각 = 1결석
+
+class AttendanceMatrix:
+    # rows: 수강생(수강신청 순), cols: 주차(week_number 순)
+    def __init__(self, students, sessions, status, proof):
+        self.students = students      # [(user_id, name)]
+        self.sessions = sessions      # [(session_id, week_number)]
+        self.status = status          # status[col][row] -> int (기록 없음 = 0)
+        self.proof = proof            # proof[col][row] -> bool (증빙 제출 여부)
+
+    @classmethod
+    def load(cls, db: Session, course_id: int):
+        sessions = db.query(models.ClassSession.id, models.ClassSession.week_number)\
+            .filter(models.ClassSession.course_id == course_id)\
+            .order_by(models.ClassSession.week_number, models.ClassSession.id).all()
+        students = db.query(models.User.id, models.User.name)\
+            .join(models.Enrollment, models.Enrollment.user_id == models.User.id)\
+            .filter(models.Enrollment.course_id == course_id)\
+            .order_by(models.Enrollment.id).all()
+        col_of = {sid: c for c, (sid, _) in enumerate(sessions)}
+        row_of = {uid: r for r, (uid, _) in enumerate(students)}
+        status = [[0] * len(students) for _ in sessions]
+        proof = [[False] * len(students) for _ in sessions]
+        if sessions and students:
+            cells = db.query(models.Attendance.session_id, models.Attendance.student_id,
+                             models.Attendance.status, models.Attendance.proof_file)\
+                .join(models.ClassSession, models.ClassSession.id == models.Attendance.session_id)\
+                .filter(models.ClassSession.course_id == course_id).all()
+            for sid, uid, st, pf in cells:
+                r = row_of.get(uid)
+                if r is None: continue  # 수강 취소한 학생의 기록은 제외
+                c = col_of[sid]
+                status[c][r] = st or 0
+                proof[c][r] = pf is not None
+        return cls([tuple(s) for s in students], [tuple(s) for s in sessions], status, proof)
+
+    def weekly_rates(self):
+        n = len(self.students)
+        if n == 0: return [0] * len(self.sessions)
+        return [round(sum(1 for st in col if st in ATTENDED) / n * 100, 1) for col in self.status]
+
+    def approval_rate(self):
+        requested = sum(sum(col) for col in self.proof)
+        approved = sum(col.count(APPROVED) for col in self.status)
+        return round(approved / requested * 100, 1) if requested > 0 else 0.0
+
+    def student_totals(self):
+        # 주차 순서대로 열을 훑으며 학생별 누계/연속지각을 동시에 갱신
+        n = len(self.students)
+        absent = [0] * n
+        late = [0] * n
+        streak = [0] * n
+        max_streak = [0] * n
+        for col in self.status:
+            absent = [a + (st == ABSENT) for a, st in zip(absent, col)]
+            late = [l + (st == LATE) for l, st in zip(late, col)]
+            streak = [s + 1 if st == LATE else 0 for s, st in zip(streak, col)]
+            max_streak = [max(m, s) for m, s in zip(max_streak, streak)]
+        return absent, late, max_streak
+
+    def risk_group(self):
+        absent, late, max_streak = self.student_totals()
+        result = []
+        for (uid, name), a, l, ms in zip(self.students, absent, late, max_streak):
+            converted = a + (l // LATE_PER_ABSENT)
+            result.append({"student_name": name, "total_absent": a, "total_late": l, "converted_absent": converted,
+                           "is_risk": (converted >= 3) or (ms >= 2)})
+        result.sort(key=lambda x: x['converted_absent'], reverse=True)
+        return result
+
+def stack_report(db: Session, course_id: int):
+    m = AttendanceMatrix.load(db, course_id)
+    return {"weekly_attendance": m.weekly_rates(), "official_approval_rate": m.approval_rate(), "risk_group": m.risk_group()}
@@ -0,0 +1,59 @@
+# archive_audit.py
+# 오래된 감사 로그를 audit_logs -> audit_logs_archive 로 옮겨서 현재 테이블(과 인덱스)을 최근 분량으로 유지
+# - 기준 시각 이전 행을 id 순으로 CHUNK 건씩 INSERT ... SELECT 후 DELETE (묶음마다 커밋, 중간에 멈춰도 다시 실행하면 이어서 진행)
+# - 보관분은 GET /admin/audit-logs?archived=true 로 같은 필터/페이지네이션으로 검색
+# 실행: DATABASE_URL=... python archive_audit.py --semester 2025-2   (해당 학기 개강일 이전 전부)
+#       DATABASE_URL=... python archive_audit.py --before 2025-03-01 [--dry-run]
+import argparse
+import sys
+from datetime import date, datetime, time
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+import models
+import semesters
+
+CHUNK = 5000
+
+def archive(db: Session, before: datetime, chunk=CHUNK):
+    L = models.AuditLog.__table__
+    cols = [c.name for c in L.columns]
+    moved = 0
+    while True:
+        ids = db.execute(select(L.c.id).where(L.c.created_at < before).order_by(L.c.id).limit(chunk)).scalars().all()
+        if not ids: break
+        db.execute(insert(models.AuditLogArchive.__table__).from_select(cols, select(*L.columns).where(L.c.id.in_(ids))))
+        db.execute(delete(L).where(L.c.id.in_(ids)))
+        db.commit()
+        moved += len(ids)
+    return moved
+
+def count_before(db: Session, before: datetime):
+    return db.execute(select(func.count()).select_from(models.AuditLog).where(models.AuditLog.created_at < before)).scalar()
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    parser = argparse.ArgumentParser()
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--before", type=date.fromisoformat, help="이 날짜(0시) 이전 기록을 보관 (YYYY-MM-DD)")
+    group.add_argument("--semester", help="이 학기 개강일 이전 기록을 보관 (예: 2025-2)")
+    parser.add_argument("--dry-run", action="store_true", help="옮길 건수만 출력")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.semester:
+            sem = semesters.get_semester(db, args.semester)
+            if sem is None:
+                print(f"❌ 등록되지 않은 학기: {args.semester}")
+                sys.exit(1)
+            cutoff = sem.start_date
+        else:
+            cutoff = args.before
+        before = datetime.combine(cutoff, time.min)
+        if args.dry_run:
+            print(f"📦 {before} 이전 감사 로그 {count_before(db, before)}건 보관 예정")
+        else:
+            print(f"✅ {before} 이전 감사 로그 {archive(db, before)}건 보관")
+    finally:
+        db.close()
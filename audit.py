@@ -0,0 +1,116 @@
+# audit.py
+# 감사 로그 비동기 배치 기록
+# - 요청 쪽은 큐에 넣기만 함 (DB 접근/커밋 없음, 큐가 가득 차도 기다리지 않음)
+# - 백그라운드 writer 가 짧은 시간창 단위로 모아서 multi-row INSERT
+# - 큐가 가득 찼거나 저장에 끝내 실패한 기록은 조용히 버리지 않고 print 로 남기고 지표에 집계
+# - 종료 시(lifespan) 큐에 남은 기록 저장, 종료 뒤에 들어온 기록(아직 처리 중이던 요청)은 writer 를 다시 띄우지 않고 바로 저장
+import queue
+import threading
+import time
+from sqlalchemy import insert
+import models
+
+QUEUE_MAX = 10000
+BATCH_MAX = 500
+FLUSH_INTERVAL = 0.2    # 초, 한 배치를 모으는 시간창
+MAX_RETRY = 3
+
+class AuditWriter:
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._queue = queue.Queue(maxsize=QUEUE_MAX)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._stopping = threading.Event()
+        self._metrics = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0, "max_depth": 0, "last_batch_ms": 0.0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items(): self._metrics[k] += v
+
+    # --- 접수 (요청 스레드/이벤트 루프 어디서든 호출) ---
+    def record(self, actor_id, target_type, target_id, action, details=""):
+        # created_at 은 넣지 않음: 다른 감사 로그(bulk_import 등)와 같은 DB 시각(NOW())을 써야 정렬/기간 검색/보관 기준이 맞음
+        #   (앱 컨테이너는 UTC, DB 는 Asia/Seoul), 저장 지연은 FLUSH_INTERVAL 정도
+        row = {"actor_id": actor_id, "target_type": target_type, "target_id": target_id,
+               "action": action, "details": details}
+        if self._stopping.is_set():
+            # stop() 이후: start() 가 종료 표시를 지워 drain 을 취소하지 않도록 호출한 스레드에서 바로 저장
+            self._count(enqueued=1)
+            self.flush([row])
+            return True
+        self.start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count(dropped=1)
+            print(f"감사 로그 큐 가득 참, DB 미기록: {row}")
+            return False
+        depth = self._queue.qsize()
+        with self._lock:
+            self._metrics["enqueued"] += 1
+            if depth > self._metrics["max_depth"]: self._metrics["max_depth"] = depth
+        return True
+
+    # --- writer ---
+    def start(self):
+        if self._writer is not None and self._writer.is_alive(): return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive(): return
+            self._stopping.clear()
+            self._writer = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._writer.start()
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            try: batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty: break
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch: self.flush(batch)
+
+    def flush(self, batch):
+        t0 = time.perf_counter()
+        db = self.session_factory()
+        try:
+            for attempt in range(MAX_RETRY):
+                try:
+                    db.execute(insert(models.AuditLog.__table__), batch)
+                    db.commit()
+                    break
+                except Exception as e:
+                    db.rollback()
+                    print(f"감사 로그 배치 저장 실패 ({attempt + 1}/{MAX_RETRY}): {e}")
+                    time.sleep(0.5 * (attempt + 1))
+            else:
+                self._count(failed=len(batch))
+                for row in batch: print(f"감사 로그 DB 미기록: {row}")
+                return
+        finally:
+            db.close()
+        with self._lock:
+            self._metrics["written"] += len(batch)
+            self._metrics["batches"] += 1
+            self._metrics["last_batch_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    # 종료 시 큐에 남은 기록을 모두 저장
+    def stop(self, timeout=10):
+        self._stopping.set()
+        if self._writer is not None: self._writer.join(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics, depth=self._queue.qsize(), capacity=QUEUE_MAX)
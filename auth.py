@@ -1,4 +1,8 @@
 # auth.py
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,22 +10,102 @@ from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from cache import TTLCache
 import models, database
 
 SECRET_KEY = "inoxde_service_secret_key_2025" # 배포 시에는 환경변수로 관리 권장
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24시간 유지
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# [NEW] bcrypt 비용(라운드)은 환경변수로 조정. 바뀌면 다음 로그인 때 새 비용으로 재해시
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False) 
 # auto_error=False: Swagger 외에 쿠키 인증도 허용하기 위함
 
+# [NEW] 인증 사용자 캐시: 요청마다 users 테이블을 조회하지 않도록 subject(email) 기준으로 보관
+# 토큰 폐기는 DB 의 users.token_version (토큰의 ver 클레임과 비교):
+#   권한/비밀번호를 바꾸면 버전이 올라가 이전 토큰은 모든 워커/재시작 후에도 거부됨
+#   다른 워커의 캐시에 반영되기까지는 최대 PRINCIPAL_TTL 초, 관리자 권한은 캐시 없이 매번 DB 에서 확인
+PRINCIPAL_TTL = 60
+PRINCIPAL_CACHE_SIZE = 10000
+principal_cache = TTLCache(ttl=PRINCIPAL_TTL, maxsize=PRINCIPAL_CACHE_SIZE)
+
+class Principal:
+    # 요청 처리에 필요한 사용자 필드만 담은 세션 비종속 객체 (ORM User 대신 캐시/공유)
+    def __init__(self, id, email, role, name=None, student_number=None, department_id=None, token_version=0):
+        self.id = id
+        self.email = email
+        self.role = role
+        self.name = name
+        self.student_number = student_number
+        self.department_id = department_id
+        self.token_version = token_version
+
+    @classmethod
+    def from_user(cls, user: models.User):
+        return cls(user.id, user.email, user.role, user.name, user.student_number, user.department_id, user.token_version or 0)
+
+# 이 워커의 캐시만 비움 (다른 워커는 token_version 과 PRINCIPAL_TTL 로 반영)
+def invalidate_user(*emails):
+    principal_cache.invalidate(*emails)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# 검증 + 필요 시 재해시: (일치 여부, 새 해시 또는 None)
+def verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# ==========================================
+# [NEW] bcrypt 전용 프로세스 풀
+# 로그인 한 번에 수백 ms 의 CPU 를 쓰므로 이벤트 루프/스레드풀 밖의 별도 프로세스에서 실행.
+# 워커 수(PASSWORD_WORKERS)와 대기 중 작업 수(PASSWORD_QUEUE)를 모두 제한해
+# 로그인이 몰려도 다른 엔드포인트가 쓸 CPU 를 남겨둠 (uvicorn 워커마다 풀이 하나씩 생김)
+# ==========================================
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_QUEUE = int(os.getenv("PASSWORD_QUEUE", str(PASSWORD_WORKERS * 8)))
+password_pool = None
+password_slots = None
+
+def start_password_pool():
+    global password_pool
+    if password_pool is None:
+        # lifespan 시작 시(출석 writer 등 스레드가 뜨기 전) 워커를 미리 fork 해둠
+        password_pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, mp_context=multiprocessing.get_context("fork"))
+        password_pool.submit(int).result()
+    return password_pool
+
+def stop_password_pool():
+    global password_pool
+    if password_pool is not None:
+        password_pool.shutdown(wait=True, cancel_futures=True)
+        password_pool = None
+
+async def run_password_task(fn, *args):
+    global password_slots
+    if password_slots is None: password_slots = asyncio.Semaphore(PASSWORD_QUEUE)
+    async with password_slots:
+        return await asyncio.get_running_loop().run_in_executor(start_password_pool(), fn, *args)
+
+async def verify_and_update_async(plain_password, hashed_password):
+    return await run_password_task(verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await run_password_task(get_password_hash, password)
+
+# 일괄 등록용 (동기): 워커 수의 2배씩 나눠 제출해서, 그 사이에 들어온 로그인 검증이 뒤로 밀리지 않게 함
+def hash_passwords(passwords):
+    pool = start_password_pool()
+    wave = PASSWORD_WORKERS * 2
+    hashes = []
+    for i in range(0, len(passwords), wave):
+        hashes += pool.map(get_password_hash, passwords[i:i + wave])
+    return hashes
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -30,11 +114,7 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 # [핵심 변경] 토큰을 쿠키 또는 헤더 어디서든 가져오는 함수
-def get_current_user(
-    request: Request, 
-    token: Optional[str] = Depends(oauth2_scheme), 
-    db: Session = Depends(database.get_db)
-):
+def extract_token(request: Request, token: Optional[str]):
     # 1. 헤더(Authorization: Bearer ...)에 없으면 쿠키(access_token) 확인
     if not token:
         token = request.cookies.get("access_token")
@@ -44,7 +124,9 @@ def get_current_user(
 
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="로그인이 필요합니다.")
+    return token
 
+def decode_token(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -52,9 +134,54 @@ def get_current_user(
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="토큰 오류")
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="유효하지 않은 토큰")
-    
+    return payload
+
+def load_user(db: Session, email: str):
     user = db.query(models.User).filter(models.User.email == email).first()
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="사용자를 찾을 수 없음")
-        
-    return user
\ No newline at end of file
+    return user
+
+def load_principal(db: Session, email: str, fresh: bool = False):
+    principal = None if fresh else principal_cache.get(email)
+    if principal is None:
+        principal = Principal.from_user(load_user(db, email))
+        principal_cache.set(email, principal)
+    return principal
+
+# 캐시된 사용자의 token_version 이 토큰의 ver 와 다르면 폐기된 토큰 (ver 가 없는 토큰은 0)
+def check_token_version(principal: Principal, payload: dict):
+    if payload.get("ver", 0) != principal.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="다시 로그인해주세요.")
+    return principal
+
+# 관리자는 캐시를 쓰지 않고 새로 읽음 (강등/삭제 즉시 반영), 어느 경우든 조회는 한 번
+def resolve_principal(db: Session, payload: dict):
+    principal = cached_principal(payload)
+    if principal is None: principal = check_token_version(load_principal(db, payload["sub"], fresh=True), payload)
+    return principal
+
+# 캐시에 있고 관리자가 아니면 DB 없이 확인, 아니면 None (호출한 쪽에서 resolve_principal)
+def cached_principal(payload: dict):
+    principal = principal_cache.get(payload["sub"])
+    if principal is None or principal.role == "ADMIN": return None
+    return check_token_version(principal, payload)
+
+def get_current_user(
+    request: Request, 
+    token: Optional[str] = Depends(oauth2_scheme), 
+    db: Session = Depends(database.get_db)
+):
+    payload = decode_token(extract_token(request, token))
+    return resolve_principal(db, payload)
+
+# [NEW] async 엔드포인트용 (database.get_async_db 세션 사용)
+async def get_current_user_async(
+    request: Request,
+    token: Optional[str] = Depends(oauth2_scheme),
+    db = Depends(database.get_async_db)
+):
+    payload = decode_token(extract_token(request, token))
+    principal = cached_principal(payload)
+    if principal is None: principal = await db.run_sync(resolve_principal, payload)
+    return principal
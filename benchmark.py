@@ -0,0 +1,253 @@
+# benchmark.py
+# 조회 경로 성능 비교 스크립트
+#   report  : 강의 리포트 기존(N+1) 경로 vs 집계/스트리밍 경로 (SQLite 메모리 DB)
+#             python benchmark.py
+#   suite   : seed.py 로 만든 데이터(--scale)에서 주요 API 를 앱 그대로(TestClient) 반복 호출
+#             cold = 캐시를 비운 뒤 호출, warm = 같은 요청 반복 (응답 캐시 적중) / 지연 p50·p95, 요청당 쿼리 수, 응답 크기
+#             결과는 JSON 으로 저장해서 커밋 사이 비교 (DATABASE_URL 이 없으면 임시 SQLite 파일)
+#             python benchmark.py suite --scale small --repeat 20 --json bench_<커밋>.json
+#   compare : 두 결과 비교 (p50 변화율, 쿼리 수 변화)
+#             python benchmark.py compare bench_old.json bench_new.json
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# suite 는 따로 만든 DB 를 쓰므로 database 모듈을 불러오기 전에 주소를 정함 (DATABASE_URL 이 있으면 그 DB 에 시드 추가)
+if __name__ == "__main__" and sys.argv[1:2] == ["suite"] and "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='bench_')}/bench.db"
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import models
+import reports
+
+WEEKS = 16
+
+def make_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+def seed(engine, n_students):
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "email": "prof@bench", "password": "x", "name": "교수", "role": "INSTRUCTOR"}])
+        conn.execute(insert(models.Course), [{"id": 1, "title": "벤치마크", "semester": "2025-2", "instructor_id": 1}])
+        start = datetime(2025, 9, 1, 9)
+        conn.execute(insert(models.ClassSession), [
+            {"id": w + 1, "course_id": 1, "week_number": w + 1, "session_date": start + timedelta(weeks=w)} for w in range(WEEKS)
+        ])
+        conn.execute(insert(models.User), [
+            {"id": i + 2, "email": f"s{i}@bench", "password": "x", "name": f"학생{i}", "student_number": f"B{i:06d}", "role": "STUDENT"}
+            for i in range(n_students)
+        ])
+        conn.execute(insert(models.Enrollment), [{"user_id": i + 2, "course_id": 1} for i in range(n_students)])
+        conn.execute(insert(models.Attendance), [
+            {"session_id": w + 1, "student_id": i + 2, "status": (1, 1, 1, 2, 3, 4)[(i + w) % 6]}
+            for i in range(n_students) for w in range(WEEKS)
+        ])
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self)
+
+    def __call__(self, *args):
+        self.count += 1
+
+# 기존(N+1) 강의 리포트 경로: 비교 기준용으로만 보존
+def legacy_course_report(db, course_id):
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    enrollments = db.query(models.Enrollment).filter(models.Enrollment.course_id == course_id).all()
+    total_sessions = db.query(models.ClassSession).filter(models.ClassSession.course_id == course_id).count()
+    report_list = []
+    for enrollment in enrollments:
+        student = db.query(models.User).filter(models.User.id == enrollment.user_id).first()
+        attended_count = db.query(models.Attendance).join(models.ClassSession).filter(models.ClassSession.course_id == course_id, models.Attendance.student_id == student.id, models.Attendance.status.in_([1, 4])).count()
+        rate = (attended_count / total_sessions * 100) if total_sessions > 0 else 0.0
+        report_list.append({"student_name": student.name, "total_sessions": total_sessions, "attended_count": attended_count, "attendance_rate": round(rate, 1)})
+    return {"course_title": course.title, "reports": report_list}
+
+def bulk_course_report(db, course_id):
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    total_sessions = db.query(models.ClassSession).filter(models.ClassSession.course_id == course_id).count()
+    return reports.build_course_report(db, course, total_sessions)
+
+def streamed_course_report(db, course_id):
+    Session = sessionmaker(bind=db.get_bind())
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    total_sessions = db.query(models.ClassSession).filter(models.ClassSession.course_id == course_id).count()
+    return "".join(reports.stream_course_report(Session, course_id, course.title, total_sessions))
+
+def measure(engine, fn):
+    counter = QueryCounter(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        t0 = time.perf_counter()
+        result = fn(db, 1)
+        elapsed = time.perf_counter() - t0
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", counter)
+    return elapsed, counter.count, result
+
+def bench_course_report(sizes=(50, 500, 5000)):
+    results = []
+    for n in sizes:
+        engine = make_engine()
+        seed(engine, n)
+        row = {"enrollments": n}
+        for label, fn in (("legacy", legacy_course_report), ("bulk", bulk_course_report), ("stream", streamed_course_report)):
+            elapsed, queries, _ = measure(engine, fn)
+            row[label] = {"ms": round(elapsed * 1000, 1), "queries": queries}
+        results.append(row)
+        engine.dispose()
+    return results
+
+# --- API 벤치마크 스위트 ---
+# (이름, 역할, 경로) - {cid}: 수강 인원이 가장 많은 강의, {sid}: 그 강의의 지난 주차
+SUITE = [
+    ("instructor_dashboard", "INSTRUCTOR", "/instructor/dashboard"),
+    ("instructor_sessions", "INSTRUCTOR", "/instructor/courses/{cid}/sessions"),
+    ("roster", "INSTRUCTOR", "/instructor/sessions/{sid}/attendances"),
+    ("stack_report", "INSTRUCTOR", "/instructor/courses/{cid}/stack_report"),
+    ("report", "INSTRUCTOR", "/courses/{cid}/report"),
+    ("report_csv", "INSTRUCTOR", "/courses/{cid}/report?stream=csv"),
+    ("student_dashboard", "STUDENT", "/student/dashboard"),
+    ("student_sessions", "STUDENT", "/student/courses/{cid}/sessions"),
+    ("admin_users", "ADMIN", "/admin/users?limit=50"),
+    ("admin_users_search", "ADMIN", "/admin/users?q=stu1&limit=50"),
+    ("admin_courses", "ADMIN", "/admin/courses?limit=50"),
+    ("admin_departments", "ADMIN", "/admin/departments"),
+    ("admin_course_students", "ADMIN", "/admin/courses/{cid}/students"),
+    ("admin_audit_logs", "ADMIN", "/admin/audit-logs?limit=50"),
+]
+
+def clear_caches():
+    # 응답/집계 캐시만 비움 (인증 캐시는 유지: 토큰 검증 비용은 측정 대상이 아님)
+    import http_cache, stats
+    for cache in (http_cache.bodies, http_cache.versions, reports.dashboard_cache, stats.stats_cache): cache.clear()
+
+def timings(values):
+    ms = sorted(v * 1000 for v in values)
+    return {"p50_ms": round(ms[len(ms) // 2], 2), "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 2),
+            "mean_ms": round(statistics.fmean(ms), 2)}
+
+def pick_targets(db):
+    from sqlalchemy import func, select
+    E, S = models.Enrollment, models.ClassSession
+    cid, size = db.execute(select(E.course_id, func.count()).group_by(E.course_id).order_by(func.count().desc()).limit(1)).one()
+    course = db.get(models.Course, cid)
+    sid = db.execute(select(S.id).where(S.course_id == cid, S.session_date < datetime.now(), S.is_holiday.is_(False))
+                     .order_by(S.week_number.desc()).limit(1)).scalar() or db.execute(select(S.id).where(S.course_id == cid).limit(1)).scalar()
+    student = db.execute(select(models.User.email).join(E, E.user_id == models.User.id).where(E.course_id == cid).limit(1)).scalar()
+    instructor = db.get(models.User, course.instructor_id).email
+    return {"cid": cid, "sid": sid, "course_size": size, "emails": {"INSTRUCTOR": instructor, "STUDENT": student, "ADMIN": "admin@bench"}}
+
+def bench_endpoints(scale="small", repeat=20, seed_value=7):
+    import database
+    import seed as seeding
+    directory = tempfile.mkdtemp(prefix="bench_")   # 증빙 파일 (작업 폴더의 uploads 를 건드리지 않음)
+    from fastapi.testclient import TestClient
+    import auth, main
+    client = TestClient(main.app)
+    with client:
+        db = database.SessionLocal()
+        try:
+            d, i, s, c = seeding.SCALES[scale]
+            seeded = seeding.generate(db, departments=d, instructors=i, students=s, courses=c, seed=seed_value,
+                                      as_of=datetime(2025, 12, 1), upload_dir=os.path.join(directory, "uploads"))
+            if not db.query(models.User).filter_by(email="admin@bench").first():
+                db.add(models.User(email="admin@bench", password="x", name="관리자", role="ADMIN"))
+                db.commit()
+            targets = pick_targets(db)
+        finally:
+            db.close()
+        headers = {role: {"Authorization": f"Bearer {auth.create_access_token({'sub': email, 'role': role})}"}
+                   for role, email in targets["emails"].items()}
+        counter = QueryCounter(database.engine)
+        results = []
+        for name, role, template in SUITE:
+            path = template.format(cid=targets["cid"], sid=targets["sid"])
+            row = {"name": name, "path": template}
+            for mode in ("cold", "warm"):
+                times, queries = [], []
+                client.get(path, headers=headers[role])   # 인증 캐시/커넥션 준비
+                for _ in range(repeat):
+                    if mode == "cold": clear_caches()
+                    before = counter.count
+                    t0 = time.perf_counter()
+                    r = client.get(path, headers=headers[role])
+                    times.append(time.perf_counter() - t0)
+                    queries.append(counter.count - before)
+                row[mode] = dict(timings(times), queries=round(statistics.fmean(queries), 1))
+            row.update(status=r.status_code, bytes=len(r.content))
+            results.append(row)
+        event.remove(database.engine, "before_cursor_execute", counter)
+    return {"meta": {"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"), "scale": scale,
+                     "repeat": repeat, "python": platform.python_version(), "database": database.engine.dialect.name,
+                     "seed": seeded, "course_size": targets["course_size"]},
+            "results": results}
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return None
+
+def compare(old, new):
+    before = {r["name"]: r for r in old["results"]}
+    rows = []
+    for r in new["results"]:
+        o = before.get(r["name"])
+        if o is None: continue
+        row = {"name": r["name"]}
+        for mode in ("cold", "warm"):
+            a, b = o[mode]["p50_ms"], r[mode]["p50_ms"]
+            row[mode] = {"p50_ms": [a, b], "change_pct": round((b - a) / a * 100, 1) if a else None,
+                         "queries": [o[mode]["queries"], r[mode]["queries"]]}
+        rows.append(row)
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenario", nargs="?", choices=["report", "suite", "compare"], default="report")
+    parser.add_argument("files", nargs="*", help="compare: 이전 결과, 새 결과")
+    parser.add_argument("--scale", default="small", help="seed.py 규모 (small/medium/large)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="suite 결과를 저장할 파일 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    if args.scenario == "suite":
+        out = bench_endpoints(args.scale, args.repeat, args.seed)
+        print(f"📊 API 스위트 ({args.scale}, 반복 {args.repeat}, 강의 인원 {out['meta']['course_size']}, 커밋 {out['meta']['commit']})", file=sys.stderr)
+        print(f"{'endpoint':<24} | {'cold p50':>9} {'p95':>8} {'q':>5} | {'warm p50':>9} {'p95':>8} {'q':>5} | {'bytes':>8}", file=sys.stderr)
+        for r in out["results"]:
+            print(f"{r['name']:<24} | {r['cold']['p50_ms']:>9} {r['cold']['p95_ms']:>8} {r['cold']['queries']:>5} | "
+                  f"{r['warm']['p50_ms']:>9} {r['warm']['p95_ms']:>8} {r['warm']['queries']:>5} | {r['bytes']:>8}", file=sys.stderr)
+        data = json.dumps(out, ensure_ascii=False, indent=2)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f: f.write(data)
+        else:
+            print(data)
+    elif args.scenario == "compare":
+        if len(args.files) != 2: parser.error("compare 에는 결과 파일 두 개가 필요합니다")
+        old, new = (json.load(open(p, encoding="utf-8")) for p in args.files)
+        print(f"📊 {old['meta']['commit']} -> {new['meta']['commit']} (p50 ms, 쿼리 수)")
+        for r in compare(old, new):
+            cold, warm = r["cold"], r["warm"]
+            pct = lambda v: "-" if v is None else f"{v:+}%"
+            print(f"{r['name']:<24} | cold {cold['p50_ms'][0]:>8} -> {cold['p50_ms'][1]:>8} ({pct(cold['change_pct'])}) q {cold['queries'][0]} -> {cold['queries'][1]}"
+                  f" | warm {warm['p50_ms'][0]:>7} -> {warm['p50_ms'][1]:>7} ({pct(warm['change_pct'])})")
+    else:
+        print("📊 GET /courses/{id}/report : 기존 경로 vs 집계 경로")
+        print(f"{'수강인원':>8} | {'legacy ms':>10} {'q':>6} | {'bulk ms':>8} {'q':>3} | {'stream ms':>9} {'q':>3}")
+        for r in bench_course_report():
+            print(f"{r['enrollments']:>8} | {r['legacy']['ms']:>10} {r['legacy']['queries']:>6} | "
+                  f"{r['bulk']['ms']:>8} {r['bulk']['queries']:>3} | {r['stream']['ms']:>9} {r['stream']['queries']:>3}")
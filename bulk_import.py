@@ -0,0 +1,161 @@
+# bulk_import.py
+# 사용자/수강 CSV 일괄 등록
+# - 업로드 파일을 한 줄씩 읽으며 CHUNK 행 단위로 처리 (파일 전체를 메모리에 올리지 않음)
+# - 묶음마다 기존 이메일/학번/수강 여부를 IN 쿼리 한 번으로 확인하고 multi-row INSERT
+# - 비밀번호 해시는 auth 의 bcrypt 프로세스 풀에서 계산
+# - 묶음마다 커밋하고 감사 로그도 묶음당 1건 (같은 트랜잭션)
+# - 실패한 행은 건너뛰고 줄 번호와 사유를 보고
+#   인코딩은 앞부분으로 추정하므로, 뒤쪽에 다른 인코딩의 바이트가 섞인 행도 400 대신 그 행만 오류로 보고
+#   (앞 묶음은 이미 커밋된 상태라 파일 전체를 거부하면 일부만 들어간 채로 끝남)
+import codecs
+import csv
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import auth
+import models
+
+CHUNK = 1000
+ERROR_MAX = 1000   # 보고서에 담는 오류 행 수 상한 (error_count 는 전체)
+ROLES = ("ADMIN", "INSTRUCTOR", "STUDENT")
+
+# 사용자 CSV 헤더: email,name,password,role,student_number,department (학과명, 선택)
+# 수강 CSV 헤더:   student_number,course_id (course_id 는 쿼리 파라미터로 한 강의에 고정 가능)
+
+def detect_encoding(fileobj):
+    # 엑셀(한국어)에서 저장한 CSV 는 CP949 인 경우가 많음: 앞부분이 UTF-8 로 읽히지 않으면 CP949
+    head = fileobj.read(65536)
+    fileobj.seek(0)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp949"
+
+def is_decoded(value):
+    # surrogateescape 로 읽은 값에 디코딩하지 못한 바이트가 남아 있으면 False
+    try: value.encode("utf-8")
+    except UnicodeEncodeError: return False
+    return True
+
+def decode_lines(fileobj, encoding):
+    # 업로드 파일(SpooledTemporaryFile)은 파이썬 3.9 에서 readable() 이 없어 TextIOWrapper 로 감쌀 수 없음 -> 바이트 줄 단위로 디코딩
+    # (UTF-8/CP949 모두 다른 글자 안에 b"\n" 이 나오지 않으므로 줄 경계에서 잘라도 안전)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="surrogateescape")
+    for line in fileobj: yield decoder.decode(line)
+    tail = decoder.decode(b"", final=True)
+    if tail: yield tail
+
+def read_chunks(fileobj, report):
+    # 첫 줄은 헤더, 줄 번호는 헤더를 1행으로 센 CSV 기준
+    encoding = detect_encoding(fileobj)
+    reader = csv.DictReader(decode_lines(fileobj, encoding))
+    chunk = []
+    for row in reader:
+        if not all(is_decoded(v) for v in row.values() if isinstance(v, str)):
+            report.total += 1
+            report.error(reader.line_num, f"인코딩 오류 ({encoding} 로 읽을 수 없는 문자)")
+            continue
+        chunk.append((reader.line_num, {k.strip(): (v or "").strip() for k, v in row.items() if k}))
+        if len(chunk) >= CHUNK:
+            yield chunk
+            chunk = []
+    if chunk: yield chunk
+
+class Report:
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < ERROR_MAX: self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {"total": self.total, "created": self.created, "error_count": self.error_count, "errors": self.errors}
+
+def audit(db: Session, actor_id, target_type, action, lines, count):
+    db.add(models.AuditLog(actor_id=actor_id, target_type=target_type, action=action,
+                           details=f"{count}건 (CSV {lines[0]}~{lines[-1]}행)"))
+
+def commit_chunk(db: Session, report, model, rows, lines):
+    try:
+        db.execute(insert(model.__table__), rows)  # Core INSERT: None 이 섞여도 한 문장으로 묶음
+        db.commit()
+        report.created += len(rows)
+        return True
+    except IntegrityError:
+        # 확인 이후 다른 요청이 같은 값을 먼저 등록한 경우: 이 묶음만 실패 처리
+        db.rollback()
+        for line in lines: report.error(line, "동시 등록 충돌 (다시 시도해주세요)")
+        return False
+
+# --- 사용자 ---
+def import_users(db: Session, fileobj, actor_id):
+    report = Report()
+    departments = {name: did for did, name in db.query(models.Department.id, models.Department.name)}
+    seen_emails = set()
+    for chunk in read_chunks(fileobj, report):
+        report.total += len(chunk)
+        emails = [r.get("email", "") for _, r in chunk]
+        existing = {e for (e,) in db.query(models.User.email).filter(models.User.email.in_(emails))}
+        valid = []
+        for line, r in chunk:
+            email, role, dept = r.get("email", ""), r.get("role", "").upper(), r.get("department", "")
+            if not email or not r.get("name") or not r.get("password"): report.error(line, "email/name/password 필수")
+            elif role not in ROLES: report.error(line, f"알 수 없는 권한: {r.get('role', '')}")
+            elif dept and dept not in departments: report.error(line, f"없는 학과: {dept}")
+            elif email in existing or email in seen_emails: report.error(line, f"이미 존재하는 이메일: {email}")
+            else:
+                seen_emails.add(email)
+                valid.append((line, r, role, departments.get(dept)))
+        if not valid: continue
+        hashes = auth.hash_passwords([r["password"] for _, r, _, _ in valid])
+        rows = [{"email": r["email"], "password": h, "name": r["name"], "student_number": r.get("student_number") or None,
+                 "role": role, "department_id": dept_id} for (_, r, role, dept_id), h in zip(valid, hashes)]
+        lines = [line for line, _, _, _ in valid]
+        audit(db, actor_id, "USER", "BULK_CREATE", lines, len(rows))
+        commit_chunk(db, report, models.User, rows, lines)
+    return report.as_dict()
+
+# --- 수강 ---
+def import_enrollments(db: Session, fileobj, actor_id, course_id=None):
+    report = Report()
+    touched_users, touched_courses = set(), set()
+    seen = set()
+    for chunk in read_chunks(fileobj, report):
+        report.total += len(chunk)
+        numbers = {r.get("student_number", "") for _, r in chunk}
+        students = {}
+        for uid, number in db.query(models.User.id, models.User.student_number)\
+                .filter(models.User.student_number.in_(list(numbers)), models.User.role == "STUDENT"):
+            students[number] = None if number in students else uid   # 같은 학번이 여럿이면 모호함
+        course_ids = set()
+        for _, r in chunk:
+            cid = course_id or r.get("course_id", "")
+            if str(cid).isdigit(): course_ids.add(int(cid))
+        courses = {cid for (cid,) in db.query(models.Course.id).filter(models.Course.id.in_(list(course_ids)))}
+        uids = [uid for uid in students.values() if uid]
+        enrolled = set(db.query(models.Enrollment.user_id, models.Enrollment.course_id)
+                       .filter(models.Enrollment.user_id.in_(uids), models.Enrollment.course_id.in_(list(courses))).all())
+        valid = []
+        for line, r in chunk:
+            number, cid = r.get("student_number", ""), course_id or r.get("course_id", "")
+            cid = int(cid) if str(cid).isdigit() else None
+            if not number or cid is None: report.error(line, "student_number/course_id 필수")
+            elif cid not in courses: report.error(line, f"없는 강의: {cid}")
+            elif number not in students: report.error(line, f"해당 학번의 학생 없음: {number}")
+            elif students[number] is None: report.error(line, f"같은 학번의 학생이 여러 명: {number}")
+            elif (students[number], cid) in enrolled or (students[number], cid) in seen: report.error(line, f"이미 수강 중: {number}")
+            else:
+                seen.add((students[number], cid))
+                valid.append((line, students[number], cid))
+        if not valid: continue
+        lines = [line for line, _, _ in valid]
+        audit(db, actor_id, "ENROLL", "BULK_ADD", lines, len(valid))
+        if commit_chunk(db, report, models.Enrollment, [{"user_id": uid, "course_id": cid} for _, uid, cid in valid], lines):
+            touched_users.update(uid for _, uid, _ in valid)
+            touched_courses.update(cid for _, _, cid in valid)
+    return report.as_dict(), touched_users, touched_courses
@@ -0,0 +1,104 @@
+# cache.py
+# 프로세스 내 TTL + LRU 캐시 (조회 결과 재사용용)
+# + 캐시 무효화용 버전 토큰: LIVE_BACKEND=redis://... 이면 Redis 카운터(INCR)로 워커 간 공유, 아니면 워커별 메모리
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (만료시각, 값)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None: return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+# --- 버전 토큰 (키마다, 올리면 바뀜) ---
+class LocalVersions:
+    # 워커별 메모리: 올리지 않아도 ttl 뒤 새 토큰 (다른 워커의 변경이 그때 반영)
+    shared = False
+
+    def __init__(self, ttl: float, maxsize: int = 100000):
+        self._tokens = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    def get(self, keys):
+        out = []
+        for key in keys:
+            token = self._tokens.get(key)
+            if token is None:
+                token = uuid.uuid4().hex[:12]
+                self._tokens.set(key, token)
+            out.append(token)
+        return out
+
+    def bump(self, *keys):
+        for key in keys: self._tokens.set(key, uuid.uuid4().hex[:12])
+
+    def clear(self):
+        self._tokens.clear()
+
+class RedisVersions:
+    # 키마다 INCR 카운터 + 전체 세대(generation) 토큰: clear 는 세대를 바꿈
+    # 세대는 없으면 새로 만들므로 Redis 가 재시작돼 카운터가 0 으로 돌아가도 이전 토큰과 겹치지 않음
+    shared = True
+
+    def __init__(self, url, prefix):
+        import redis
+        self.r = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def key(self, key):
+        return self.prefix + (":".join(map(str, key)) if isinstance(key, tuple) else str(key))
+
+    def get(self, keys):
+        generation, *counts = self.r.mget([self.prefix + "generation"] + [self.key(k) for k in keys])
+        if generation is None:
+            self.r.set(self.prefix + "generation", uuid.uuid4().hex[:12], nx=True)
+            generation = self.r.get(self.prefix + "generation")
+        return [f"{generation}.{n or 0}" for n in counts]
+
+    def bump(self, *keys):
+        if not keys: return
+        pipe = self.r.pipeline(transaction=False)
+        for key in keys: pipe.incr(self.key(key))
+        pipe.execute()
+
+    def clear(self):
+        self.r.set(self.prefix + "generation", uuid.uuid4().hex[:12])
+
+_backend = os.getenv("LIVE_BACKEND", "memory")
+REDIS_URL = _backend if _backend.startswith(("redis://", "rediss://")) else None
+
+def make_versions(prefix, ttl, url=REDIS_URL):
+    return RedisVersions(url, prefix) if url else LocalVersions(ttl)
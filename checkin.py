@@ -0,0 +1,373 @@
+# checkin.py
+# 출석 체크 버스트 처리 파이프라인
+# - 열린 세션 정보(is_open, 방식, 인증번호)를 캐시해서 요청마다 세션을 다시 읽지 않음
+#   세션마다 버전 토큰(cache.make_versions, Redis 면 워커 간 공유)을 두고 상태가 바뀌면 올림 -> 다른 워커의 캐시도 바로 무효
+#   공유 저장소 없이 direct 모드(멀티 워커)면 다른 워커의 변경을 알 길이 없으므로 캐시하지 않고 매번 읽음
+# - 중복 여부는 세션별 '이미 출석한 학생' 집합으로 판단 (세션당 한 번만 DB에서 적재)
+#   LIVE_BACKEND=redis://... 이면 집합을 Redis 에 두어 워커 간 공유 (SADD 결과로 판단)
+# - 접수된 출석은 큐에 넣고, 백그라운드 writer 가 짧은 시간창 단위로 multi-row INSERT
+# - (session_id, student_id) 유니크 제약 + INSERT IGNORE, 실제로 들어간 행 수(rowcount)만 집계에 반영
+# CHECKIN_MODE=direct 이면 큐 없이 요청 스레드에서 바로 INSERT, 중복은 DB 유니크 키로 판단
+#   기본값: 워커가 여럿인데 공유 저장소(Redis)가 없으면 direct (워커별 집합으로는 중복을 못 막음), 아니면 queue
+# 저장에 끝내 실패한 배치(이미 "출석 완료"로 응답한 기록)는 DEADLETTER_PATH 에 JSON 한 줄씩 남기고 지표에 집계
+#   복구: python checkin.py replay [파일]
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from cache import TTLCache, make_versions
+import models
+
+RECORD_TTL = 5          # 초, 세션 정보 캐시 (닫힘/인증번호 변경은 forget 이 버전을 올려 모든 워커에 바로 반영)
+FLUSH_INTERVAL = 0.05   # 초, 한 배치를 모으는 시간창
+BATCH_MAX = 500
+QUEUE_MAX = 20000
+MAX_RETRY = 3
+SETTLE_TIMEOUT = 5      # 초, settle 이 저장 중인 배치의 커밋을 기다리는 최대 시간
+SEEN_TTL = 60 * 60 * 6  # 공유 집합 자동 소멸 (live 카운터와 같음)
+DEADLETTER_PATH = os.getenv("CHECKIN_DEADLETTER", "checkin_failed.jsonl")
+
+_backend = os.getenv("LIVE_BACKEND", "memory")
+REDIS_URL = _backend if _backend.startswith(("redis://", "rediss://")) else None
+
+def default_mode():
+    if os.getenv("CHECKIN_MODE"): return os.getenv("CHECKIN_MODE")
+    return "direct" if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 and REDIS_URL is None else "queue"
+
+# 들어간 행 수 반환 (이미 있던 기록은 무시되어 세지 않음)
+def insert_ignore(db: Session, rows, commit=True):
+    stmt = insert(models.Attendance.__table__)
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql": stmt = stmt.prefix_with("IGNORE")
+    elif dialect == "sqlite": stmt = stmt.prefix_with("OR IGNORE")
+    inserted = db.connection().execute(stmt, rows).rowcount
+    if commit: db.commit()
+    return inserted
+
+# 세션별로 나눠 INSERT (세션별 rowcount 가 정확하도록), 커밋은 한 번: {session_id: 들어간 행 수}
+def insert_batch(db: Session, rows):
+    by_session = {}
+    for r in rows: by_session.setdefault(r["session_id"], []).append(r)
+    inserted = {sid: insert_ignore(db, group, commit=False) for sid, group in by_session.items()}
+    db.commit()
+    return inserted
+
+# --- 출석한 학생 집합 ---
+class LocalSeen:
+    def __init__(self):
+        self._sets = {}   # session_id -> set(student_id)
+        self._lock = threading.Lock()
+
+    def loaded(self, session_id):
+        with self._lock: return session_id in self._sets
+
+    def load(self, session_id, ids):
+        with self._lock: self._sets[session_id] = self._sets.get(session_id, set()) | ids
+
+    # 새로 추가했으면 True, 이미 있었으면 False
+    def add(self, session_id, student_id):
+        with self._lock:
+            seen = self._sets.setdefault(session_id, set())
+            if student_id in seen: return False
+            seen.add(student_id)
+            return True
+
+    def mark(self, session_id, student_id):
+        with self._lock:
+            if session_id in self._sets: self._sets[session_id].add(student_id)
+
+    def discard(self, session_id, student_id):
+        with self._lock:
+            if session_id in self._sets: self._sets[session_id].discard(student_id)
+
+    def forget(self, session_id):
+        with self._lock: self._sets.pop(session_id, None)
+
+class RedisSeen:
+    # 빈 세션도 "적재됨"으로 보이도록 자리표시 멤버(-1)를 함께 넣음
+    ADD_IF_EXISTS = "if redis.call('EXISTS', KEYS[1]) == 1 then return redis.call('SADD', KEYS[1], ARGV[1]) end return nil"
+
+    def __init__(self, url):
+        import redis
+        self.r = redis.Redis.from_url(url, decode_responses=True)
+        self._mark = self.r.register_script(self.ADD_IF_EXISTS)
+
+    def key(self, session_id):
+        return f"checkin:seen:{session_id}"
+
+    def loaded(self, session_id):
+        return bool(self.r.exists(self.key(session_id)))
+
+    def load(self, session_id, ids):
+        k = self.key(session_id)
+        pipe = self.r.pipeline()
+        pipe.sadd(k, -1, *ids)
+        pipe.expire(k, SEEN_TTL)
+        pipe.execute()
+
+    def add(self, session_id, student_id):
+        return self.r.sadd(self.key(session_id), student_id) == 1
+
+    def mark(self, session_id, student_id):
+        self._mark(keys=[self.key(session_id)], args=[student_id])
+
+    def discard(self, session_id, student_id):
+        self.r.srem(self.key(session_id), student_id)
+
+    # 공유 집합은 DB 와 같은 내용을 유지하므로 세션 상태가 바뀌어도 비우지 않음 (SEEN_TTL 후 소멸)
+    def forget(self, session_id):
+        pass
+
+def make_seen(url=REDIS_URL):
+    return RedisSeen(url) if url else LocalSeen()
+
+class CheckinPipeline:
+    def __init__(self, session_factory, on_flush=None, mode=None, seen=None, versions=None, deadletter=DEADLETTER_PATH):
+        self.session_factory = session_factory
+        self.on_flush = on_flush          # on_flush(db, [(session_id, student_id)], {session_id: 들어간 행 수}) : 커밋 후 캐시 무효화/이벤트 발행
+        self.mode = mode or default_mode()
+        self.seen = seen or make_seen()
+        self.versions = versions or make_versions("checkin:record:", ttl=RECORD_TTL)
+        self.deadletter = deadletter
+        self._records = TTLCache(ttl=RECORD_TTL)   # session_id -> (버전 토큰, 세션 정보)
+        self._cache_records = self.versions.shared or self.mode != "direct"
+        self._pending = {}                # (session_id, student_id) -> row, 큐에 있고 writer 가 아직 가져가지 않음
+        self._inflight = {}               # writer 가 가져가 저장 중 (커밋 전)
+        self._lock = threading.Lock()
+        self._settled = threading.Condition(self._lock)
+        self._queue = queue.Queue(maxsize=QUEUE_MAX)
+        self._writer = None
+        self._stopping = threading.Event()
+        self._metrics = {"accepted": 0, "written": 0, "ignored": 0, "failed": 0, "batches": 0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items(): self._metrics[k] += v
+
+    # --- 세션 캐시 ---
+    def record(self, db: Session, session_id: int):
+        token, rec = self.cached_record(session_id)
+        return rec if rec is not None else self.load_record(db, session_id, token)
+
+    # (현재 버전 토큰, 캐시된 세션 정보 또는 None), DB 접근 없음
+    def cached_record(self, session_id: int):
+        if not self._cache_records: return None, None
+        token = self.versions.get([session_id])[0]
+        item = self._records.get(session_id)
+        return token, (item[1] if item is not None and item[0] == token else None)
+
+    # 읽기 전에 받은 토큰으로 저장: 읽는 도중 forget 되면 다음 조회에서 다시 읽음
+    def load_record(self, db: Session, session_id: int, token=None):
+        s = db.query(models.ClassSession.id, models.ClassSession.course_id, models.ClassSession.is_open,
+                     models.ClassSession.attendance_method, models.ClassSession.auth_code)\
+            .filter(models.ClassSession.id == session_id).first()
+        rec = {"course_id": s.course_id, "is_open": s.is_open, "method": s.attendance_method, "auth_code": s.auth_code} if s else {}
+        if self._cache_records: self._records.set(session_id, (token, rec))
+        return rec
+
+    def attended_ids(self, db: Session, session_id: int):
+        return {uid for (uid,) in db.query(models.Attendance.student_id).filter(models.Attendance.session_id == session_id)}
+
+    # 세션 상태가 바뀌면(열림/닫힘/인증번호) 버전을 올려 모든 워커의 캐시를 무효화
+    def forget(self, session_id: int):
+        self._records.invalidate(session_id)
+        self.versions.bump(session_id)
+        self.seen.forget(session_id)
+
+    # 다른 경로(수동 수정, 공결 신청 등)로 기록이 생긴 학생도 중복으로 처리
+    def mark_seen(self, session_id: int, student_id: int):
+        self.seen.mark(session_id, student_id)
+
+    # --- 접수 ---
+    # 기존 attend_student 와 같은 순서/문구로 검증
+    def check_in(self, db: Session, session_id: int, student_id: int, code: str = None):
+        rec = self.record(db, session_id)
+        if rec and rec["is_open"] and not self.seen.loaded(session_id): self.seen.load(session_id, self.attended_ids(db, session_id))
+        if self.accept(rec, session_id, student_id, code): return
+        inserted = self.insert_direct(db, session_id, student_id)
+        if self.on_flush: self.on_flush(db, [(session_id, student_id)], {session_id: inserted})
+
+    # DB_MODE=async: AsyncSession.run_sync 는 이벤트 루프 스레드에서 돌므로 DB 단계만 run_sync,
+    # 큐 대기/Redis 호출/on_flush 는 스레드풀에서 (워커의 다른 요청을 막지 않음)
+    async def check_in_async(self, db, session_id: int, student_id: int, code: str = None):
+        token, rec = await run_in_threadpool(self.cached_record, session_id) if self.versions.shared else self.cached_record(session_id)
+        if rec is None: rec = await db.run_sync(self.load_record, session_id, token)
+        if rec and rec["is_open"] and not await run_in_threadpool(self.seen.loaded, session_id):
+            ids = await db.run_sync(self.attended_ids, session_id)
+            await run_in_threadpool(self.seen.load, session_id, ids)
+        if await run_in_threadpool(self.accept, rec, session_id, student_id, code): return
+        inserted = await db.run_sync(self.insert_direct, session_id, student_id)
+        await run_in_threadpool(self.notify, [(session_id, student_id)], {session_id: inserted})
+
+    # 검증 + 중복 판단 후 큐에 넣음 (DB 접근 없음), False 면 호출한 쪽이 insert_direct 로 바로 저장
+    def accept(self, rec, session_id: int, student_id: int, code: str = None):
+        if not rec: raise HTTPException(status_code=404, detail="수업 없음")
+        if not rec["is_open"]: raise HTTPException(status_code=400, detail="출석체크 시간이 아닙니다.")
+        if rec["method"] == 'AUTH_CODE':
+            if not code: raise HTTPException(status_code=400, detail="인증번호 필요")
+            if code != rec["auth_code"]: raise HTTPException(status_code=400, detail="인증번호 불일치")
+        if not self.seen.add(session_id, student_id): raise HTTPException(status_code=400, detail="이미 출석하셨습니다.")
+        if self.mode == "direct" or self._stopping.is_set(): return False   # 종료 중에는 writer 를 다시 띄우지 않고 바로 저장
+        row = {"session_id": session_id, "student_id": student_id, "status": 1}
+        self.start()
+        with self._lock: self._pending[(session_id, student_id)] = row
+        try:
+            self._queue.put(row, timeout=1)
+        except queue.Full:
+            with self._lock: self._pending.pop((session_id, student_id), None)
+            self.seen.discard(session_id, student_id)
+            raise HTTPException(status_code=503, detail="출석 요청이 많습니다. 잠시 후 다시 시도해주세요.")
+        self._count(accepted=1)
+        return True
+
+    def insert_direct(self, db: Session, session_id: int, student_id: int):
+        inserted = insert_ignore(db, [{"session_id": session_id, "student_id": student_id, "status": 1}])
+        if not inserted: raise HTTPException(status_code=400, detail="이미 출석하셨습니다.")   # 다른 워커가 먼저 기록
+        self._count(accepted=1, written=1)
+        return inserted
+
+    # 비동기 경로용: 요청의 세션은 이벤트 루프 밖에서 쓸 수 없으므로 on_flush 에 따로 연 세션을 넘김
+    def notify(self, keys, inserted):
+        if not self.on_flush: return
+        db = self.session_factory()
+        try: self.on_flush(db, keys, inserted)
+        finally: db.close()
+
+    # 같은 학생의 기록을 읽고 쓰는 다른 경로(투표, 공결 신청, 수동 수정 등) 전에 호출:
+    # 아직 큐에 있는 출석은 여기서 먼저 저장하고, writer 가 저장 중이면 커밋될 때까지 기다림
+    # -> 호출한 쪽이 기록이 없다고 보고 따로 INSERT 해서 출석을 덮거나 충돌하지 않음
+    def settle(self, db: Session, session_id: int, student_id: int):
+        row = self.take(session_id, student_id)
+        if row is None: return
+        inserted = self.write_taken(db, row)
+        if self.on_flush: self.on_flush(db, [(session_id, student_id)], {session_id: inserted})
+
+    async def settle_async(self, db, session_id: int, student_id: int):
+        row = await run_in_threadpool(self.take, session_id, student_id)
+        if row is None: return
+        inserted = await db.run_sync(self.write_taken, row)
+        await run_in_threadpool(self.notify, [(session_id, student_id)], {session_id: inserted})
+
+    # 큐에 있는 행은 꺼내서 반환, 저장 중이면 커밋까지 (최대 SETTLE_TIMEOUT 초) 기다림 (DB 접근 없음)
+    def take(self, session_id: int, student_id: int):
+        key = (session_id, student_id)
+        with self._settled:
+            row = self._pending.pop(key, None)
+            if row is None: self._settled.wait_for(lambda: key not in self._inflight, timeout=SETTLE_TIMEOUT)
+            return row
+
+    def write_taken(self, db: Session, row):
+        inserted = insert_ignore(db, [row])
+        self._count(written=inserted, ignored=1 - inserted)
+        return inserted
+
+    # --- writer ---
+    def start(self):
+        if self._writer is not None and self._writer.is_alive(): return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive(): return
+            self._stopping.clear()
+            self._writer = threading.Thread(target=self._run, name="checkin-writer", daemon=True)
+            self._writer.start()
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while len(batch) < BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            try: batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty: break
+        return batch
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch: self.flush(batch)
+
+    def _release(self, keys):
+        with self._settled:
+            for key in keys: self._inflight.pop(key, None)
+            self._settled.notify_all()
+
+    def flush(self, batch):
+        # settle 로 이미 저장된 행은 건너뜀, 나머지는 커밋될 때까지 _inflight 에 둠
+        with self._lock:
+            rows = []
+            for r in batch:
+                key = (r["session_id"], r["student_id"])
+                if self._pending.pop(key, None) is not None:
+                    self._inflight[key] = r
+                    rows.append(r)
+        if not rows: return
+        keys = [(r["session_id"], r["student_id"]) for r in rows]
+        db = self.session_factory()
+        try:
+            inserted = None
+            for attempt in range(MAX_RETRY):
+                try:
+                    inserted = insert_batch(db, rows)
+                    break
+                except Exception as e:
+                    db.rollback()
+                    print(f"출석 배치 저장 실패 ({attempt + 1}/{MAX_RETRY}): {e}")
+                    time.sleep(0.5 * (attempt + 1))
+            self._release(keys)
+            if inserted is None:
+                self.give_up(rows)
+                return
+            written = sum(inserted.values())
+            self._count(written=written, ignored=len(rows) - written, batches=1)
+            if self.on_flush: self.on_flush(db, keys, inserted)
+        except Exception as e:
+            print(f"출석 배치 후처리 실패: {e}")
+        finally:
+            self._release(keys)
+            db.close()
+
+    # 이미 "출석 완료"로 응답한 기록이므로 버리지 않고 파일에 남김 (python checkin.py replay 로 재기록)
+    def give_up(self, rows):
+        self._count(failed=len(rows))
+        try:
+            with open(self.deadletter, "a", encoding="utf-8") as f:
+                for r in rows: f.write(json.dumps(r) + "\n")
+            print(f"출석 배치 {len(rows)}건 저장 포기 -> {self.deadletter}")
+        except OSError as e:
+            print(f"출석 배치 {len(rows)}건 저장 포기, 파일 기록도 실패 ({e}): {rows}")
+
+    # 종료 시 큐에 남은 출석을 모두 기록
+    def stop(self, timeout=10):
+        self._stopping.set()
+        if self._writer is not None: self._writer.join(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics, mode=self.mode, depth=self._queue.qsize(), in_flight=len(self._inflight))
+
+# 저장 포기 파일의 출석을 다시 기록 (이미 있는 기록은 무시), 끝나면 파일 이름에 .done 을 붙임
+def replay(session_factory, path=DEADLETTER_PATH):
+    if not os.path.exists(path): return 0
+    with open(path, encoding="utf-8") as f: rows = [json.loads(line) for line in f if line.strip()]
+    db = session_factory()
+    try: inserted = insert_batch(db, rows) if rows else {}
+    finally: db.close()
+    os.replace(path, f"{path}.{int(time.time())}.done")
+    return sum(inserted.values())
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "replay": sys.exit("사용법: python checkin.py replay [파일]")
+    from database import SessionLocal
+    path = sys.argv[2] if len(sys.argv) > 2 else DEADLETTER_PATH
+    print(f"출석 {replay(SessionLocal, path)}건 재기록 ({path})")
@@ -0,0 +1,147 @@
+# db_lifecycle.py
+# DB 연결 수명 관리
+# - 시작: lifespan 에서 백그라운드 스레드로 연결 확인(+ 개발 환경이면 테이블 생성), 실패하면 지수 백오프로 재시도
+#   lifespan 은 STARTUP_WAIT 초까지만 기다리고 서비스 시작 (import 시점에는 DB 에 접근하지 않음)
+#   재시도는 STARTUP_TIMEOUT 초가 상한, 넘으면 failed 로 표시 (무한 대기 없음)
+# - 준비 상태: GET /health/ready 가 시작 완료 + SELECT 1 성공일 때만 200, 아니면 503 (로드밸런서/헬스체크용)
+# - 풀 지표: 사용 중/여유/overflow/포화율 + 새 연결/끊긴 커넥션 교체(pre_ping) 횟수, 최대 동시 사용 수
+# DB_AUTO_CREATE=0 이면 시작 시 테이블을 만들지 않음 (운영: python migrate_indexes.py 로 배포 때 한 번)
+# 테이블 생성 시 이미 있는 테이블에 빠진 컬럼(모델에 새로 추가된 컬럼)도 ADD COLUMN
+import os
+import random
+import threading
+import time
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.pool import QueuePool
+
+STARTUP_WAIT = float(os.getenv("DB_STARTUP_WAIT", "15"))
+STARTUP_TIMEOUT = float(os.getenv("DB_STARTUP_TIMEOUT", "120"))
+AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "1") == "1"
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+
+# --- 풀 지표 ---
+class PoolMonitor:
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._counters = {"connects": 0, "checkouts": 0, "invalidated": 0, "max_checked_out": 0}
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, *args):
+        with self._lock: self._counters["connects"] += 1
+
+    def _on_checkout(self, *args):
+        pool = self.engine.pool
+        in_use = pool.checkedout() if isinstance(pool, QueuePool) else 0
+        with self._lock:
+            self._counters["checkouts"] += 1
+            if in_use > self._counters["max_checked_out"]: self._counters["max_checked_out"] = in_use
+
+    def _on_invalidate(self, *args):
+        with self._lock: self._counters["invalidated"] += 1
+
+    def status(self):
+        pool = self.engine.pool
+        out = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+            in_use = pool.checkedout()
+            out.update(size=pool.size(), capacity=capacity, checked_out=in_use, checked_in=pool.checkedin(),
+                       overflow=max(pool.overflow(), 0), saturation=round(in_use / capacity, 3) if capacity else 0.0)
+        with self._lock: out.update(self._counters)
+        return out
+
+def close_pool(engine):
+    # 종료 시 풀의 커넥션 정리 (메모리 sqlite 의 스레드별 풀은 만든 스레드에서만 닫을 수 있어 제외)
+    if isinstance(engine.pool, QueuePool): engine.dispose()
+
+# --- 스키마 ---
+# create_all 은 이미 있는 테이블을 바꾸지 않으므로 새 컬럼은 따로 추가 (server_default 가 있어야 기존 행이 채워짐)
+def add_missing_columns(conn, metadata):
+    insp = inspect(conn)
+    added = []
+    for table in metadata.sorted_tables:
+        if not insp.has_table(table.name): continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing: continue
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=conn.dialect)}"))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+# --- 시작 / 준비 상태 ---
+def backoff(attempt):
+    # 워커 여러 개가 같은 박자로 재시도하지 않도록 지터
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+class DatabaseStartup:
+    def __init__(self, engine):
+        self.engine = engine
+        self.state = "idle"     # idle -> starting -> ready | failed
+        self.attempts = 0
+        self.error = None
+        self.ready_ms = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    def check(self, metadata=None):
+        with self.engine.connect() as conn: conn.execute(text("SELECT 1"))
+        if metadata is not None:
+            metadata.create_all(bind=self.engine)
+            with self.engine.begin() as conn:
+                for name in add_missing_columns(conn, metadata): print(f"컬럼 추가: {name}")
+
+    def run(self, metadata=None, timeout=STARTUP_TIMEOUT):
+        t0 = time.monotonic()
+        self.state, self.error, self.attempts = "starting", None, 0
+        while True:
+            self.attempts += 1
+            try:
+                self.check(metadata)
+                break
+            except DBAPIError as e:
+                # 연결 거부/인증 대기/동시 테이블 생성 충돌 등은 재시도
+                self.error = str(e.orig if e.orig is not None else e).splitlines()[0]
+                delay = backoff(self.attempts - 1)
+                if time.monotonic() - t0 + delay > timeout:
+                    self.state = "failed"
+                    print(f"DB 연결 실패 ({self.attempts}회, {timeout:.0f}초 초과): {self.error}")
+                    return False
+                print(f"DB 연결 대기 중... ({self.attempts}회, {delay:.1f}초 후 재시도): {self.error}")
+                time.sleep(delay)
+        self.state, self.error = "ready", None
+        self.ready_ms = round((time.monotonic() - t0) * 1000, 1)
+        self._ready.set()
+        print(f"DB 연결 성공 ({self.attempts}회, {self.ready_ms}ms)")
+        return True
+
+    def start(self, metadata=None):
+        if self._thread is not None and self._thread.is_alive(): return
+        self._ready.clear()
+        self.state = "starting"
+        self._thread = threading.Thread(target=self.run, args=(metadata,), name="db-startup", daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=STARTUP_WAIT):
+        return self._ready.wait(timeout)
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def readiness(self):
+        # (준비 여부, 응답 본문) - 시작이 끝났어도 지금 DB 에 닿지 않으면 준비 안 됨
+        body = {"status": self.state, "attempts": self.attempts}
+        if not self.is_ready():
+            if self.error: body["error"] = self.error
+            return False, body
+        try:
+            self.check()
+        except DBAPIError as e:
+            body.update(status="unavailable", error=str(e.orig if e.orig is not None else e).splitlines()[0])
+            return False, body
+        return True, body
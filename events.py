@@ -0,0 +1,119 @@
+# events.py
+# 실시간 이벤트 푸시 (Server-Sent Events)
+# 채널: "session:{id}" (출석/투표 집계), "course:{id}" (세션 열림/닫힘/투표 시작)
+# LIVE_BACKEND 가 redis:// 이면 Redis pub/sub 으로 워커 간 전달, 아니면 프로세스 내 전달
+import asyncio
+import json
+import os
+import threading
+
+HEARTBEAT = 15        # 초, 프록시 유휴 연결 끊김 방지용 주석 전송 간격
+QUEUE_SIZE = 100      # 구독자별 대기열 (가득 차면 느린 구독자의 이벤트는 버림)
+REDIS_PREFIX = "events:"
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+class Subscriber:
+    def __init__(self, channels):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def put(self, payload):
+        try: self.queue.put_nowait(payload)
+        except asyncio.QueueFull: pass
+
+class Broker:
+    def __init__(self, redis_url=None):
+        self._subs = {}   # channel -> set(Subscriber)
+        self._lock = threading.Lock()
+        self._redis = None
+        self._listener = None
+        if redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+
+    def subscribe(self, channels):
+        sub = Subscriber(list(channels))
+        with self._lock:
+            for ch in sub.channels: self._subs.setdefault(ch, set()).add(sub)
+        if self._redis is not None and self._listener is None: self._start_listener()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for ch in sub.channels:
+                subs = self._subs.get(ch)
+                if subs is None: continue
+                subs.discard(sub)
+                if not subs: del self._subs[ch]
+
+    # 동기 핸들러(스레드풀)에서도 호출 가능
+    def publish(self, channel, event, data):
+        payload = format_event(event, data)
+        if self._redis is not None:
+            try: self._redis.publish(REDIS_PREFIX + channel, payload)
+            except Exception: self.dispatch(channel, payload)
+        else:
+            self.dispatch(channel, payload)
+
+    def dispatch(self, channel, payload):
+        with self._lock:
+            subs = list(self._subs.get(channel, ()))
+        for sub in subs:
+            sub.loop.call_soon_threadsafe(sub.put, payload)
+
+    def _start_listener(self):
+        def run():
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(REDIS_PREFIX + "*")
+            for msg in pubsub.listen():
+                self.dispatch(msg["channel"][len(REDIS_PREFIX):], msg["data"])
+        self._listener = threading.Thread(target=run, name="events-redis-listener", daemon=True)
+        self._listener.start()
+
+# key 별로 delay 초 안의 여러 호출을 한 번으로 합쳐 fn(key) 실행 (타이머 스레드, 마지막 상태를 발행)
+# 출석 버스트 때 체크인마다 집계를 다시 읽어 발행하지 않도록 사용
+class Debouncer:
+    def __init__(self, delay, fn):
+        self.delay = delay
+        self.fn = fn
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        with self._lock:
+            if key in self._timers: return
+            timer = threading.Timer(self.delay, self._fire, args=(key,))
+            timer.daemon = True
+            self._timers[key] = timer
+        timer.start()
+
+    def _fire(self, key):
+        with self._lock: self._timers.pop(key, None)
+        try: self.fn(key)
+        except Exception as e: print(f"이벤트 발행 실패 ({key}): {e}")
+
+    def pending(self):
+        with self._lock: return len(self._timers)
+
+_backend = os.getenv("LIVE_BACKEND", "memory")
+broker = Broker(_backend if _backend.startswith(("redis://", "rediss://")) else None)
+
+async def stream(request, sub, initial=()):
+    try:
+        for event, data in initial:
+            yield format_event(event, data)
+        while True:
+            try:
+                payload = await asyncio.wait_for(sub.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected(): break
+                yield ": ping\n\n"
+                continue
+            yield payload
+    finally:
+        broker.unsubscribe(sub)
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
@@ -0,0 +1,72 @@
+# http_cache.py
+# 자주 조회되고 드물게 바뀌는 응답의 ETag / 304 처리 + 직렬화된 본문 캐시
+# - 범위(scope)마다 버전 토큰: ("course", id) = 강의의 주차/수강/출석, "courses" = 강의 목록
+#   변경 API 가 커밋 후 bump -> 토큰이 바뀌어 ETag 가 달라짐
+# - If-None-Match 가 현재 ETag 와 같으면 조회/직렬화 없이 304
+# - 같은 화면(view)의 본문은 ETag 별로 캐시해서 여러 사용자가 함께 사용 (학생별 화면은 view 에 학생 id 포함)
+# - 토큰은 LIVE_BACKEND=redis://... 이면 Redis 카운터(범위마다 INCR)라 워커 간 즉시 공유 (cache.make_versions)
+#   아니면 워커별 메모리: 다른 워커에서 바뀐 내용은 VERSION_TTL 뒤 토큰이 새로 발급되며 반영 (단일 워커 기본값)
+import hashlib
+import json
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from cache import TTLCache, make_versions
+import models
+
+VERSION_TTL = 30
+BODY_TTL = 300
+CACHE_CONTROL = "private, no-cache"   # 브라우저는 저장하되 매번 ETag 로 재검증
+
+versions = make_versions("httpver:", ttl=VERSION_TTL)
+bodies = TTLCache(ttl=BODY_TTL, maxsize=2000)
+session_courses = TTLCache(ttl=3600, maxsize=100000)   # 세션 -> 강의 (바뀌지 않음)
+_adapters = {}
+
+def version(scope):
+    return versions.get([scope])[0]
+
+def bump(*scopes):
+    versions.bump(*scopes)
+
+# 여러 강의에 걸친 변경 (학기 공휴일, 사용자 이름 등)
+def bump_all():
+    versions.clear()
+
+# 출석 변경처럼 세션 id 만 아는 경우: 세션의 강의 버전을 올림
+def bump_sessions(db: Session, *session_ids):
+    bump(*(("course", cid) for cid in session_course_ids(db, *session_ids)))
+
+def session_course_ids(db: Session, *session_ids):
+    missing = [sid for sid in set(session_ids) if session_courses.get(sid) is None]
+    if missing:
+        for sid, cid in db.execute(select(models.ClassSession.id, models.ClassSession.course_id).where(models.ClassSession.id.in_(missing))):
+            session_courses.set(sid, cid)
+    return {session_courses.get(sid) for sid in set(session_ids) if session_courses.get(sid) is not None}
+
+def make_etag(scopes, view):
+    tokens = versions.get(scopes)
+    return '"' + hashlib.sha1(repr((view, tokens)).encode()).hexdigest()[:20] + '"'
+
+def encode(data, model=None):
+    if model is None:
+        return json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode()
+    adapter = _adapters.get(model)
+    if adapter is None: adapter = _adapters[model] = TypeAdapter(model)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+# build: 본문을 만드는 코루틴 함수 (304 이거나 캐시된 본문이 있으면 호출하지 않음)
+async def respond(request: Request, scopes, view, build, model=None):
+    # Redis 조회는 이벤트 루프 밖에서
+    etag = await run_in_threadpool(make_etag, scopes, view) if versions.shared else make_etag(scopes, view)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag in [t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    body = bodies.get((view, etag))
+    if body is None:
+        body = encode(await build(), model)
+        bodies.set((view, etag), body)
+    return Response(body, media_type="application/json", headers=headers)
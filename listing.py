@@ -0,0 +1,84 @@
+# listing.py
+# 관리자 목록 API (사용자/강좌) 용 keyset 페이지네이션
+# - OFFSET 대신 "마지막으로 받은 id 이후" 조건으로 조회 (뒤 페이지로 가도 비용이 일정)
+# - 필요한 컬럼만 SELECT 해서 ORM 객체를 만들지 않음
+# - total 은 첫 페이지(cursor 없음)에서만 계산
+# - 감사 로그는 최신순 (created_at, id) 기준, 건수가 많아 total 은 계산하지 않음
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session
+import models
+
+PAGE_DEFAULT = 50
+PAGE_MAX = 500
+
+USER_COLUMNS = (models.User.id, models.User.email, models.User.name, models.User.student_number,
+                models.User.role, models.User.department_id)
+COURSE_COLUMNS = (models.Course.id, models.Course.title, models.Course.semester, models.Course.course_type,
+                  models.Course.day_of_week, models.Course.instructor_id, models.Course.department_id)
+
+def keyset_page(db: Session, columns, id_col, filters, cursor: Optional[int] = None, limit: int = PAGE_DEFAULT):
+    limit = max(1, min(limit or PAGE_DEFAULT, PAGE_MAX))
+    total = None
+    if cursor is None:
+        total = db.execute(select(func.count()).select_from(id_col.table).where(*filters)).scalar()
+    stmt = select(*columns).where(*filters)
+    if cursor is not None: stmt = stmt.where(id_col > cursor)
+    rows = db.execute(stmt.order_by(id_col).limit(limit + 1)).mappings().all()
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return {"items": [dict(r) for r in rows[:limit]], "next_cursor": next_cursor, "total": total}
+
+def prefix(col, q):
+    return col.startswith(q, autoescape=True)
+
+# q: 이름/이메일/학번 앞부분
+def user_page(db: Session, role=None, department_id=None, q=None, cursor=None, limit=PAGE_DEFAULT):
+    U = models.User
+    filters = []
+    if role: filters.append(U.role == role)
+    if department_id: filters.append(U.department_id == department_id)
+    if q: filters.append(or_(prefix(U.name, q), prefix(U.email, q), prefix(U.student_number, q)))
+    return keyset_page(db, USER_COLUMNS, U.id, filters, cursor, limit)
+
+# q: 강의명 앞부분
+def course_page(db: Session, semester=None, department_id=None, instructor_id=None, q=None, cursor=None, limit=PAGE_DEFAULT):
+    C = models.Course
+    filters = []
+    if semester: filters.append(C.semester == semester)
+    if department_id: filters.append(C.department_id == department_id)
+    if instructor_id: filters.append(C.instructor_id == instructor_id)
+    if q: filters.append(prefix(C.title, q))
+    return keyset_page(db, COURSE_COLUMNS, C.id, filters, cursor, limit)
+
+# --- 감사 로그 검색 ---
+# cursor 는 "<created_at ISO>_<id>" (마지막으로 받은 행), 잘못된 값이면 ValueError
+def audit_columns(model):
+    return (model.id, model.actor_id, model.target_type, model.target_id, model.action, model.details, model.created_at)
+
+def encode_audit_cursor(row):
+    return f"{row['created_at'].isoformat()}_{row['id']}"
+
+def decode_audit_cursor(cursor: str):
+    at, _, last_id = cursor.rpartition("_")
+    return datetime.fromisoformat(at), int(last_id)
+
+# model: AuditLog (현재) 또는 AuditLogArchive (보관분)
+def audit_page(db: Session, model=models.AuditLog, actor_id=None, target_type=None, target_id=None, action=None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None, cursor: Optional[str] = None, limit=PAGE_DEFAULT):
+    L = model
+    limit = max(1, min(limit or PAGE_DEFAULT, PAGE_MAX))
+    filters = []
+    if actor_id is not None: filters.append(L.actor_id == actor_id)
+    if target_type: filters.append(L.target_type == target_type)
+    if target_id is not None: filters.append(L.target_id == target_id)
+    if action: filters.append(L.action == action)
+    if since: filters.append(L.created_at >= since)
+    if until: filters.append(L.created_at < until)
+    if cursor:
+        at, last_id = decode_audit_cursor(cursor)
+        filters.append(or_(L.created_at < at, and_(L.created_at == at, L.id < last_id)))
+    stmt = select(*audit_columns(L)).where(*filters).order_by(L.created_at.desc(), L.id.desc()).limit(limit + 1)
+    rows = db.execute(stmt).mappings().all()
+    next_cursor = encode_audit_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"items": [dict(r) for r in rows[:limit]], "next_cursor": next_cursor}
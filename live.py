@@ -0,0 +1,145 @@
+# live.py
+# 출석 진행 중인 세션의 실시간 카운터 (3초 폴링을 DB 대신 메모리에서 응답)
+#   LIVE_BACKEND=memory        : 프로세스 내 dict (단일 워커 기본값)
+#   LIVE_BACKEND=redis://...   : 워커 간 공유 (redis 패키지 필요)
+#   LIVE_BACKEND=db            : 카운터 미사용, 항상 DB 조회
+# 멀티 워커(WEB_CONCURRENCY > 1)에서 memory 를 쓰면 워커마다 값이 갈라지므로 db 로 대체
+import os
+import threading
+from sqlalchemy.orm import Session
+import models
+
+ATTENDED = (1, 4)
+COUNTER_TTL = 60 * 60 * 6  # 세션이 닫히지 않고 방치돼도 6시간 후 자동 소멸
+
+def is_attended(status):
+    return status in ATTENDED
+
+class MemoryBackend:
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            item = self._data.get(session_id)
+            return dict(item) if item and "pending" not in item else None
+
+    def load(self, session_id, total, attended, auth_code):
+        with self._lock:
+            self._data[session_id] = {"total": total, "attended": attended, "auth_code": auth_code}
+
+    # 재적재: reserve 후 DB 집계, fill 로 채움. 그 사이의 증감은 자리표시에 모였다가 집계값에 더해짐
+    def reserve(self, session_id):
+        with self._lock:
+            self._data.setdefault(session_id, {"pending": True, "attended": 0})
+
+    def fill(self, session_id, total, attended, auth_code):
+        with self._lock:
+            item = self._data.get(session_id)
+            if item is None or "pending" not in item: return   # 다른 요청이 이미 채웠거나 세션이 닫힘
+            self._data[session_id] = {"total": total, "attended": attended + item["attended"], "auth_code": auth_code}
+
+    def incr(self, session_id, field, delta):
+        with self._lock:
+            item = self._data.get(session_id)
+            if item and field in item: item[field] += delta
+
+    def drop(self, session_id):
+        with self._lock:
+            self._data.pop(session_id, None)
+
+class RedisBackend:
+    # 키가 있을 때만 증가 (없으면 다음 조회 때 DB에서 다시 적재)
+    INCR_IF_EXISTS = "if redis.call('EXISTS', KEYS[1]) == 1 then return redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2]) end return nil"
+    # 자리표시(pending)가 남아 있을 때만 채움: 집계 중에 들어온 증감(attended)에 집계값을 더함
+    FILL_IF_PENDING = ("if redis.call('HEXISTS', KEYS[1], 'pending') == 0 then return 0 end "
+                       "redis.call('HINCRBY', KEYS[1], 'attended', ARGV[2]) "
+                       "redis.call('HSET', KEYS[1], 'total', ARGV[1], 'auth_code', ARGV[3]) "
+                       "redis.call('HDEL', KEYS[1], 'pending') redis.call('EXPIRE', KEYS[1], ARGV[4]) return 1")
+
+    def __init__(self, url):
+        import redis
+        self.r = redis.Redis.from_url(url, decode_responses=True)
+        self._incr = self.r.register_script(self.INCR_IF_EXISTS)
+        self._fill = self.r.register_script(self.FILL_IF_PENDING)
+
+    def key(self, session_id):
+        return f"live:session:{session_id}"
+
+    def get(self, session_id):
+        item = self.r.hgetall(self.key(session_id))
+        if not item or "pending" in item: return None
+        return {"total": int(item["total"]), "attended": int(item["attended"]), "auth_code": item.get("auth_code") or None}
+
+    def load(self, session_id, total, attended, auth_code):
+        k = self.key(session_id)
+        pipe = self.r.pipeline()
+        pipe.hset(k, mapping={"total": total, "attended": attended, "auth_code": auth_code or ""})
+        pipe.expire(k, COUNTER_TTL)
+        pipe.execute()
+
+    def reserve(self, session_id):
+        k = self.key(session_id)
+        if self.r.hsetnx(k, "pending", 1): self.r.expire(k, COUNTER_TTL)
+
+    def fill(self, session_id, total, attended, auth_code):
+        self._fill(keys=[self.key(session_id)], args=[total, attended, auth_code or "", COUNTER_TTL])
+
+    def incr(self, session_id, field, delta):
+        self._incr(keys=[self.key(session_id)], args=[field, delta])
+
+    def drop(self, session_id):
+        self.r.delete(self.key(session_id))
+
+def make_backend(spec=None):
+    spec = spec or os.getenv("LIVE_BACKEND", "memory")
+    if spec.startswith("redis://") or spec.startswith("rediss://"): return RedisBackend(spec)
+    if spec == "memory" and int(os.getenv("WEB_CONCURRENCY", "1")) <= 1: return MemoryBackend()
+    return None
+
+backend = make_backend()
+
+# --- DB 조회 (카운터 미적재/재시작/멀티워커 시 사용) ---
+def count_from_db(db: Session, session: models.ClassSession):
+    total = db.query(models.Enrollment).filter(models.Enrollment.course_id == session.course_id).count()
+    attended = db.query(models.Attendance).filter(models.Attendance.session_id == session.id, models.Attendance.status.in_(ATTENDED)).count()
+    return {"total": total, "attended": attended, "auth_code": session.auth_code}
+
+# 세션이 열릴 때 한 번 적재, 닫힐 때 제거
+def open_session(db: Session, session: models.ClassSession):
+    if backend is None: return
+    stat = count_from_db(db, session)
+    backend.load(session.id, stat["total"], stat["attended"], stat["auth_code"])
+
+def close_session(session_id):
+    if backend is not None: backend.drop(session_id)
+
+# 카운터만 확인 (DB 접근 없음, 미적재 시 None)
+def peek(session_id: int):
+    return backend.get(session_id) if backend is not None else None
+
+def get_stat(db: Session, session_id: int):
+    stat = peek(session_id)
+    if stat is not None: return stat
+    session = db.query(models.ClassSession).filter(models.ClassSession.id == session_id).first()
+    if not session: return None
+    # 집계 전에 자리를 잡아둠: 집계와 적재 사이의 status_changed 가 버려지지 않고, 먼저 채운 값을 덮어쓰지 않음
+    cache = backend is not None and session.is_open
+    if cache: backend.reserve(session.id)
+    stat = count_from_db(db, session)
+    if cache: backend.fill(session.id, stat["total"], stat["attended"], stat["auth_code"])
+    return stat
+
+# 출석 상태 변경 시 증감 (old_status 는 기존 기록이 없으면 None)
+def status_changed(session_id, old_status, new_status):
+    add_attended(session_id, int(is_attended(new_status)) - int(is_attended(old_status)))
+
+def add_attended(session_id, delta):
+    if backend is not None and delta: backend.incr(session_id, "attended", delta)
+
+# 수강생 수가 바뀌면 열린 세션의 카운터를 비워 다음 조회 때 재적재
+def course_changed(db: Session, course_id: int):
+    if backend is None: return
+    for (sid,) in db.query(models.ClassSession.id).filter(models.ClassSession.course_id == course_id, models.ClassSession.is_open == True):
+        backend.drop(sid)
@@ -0,0 +1,152 @@
+# loadtest.py
+# 부하 테스트 (서버와 같은 DB 를 가리켜야 함, httpx 필요: pip install httpx)
+#   checkin : 세션을 열고 N명이 동시에 POST /student/sessions/{id}/attend
+#             학생/강의는 직접 DB에 만들고 토큰은 auth 로 발급해 로그인 비용 제외
+#             DATABASE_URL=... python loadtest.py --url http://127.0.0.1:8000 --students 300 --concurrency 100
+#   login   : N명이 동시에 POST /auth/login (bcrypt 검증), 그동안 가벼운 API 지연도 함께 측정
+#             DATABASE_URL=... python loadtest.py login --students 200 --concurrency 200
+#             (시드 해시는 이 프로세스의 BCRYPT_ROUNDS 로 만들어지므로 서버와 같은 값으로 실행)
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime
+import httpx
+from sqlalchemy import insert
+import auth
+import models
+from database import SessionLocal, engine
+
+def seed(n_students):
+    models.Base.metadata.create_all(bind=engine)
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        prof = models.User(email=f"prof_{tag}@load", password="x", name="부하교수", role="INSTRUCTOR")
+        db.add(prof)
+        db.flush()
+        course = models.Course(title=f"부하테스트_{tag}", semester="2025-2", instructor_id=prof.id)
+        db.add(course)
+        db.flush()
+        session = models.ClassSession(course_id=course.id, week_number=1, session_date=datetime.now())
+        db.add(session)
+        db.execute(insert(models.User), [
+            {"email": f"s{i}_{tag}@load", "password": "x", "name": f"학생{i}", "student_number": f"L{tag}{i:05d}", "role": "STUDENT"}
+            for i in range(n_students)
+        ])
+        students = db.query(models.User.id, models.User.email).filter(models.User.email.like(f"%_{tag}@load"), models.User.role == "STUDENT").all()
+        db.execute(insert(models.Enrollment), [{"user_id": uid, "course_id": course.id} for uid, _ in students])
+        db.commit()
+        prof_token = auth.create_access_token({"sub": prof.email, "role": "INSTRUCTOR"})
+        tokens = [auth.create_access_token({"sub": email, "role": "STUDENT"}) for _, email in students]
+        return session.id, prof_token, tokens
+    finally:
+        db.close()
+
+def seed_logins(n_users, password):
+    models.Base.metadata.create_all(bind=engine)
+    tag = uuid.uuid4().hex[:8]
+    hashed = auth.get_password_hash(password)
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.User), [
+            {"email": f"login{i}_{tag}@load", "password": hashed, "name": f"로그인{i}", "student_number": f"G{tag}{i:05d}", "role": "STUDENT"}
+            for i in range(n_users)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return [f"login{i}_{tag}@load" for i in range(n_users)]
+
+def percentile(values, p):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+async def run(url, session_id, prof_token, tokens, concurrency):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        r = await client.patch(f"/sessions/{session_id}/status", params={"is_open": "true", "method": "ELECTRONIC"},
+                               headers={"Authorization": f"Bearer {prof_token}"})
+        r.raise_for_status()
+        sem = asyncio.Semaphore(concurrency)
+        latencies, codes = [], {}
+
+        async def attend(token):
+            async with sem:
+                t0 = time.perf_counter()
+                res = await client.post(f"/student/sessions/{session_id}/attend", headers={"Authorization": f"Bearer {token}"})
+                latencies.append(time.perf_counter() - t0)
+                codes[res.status_code] = codes.get(res.status_code, 0) + 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(attend(t) for t in tokens))
+        elapsed = time.perf_counter() - t0
+    return elapsed, latencies, codes
+
+async def run_logins(url, emails, password, concurrency):
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=600) as client:
+        sem = asyncio.Semaphore(concurrency)
+        latencies, codes, probes = [], {}, []
+        done = asyncio.Event()
+
+        async def login(email):
+            async with sem:
+                t0 = time.perf_counter()
+                res = await client.post("/auth/login", data={"username": email, "password": password})
+                latencies.append(time.perf_counter() - t0)
+                codes[res.status_code] = codes.get(res.status_code, 0) + 1
+
+        # 로그인 폭주 중에도 다른 요청이 막히지 않는지 (인증 없는 정적 페이지)
+        async def probe():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                try: await client.get("/")
+                except httpx.HTTPError: pass
+                probes.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.05)
+
+        prober = asyncio.create_task(probe())
+        t0 = time.perf_counter()
+        await asyncio.gather(*(login(e) for e in emails))
+        elapsed = time.perf_counter() - t0
+        done.set()
+        await prober
+    return elapsed, latencies, codes, probes
+
+def count_rows(session_id, expected, wait=5.0):
+    # 배치 writer 가 비동기로 저장하므로 기대 건수에 도달할 때까지 잠시 기다림
+    deadline = time.monotonic() + wait
+    while True:
+        db = SessionLocal()
+        try: n = db.query(models.Attendance).filter(models.Attendance.session_id == session_id, models.Attendance.status == 1).count()
+        finally: db.close()
+        if n >= expected or time.monotonic() > deadline: return n
+        time.sleep(0.2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scenario", nargs="?", choices=["checkin", "login"], default="checkin")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--password", default="loadtest1234")
+    args = parser.parse_args()
+
+    if args.scenario == "login":
+        emails = seed_logins(args.students, args.password)
+        elapsed, latencies, codes, probes = asyncio.run(run_logins(args.url, emails, args.password, args.concurrency))
+        print(f"📊 로그인 {args.students}건 / 동시 {args.concurrency}")
+        print(f"   처리량: {args.students / elapsed:.1f} logins/s (총 {elapsed:.2f}s)")
+        print(f"   지연: p50 {percentile(latencies, 50) * 1000:.0f}ms, p99 {percentile(latencies, 99) * 1000:.0f}ms")
+        print(f"   동시 GET / 지연: p50 {percentile(probes, 50) * 1000:.0f}ms, p99 {percentile(probes, 99) * 1000:.0f}ms ({len(probes)}회)")
+        print(f"   응답 코드: {codes}")
+    else:
+        session_id, prof_token, tokens = seed(args.students)
+        elapsed, latencies, codes = asyncio.run(run(args.url, session_id, prof_token, tokens, args.concurrency))
+        saved = count_rows(session_id, codes.get(200, 0))
+        print(f"📊 출석 체크 {args.students}건 / 동시 {args.concurrency}")
+        print(f"   처리량: {args.students / elapsed:.1f} check-ins/s (총 {elapsed:.2f}s)")
+        print(f"   지연: p50 {percentile(latencies, 50) * 1000:.0f}ms, p99 {percentile(latencies, 99) * 1000:.0f}ms")
+        print(f"   응답 코드: {codes}, 저장된 출석: {saved}")
@@ -1,33 +1,49 @@
 # main.py
-import time
-import shutil
 import os
 import random
 import string
 import json
-from datetime import datetime, timedelta
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Response
+import csv
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Response, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import Optional
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import OperationalError
-from database import engine, get_db
-import models, schemas, auth
-
-# [상수 정의]
-HOLIDAYS_2025_2 = [
-    "2025-10-03", "2025-10-06", "2025-10-07", 
-    "2025-10-08", "2025-10-09", "2025-12-25"
-]
-DAY_MAP = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
+from sqlalchemy.exc import IntegrityError
+from database import engine, async_engine, get_db, get_async_db, SessionLocal
+import models, schemas, auth, reports, analytics, live, events, checkin, listing, stats, bulk_import, semesters, audit, storage, static_assets, http_cache, db_lifecycle, metrics, sql_profiler
 
 # 1. 앱 생성
-app = FastAPI(title="Inoxde Admin System")
+@asynccontextmanager
+async def lifespan(app):
+    # bcrypt 프로세스 풀은 fork 로 만드므로 이 프로세스에 스레드(DB 시작 등)가 생기기 전에 먼저
+    auth.start_password_pool()
+    # DB 연결(+ 테이블 생성)은 백그라운드에서 재시도, 여기서는 STARTUP_WAIT 초까지만 기다림 -> 이후는 /health/ready 로 확인
+    db_startup.start(models.Base.metadata if db_lifecycle.AUTO_CREATE else None)
+    os.makedirs(storage.UPLOAD_DIR, exist_ok=True)
+    try: static_assets.build()
+    except OSError as e: print(f"정적 파일 압축본 생성 실패 (원본으로 서빙): {e}")
+    if not await run_in_threadpool(db_startup.wait):
+        print(f"DB 준비 전에 서비스 시작 ({db_startup.state}), 준비되면 /health/ready 가 200")
+    if metrics_exporter is not None: metrics_exporter.start()
+    yield
+    checkin_pipeline.stop()  # 큐에 남은 출석 기록 저장 후 종료
+    audit_writer.stop()      # 큐에 남은 감사 로그 저장 후 종료
+    if metrics_exporter is not None: metrics_exporter.stop()   # 종료 직전 누적값까지 남김
+    storage.thumbnailer.stop()
+    auth.stop_password_pool()
+    db_lifecycle.close_pool(engine)
+    if async_engine is not None: await async_engine.dispose()
+
+app = FastAPI(title="Inoxde Admin System", lifespan=lifespan)
 
 # 2. 미들웨어 설정
+app.add_middleware(storage.UploadSizeLimit, path_pattern=r"/student/sessions/\d+/excuse")  # 공결 증빙 크기 제한 (CORS 안쪽)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], 
@@ -35,43 +51,95 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestMetrics)  # 라우트별 지연/상태 코드/요청당 SQL 수 (가장 바깥)
+if sql_profiler.ENABLED:  # 개발용: 요청별 SQL 보고서 + N+1 경고 (SQL_PROFILE=1)
+    app.add_middleware(sql_profiler.ProfilerMiddleware, engine=engine)
+    if async_engine is not None: sql_profiler.instrument(async_engine.sync_engine)
 
 # 3. 파일 저장소 및 정적 파일 설정
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# 업로드 파일은 권한 확인 후 전송 (GET /uploads/{name}), 정적 파일은 압축본/ETag/캐시 헤더 적용
+UPLOAD_DIR = storage.UPLOAD_DIR
+static_files = static_assets.CachedStatic(directory=static_assets.STATIC_DIR)
+app.mount("/static", static_files, name="static")
 
-# 4. DB 테이블 생성 루프
-while True:
-    try:
-        models.Base.metadata.create_all(bind=engine)
-        print("DB 연결 성공")
-        break
-    except OperationalError:
-        print("DB 연결 대기 중...")
-        time.sleep(2)
+# 4. DB 연결 수명 관리 (import 시점에는 DB 에 접근하지 않음, 연결/테이블 생성은 lifespan 에서)
+db_startup = db_lifecycle.DatabaseStartup(engine)
+pool_monitors = {"sync": db_lifecycle.PoolMonitor(engine)}
+if async_engine is not None: pool_monitors["async"] = db_lifecycle.PoolMonitor(async_engine.sync_engine)
+for monitored in pool_monitors.values(): metrics.instrument(monitored.engine)
+
+@app.get("/health/live")
+async def liveness(): return {"status": "ok"}
+
+@app.get("/health/ready")
+async def readiness():
+    ok, body = await run_in_threadpool(db_startup.readiness)
+    return JSONResponse(body, status_code=200 if ok else 503)
 
 # --- 루트 페이지 ---
 @app.get("/")
-def read_root(): return FileResponse('static/index.html')
+async def read_root(request: Request): return await static_files.get_response("index.html", request.scope)
+
+@app.get("/uploads/{name:path}")
+def get_upload(name: str, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if not storage.can_view(db, current_user, name): raise HTTPException(status_code=404)
+    return storage.upload_response(name)
 
 # --- Audit Log Helper ---
-def log_audit(db, actor, type, tid, act, det=""):
-    try:
-        db.add(models.AuditLog(actor_id=actor, target_type=type, target_id=tid, action=act, details=det))
-        db.commit()
-    except: pass
+# 요청에서는 큐에 넣기만 하고, 저장은 audit writer 가 모아서 배치로 (요청 트랜잭션/응답 시간과 무관)
+audit_writer = audit.AuditWriter(SessionLocal)
+
+def log_audit(actor, type, tid, act, det=""):
+    audit_writer.record(actor, type, tid, act, det)
+
+# --- 실시간 이벤트 발행 Helper ---
+def session_state(session):
+    return {"id": session.id, "course_id": session.course_id, "is_open": session.is_open, "is_voting": session.is_voting, "attendance_method": session.attendance_method}
+
+def publish_session_state(session):
+    data = session_state(session)
+    events.broker.publish(f"session:{session.id}", "session", data)
+    events.broker.publish(f"course:{session.course_id}", "session", data)
+
+# 집계 발행은 세션별로 STAT_DEBOUNCE 초에 한 번 (카운터가 없으면 get_stat 이 매번 DB 를 세므로)
+STAT_DEBOUNCE = 1.0
+
+def publish_stat_now(session_id):
+    db = SessionLocal()
+    try: stat = live.get_stat(db, session_id)
+    finally: db.close()
+    if stat is not None: events.broker.publish(f"session:{session_id}", "stat", stat)
+
+publish_stat = events.Debouncer(STAT_DEBOUNCE, publish_stat_now)
+
+# --- 출석 체크 파이프라인 (배치 저장 후 캐시 무효화/이벤트 발행) ---
+def after_checkin_flush(db, rows, inserted):
+    reports.invalidate_dashboard(*{uid for _, uid in rows})
+    for sid, n in inserted.items(): live.add_attended(sid, n)   # INSERT IGNORE 로 건너뛴 행은 세지 않음
+    http_cache.bump_sessions(db, *{sid for sid, _ in rows})
+    for sid in {sid for sid, _ in rows}: publish_stat(sid)
+
+checkin_pipeline = checkin.CheckinPipeline(SessionLocal, on_flush=after_checkin_flush)
 
 # ==========================================
 # [Auth] 인증 관련
 # ==========================================
+# 조회 직후 트랜잭션을 끝내 커넥션을 반납 (bcrypt 검증 수백 ms 동안 풀을 점유하지 않도록)
+def find_login_user(db: Session, email: str):
+    user = db.query(models.User.id, models.User.email, models.User.role, models.User.password, models.User.token_version).filter(models.User.email == email).first()
+    db.rollback()
+    return user
+
 @app.post("/auth/login")
-def login(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.password):
-        raise HTTPException(status_code=400, detail="Login failed")
-    access_token = auth.create_access_token(data={"sub": user.email, "role": user.role})
+async def login(response: Response, form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(get_async_db)):
+    user = await db.run_sync(find_login_user, form_data.username)
+    if not user: raise HTTPException(status_code=400, detail="Login failed")
+    valid, new_hash = await auth.verify_and_update_async(form_data.password, user.password)
+    if not valid: raise HTTPException(status_code=400, detail="Login failed")
+    if new_hash:  # BCRYPT_ROUNDS 변경 시 새 비용으로 재해시
+        await db.run_sync(lambda s: s.query(models.User).filter(models.User.id == user.id).update({"password": new_hash}))
+        await db.commit()
+    access_token = auth.create_access_token(data={"sub": user.email, "role": user.role, "ver": user.token_version})
     response.set_cookie(key="access_token", value=f"Bearer {access_token}", httponly=True, samesite="Lax", secure=True)
     return {"role": user.role}
 
@@ -81,7 +149,7 @@ def logout(response: Response):
     return {"msg": "bye"}
 
 @app.get("/users/me", response_model=schemas.UserResponse)
-def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
+def read_users_me(current_user: auth.Principal = Depends(auth.get_current_user)):
     return current_user
 
 # ==========================================
@@ -91,27 +159,22 @@ def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
 # 1. 학과 관리
 @app.get("/admin/departments")
 def get_departments(db: Session = Depends(get_db)):
-    depts = db.query(models.Department).all()
-    result = []
-    for d in depts:
-        u_count = db.query(models.User).filter_by(department_id=d.id).count()
-        c_count = db.query(models.Course).filter_by(department_id=d.id).count()
-        result.append({"id": d.id, "name": d.name, "user_count": u_count, "course_count": c_count})
-    return result
+    return stats.get_overview(db)["departments"]
 
 @app.post("/admin/departments", response_model=schemas.DepartmentResponse)
-def create_dept(dept: schemas.DepartmentCreate, user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def create_dept(dept: schemas.DepartmentCreate, user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if user.role != "ADMIN": raise HTTPException(403)
     if db.query(models.Department).filter_by(name=dept.name).first():
         raise HTTPException(400, detail="이미 존재하는 학과명입니다.")
     new_d = models.Department(name=dept.name)
     db.add(new_d)
     db.commit()
-    log_audit(db, user.id, "DEPT", new_d.id, "CREATE", dept.name)
+    stats.invalidate()
+    log_audit(user.id, "DEPT", new_d.id, "CREATE", dept.name)
     return new_d
 
 @app.put("/admin/departments/{dept_id}")
-def update_department(dept_id: int, dept: schemas.DepartmentCreate, user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_department(dept_id: int, dept: schemas.DepartmentCreate, user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if user.role != "ADMIN": raise HTTPException(403)
     d = db.query(models.Department).filter(models.Department.id == dept_id).first()
     if not d: raise HTTPException(404)
@@ -120,42 +183,46 @@ def update_department(dept_id: int, dept: schemas.DepartmentCreate, user: models
     old_name = d.name
     d.name = dept.name
     db.commit()
-    log_audit(db, user.id, "DEPT", d.id, "UPDATE", f"{old_name} -> {dept.name}")
+    stats.invalidate()
+    log_audit(user.id, "DEPT", d.id, "UPDATE", f"{old_name} -> {dept.name}")
     return {"msg": "Updated", "name": d.name}
 
 @app.delete("/admin/departments/{dept_id}")
-def delete_department(dept_id: int, user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def delete_department(dept_id: int, user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if user.role != "ADMIN": raise HTTPException(403)
     d = db.query(models.Department).filter(models.Department.id == dept_id).first()
     if not d: raise HTTPException(404)
     if d.name == "대학본부": raise HTTPException(status_code=400, detail="⛔ 대학본부는 삭제할 수 없습니다.")
     
-    u_count = db.query(models.User).filter_by(department_id=dept_id).count()
-    c_count = db.query(models.Course).filter_by(department_id=dept_id).count()
+    u_count, c_count = stats.department_counts(db, dept_id)
     if u_count > 0 or c_count > 0:
         raise HTTPException(status_code=400, detail=f"삭제 불가: 구성원({u_count}명) 또는 강의({c_count}개)가 남아있습니다.")
         
     db.delete(d)
     db.commit()
-    log_audit(db, user.id, "DEPT", dept_id, "DELETE")
+    stats.invalidate()
+    log_audit(user.id, "DEPT", dept_id, "DELETE")
     return {"msg": "Deleted"}
 
 # 2. 사용자 관리
 @app.post("/admin/users", response_model=schemas.UserResponse)
-def create_user(u: schemas.UserCreate, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def create_user(u: schemas.UserCreate, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     if db.query(models.User).filter_by(email=u.email).first(): raise HTTPException(400, "Email exists")
     new_u = models.User(email=u.email, password=auth.get_password_hash(u.password), name=u.name, student_number=u.student_number, role=u.role.value, department_id=u.department_id)
     db.add(new_u)
     db.commit()
-    log_audit(db, me.id, "USER", new_u.id, "CREATE", u.email)
+    stats.invalidate()
+    log_audit(me.id, "USER", new_u.id, "CREATE", u.email)
     return new_u
 
 @app.put("/admin/users/{user_id}", response_model=schemas.UserResponse)
-def update_user(user_id: int, u: schemas.UserUpdate, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_user(user_id: int, u: schemas.UserUpdate, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     target = db.query(models.User).filter(models.User.id == user_id).first()
     if not target: raise HTTPException(404)
+    old_email = target.email
+    if u.password or target.role != u.role.value: target.token_version = (target.token_version or 0) + 1   # 이전 토큰 폐기
     target.name = u.name
     target.email = u.email
     target.role = u.role.value
@@ -163,31 +230,50 @@ def update_user(user_id: int, u: schemas.UserUpdate, me: models.User = Depends(a
     target.student_number = u.student_number
     if u.password: target.password = auth.get_password_hash(u.password)
     db.commit()
-    log_audit(db, me.id, "USER", user_id, "UPDATE", u.email)
+    auth.invalidate_user(old_email, u.email)
+    stats.invalidate()
+    http_cache.bump_all()  # 리포트 등에 이름/학번이 들어감
+    log_audit(me.id, "USER", user_id, "UPDATE", u.email)
     return target
 
 @app.delete("/admin/users/{user_id}")
-def delete_user(user_id: int, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def delete_user(user_id: int, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     target = db.query(models.User).filter(models.User.id == user_id).first()
     if target:
         if target.role == "ADMIN":
             admin_count = db.query(models.User).filter(models.User.role == "ADMIN").count()
             if admin_count <= 1: raise HTTPException(status_code=400, detail="⛔ 마지막 남은 관리자는 삭제할 수 없습니다.")
+        email = target.email
         db.delete(target)
         db.commit()
-        log_audit(db, me.id, "USER", user_id, "DELETE")
+        auth.invalidate_user(email)
+        reports.invalidate_dashboard(user_id)
+        stats.invalidate()
+        http_cache.bump_all()
+        log_audit(me.id, "USER", user_id, "DELETE")
         return {"msg": "Deleted"}
     return {"msg": "User not found"}
 
-@app.get("/admin/users", response_model=list[schemas.UserResponse])
-def get_users(me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+# CSV 일괄 등록 (헤더 형식은 bulk_import.py 참고), 행별 오류는 보고서로 반환
+@app.post("/admin/users/import")
+def import_users(file: UploadFile = File(...), me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
-    return db.query(models.User).all()
+    try: report = bulk_import.import_users(db, file.file, me.id)
+    except (UnicodeDecodeError, csv.Error): raise HTTPException(400, detail="CSV 파일을 읽을 수 없습니다. (UTF-8 또는 CP949)")
+    finally: stats.invalidate()
+    return report
+
+@app.get("/admin/users", response_model=schemas.UserPage)
+def get_users(role: Optional[schemas.UserRole] = None, department_id: Optional[int] = None, q: Optional[str] = None,
+              cursor: Optional[int] = None, limit: int = listing.PAGE_DEFAULT,
+              me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if me.role != "ADMIN": raise HTTPException(403)
+    return listing.user_page(db, role.value if role else None, department_id, q, cursor, limit)
 
 # 3. 강좌 관리
 @app.post("/admin/courses", response_model=schemas.CourseResponse)
-def create_course(c: schemas.CourseCreate, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def create_course(c: schemas.CourseCreate, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     instructor = db.query(models.User).filter(models.User.id == c.instructor_id, models.User.role == 'INSTRUCTOR').first()
     if not instructor: raise HTTPException(400, detail="유효하지 않은 교수 ID")
@@ -197,30 +283,36 @@ def create_course(c: schemas.CourseCreate, me: models.User = Depends(auth.get_cu
         day_of_week=c.day_of_week, instructor_id=c.instructor_id, department_id=c.department_id
     )
     db.add(new_c)
+    db.flush()
+    # 학기 달력에 등록된 학기면 주차 자동 생성 (강의와 같은 트랜잭션)
+    semesters.generate_sessions(db, [(new_c.id, new_c.semester, new_c.day_of_week)])
     db.commit()
     db.refresh(new_c)
-    
-    if "2025" in c.semester:
-        base_start = datetime(2025, 9, 1, 9, 0, 0)
-        target_weekday = DAY_MAP.get(c.day_of_week, 0)
-        days_ahead = target_weekday - base_start.weekday()
-        if days_ahead < 0: days_ahead += 7
-        first_session_date = base_start + timedelta(days=days_ahead)
-        
-        sessions = []
-        for i in range(17):
-            current_date = first_session_date + timedelta(weeks=i)
-            date_str = current_date.strftime("%Y-%m-%d")
-            is_hol = (date_str in HOLIDAYS_2025_2)
-            sessions.append(models.ClassSession(course_id=new_c.id, week_number=i+1, session_date=current_date, is_holiday=is_hol))
-        db.add_all(sessions)
-        db.commit()
-        
-    log_audit(db, me.id, "COURSE", new_c.id, "CREATE", f"{c.title}")
+    stats.invalidate()
+    http_cache.bump("courses")
+    log_audit(me.id, "COURSE", new_c.id, "CREATE", f"{c.title}")
     return new_c
 
+# 시간표 일괄 개설: 강의 INSERT 후 전체 주차를 한 번에 생성하고 한 번만 커밋
+@app.post("/admin/courses/bulk")
+def create_courses_bulk(courses: list[schemas.CourseCreate], me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if me.role != "ADMIN": raise HTTPException(403)
+    instructor_ids = {iid for (iid,) in db.query(models.User.id).filter(models.User.id.in_({c.instructor_id for c in courses}), models.User.role == 'INSTRUCTOR')}
+    invalid = [i for i, c in enumerate(courses) if c.instructor_id not in instructor_ids]
+    if invalid: raise HTTPException(400, detail=f"유효하지 않은 교수 ID (행: {invalid[:20]})")
+    new_courses = [models.Course(title=c.title, semester=c.semester, course_type=c.course_type, day_of_week=c.day_of_week,
+                                 instructor_id=c.instructor_id, department_id=c.department_id) for c in courses]
+    db.add_all(new_courses)
+    db.flush()
+    n_sessions = semesters.generate_sessions(db, [(c.id, c.semester, c.day_of_week) for c in new_courses])
+    db.add(models.AuditLog(actor_id=me.id, target_type="COURSE", action="BULK_CREATE", details=f"{len(new_courses)}개 강의, {n_sessions}개 주차"))
+    db.commit()
+    stats.invalidate()
+    http_cache.bump("courses")
+    return {"created": len(new_courses), "sessions": n_sessions, "course_ids": [c.id for c in new_courses]}
+
 @app.put("/admin/courses/{course_id}", response_model=schemas.CourseResponse)
-def update_course(course_id: int, c: schemas.CourseUpdate, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_course(course_id: int, c: schemas.CourseUpdate, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     target = db.query(models.Course).filter(models.Course.id == course_id).first()
     if not target: raise HTTPException(404)
@@ -232,89 +324,197 @@ def update_course(course_id: int, c: schemas.CourseUpdate, me: models.User = Dep
     if c.instructor_id: target.instructor_id = c.instructor_id
     
     db.commit()
-    log_audit(db, me.id, "COURSE", course_id, "UPDATE", c.title)
+    reports.invalidate_course_dashboards(db, course_id)
+    stats.invalidate()
+    http_cache.bump("courses", ("course", course_id))
+    log_audit(me.id, "COURSE", course_id, "UPDATE", c.title)
     return target
 
 @app.delete("/admin/courses/{course_id}")
-def delete_course(course_id: int, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def delete_course(course_id: int, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     c = db.query(models.Course).filter(models.Course.id == course_id).first()
     if c:
+        reports.invalidate_course_dashboards(db, course_id)
         db.delete(c)
         db.commit()
+        stats.invalidate()
+        http_cache.bump("courses", ("course", course_id))
     return {"msg": "Deleted"}
 
-@app.get("/admin/courses", response_model=list[schemas.CourseResponse])
-def get_all_courses(me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+@app.get("/admin/courses", response_model=schemas.CoursePage)
+def get_all_courses(semester: Optional[str] = None, department_id: Optional[int] = None, instructor_id: Optional[int] = None,
+                    q: Optional[str] = None, cursor: Optional[int] = None, limit: int = listing.PAGE_DEFAULT,
+                    me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
-    return db.query(models.Course).all()
+    return listing.course_page(db, semester, department_id, instructor_id, q, cursor, limit)
 
 @app.post("/admin/courses/{course_id}/students")
-def add_student_to_course(course_id: int, student_number: str, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def add_student_to_course(course_id: int, student_number: str, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     student = db.query(models.User).filter(models.User.student_number == student_number).first()
     if not student: raise HTTPException(404, detail="해당 학번의 학생을 찾을 수 없습니다.")
     if db.query(models.Enrollment).filter_by(user_id=student.id, course_id=course_id).first():
         raise HTTPException(400, detail="이미 수강 중인 학생입니다.")
     db.add(models.Enrollment(user_id=student.id, course_id=course_id))
-    db.commit()
-    log_audit(db, me.id, "ENROLL", course_id, "ADD_STUDENT", f"{student.name}({student_number})")
+    try: db.commit()
+    except IntegrityError:  # 동시 요청으로 먼저 등록된 경우 (uq_enrollment_user_course)
+        db.rollback()
+        raise HTTPException(400, detail="이미 수강 중인 학생입니다.")
+    reports.invalidate_dashboard(student.id)
+    live.course_changed(db, course_id)
+    http_cache.bump(("course", course_id))
+    log_audit(me.id, "ENROLL", course_id, "ADD_STUDENT", f"{student.name}({student_number})")
     return {"msg": "Enrolled"}
 
+# course_id 를 주면 CSV 의 course_id 열 없이 한 강의에 일괄 등록
+@app.post("/admin/enrollments/import")
+def import_enrollments(course_id: Optional[int] = None, file: UploadFile = File(...), me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if me.role != "ADMIN": raise HTTPException(403)
+    try: report, user_ids, course_ids = bulk_import.import_enrollments(db, file.file, me.id, course_id)
+    except (UnicodeDecodeError, csv.Error): raise HTTPException(400, detail="CSV 파일을 읽을 수 없습니다. (UTF-8 또는 CP949)")
+    reports.invalidate_dashboard(*user_ids)
+    for cid in course_ids: live.course_changed(db, cid)
+    http_cache.bump(*(("course", cid) for cid in course_ids))
+    return report
+
 @app.get("/admin/courses/{course_id}/students")
-def get_course_students(course_id: int, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def get_course_students(course_id: int, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
-    enrolls = db.query(models.Enrollment).filter_by(course_id=course_id).all()
-    result = []
-    for e in enrolls:
-        u = db.query(models.User).filter(models.User.id == e.user_id).first()
-        result.append({"id": u.id, "name": u.name, "email": u.email, "student_number": u.student_number})
-    return result
+    rows = db.query(models.User.id, models.User.name, models.User.email, models.User.student_number)\
+        .join(models.Enrollment, models.Enrollment.user_id == models.User.id)\
+        .filter(models.Enrollment.course_id == course_id).order_by(models.Enrollment.id).all()
+    return [{"id": r.id, "name": r.name, "email": r.email, "student_number": r.student_number} for r in rows]
 
 @app.delete("/admin/courses/{course_id}/students/{student_id}")
-def remove_student_from_course(course_id: int, student_id: int, me: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def remove_student_from_course(course_id: int, student_id: int, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if me.role != "ADMIN": raise HTTPException(403)
     enroll = db.query(models.Enrollment).filter_by(user_id=student_id, course_id=course_id).first()
     if enroll:
         db.delete(enroll)
         db.commit()
-        log_audit(db, me.id, "ENROLL", course_id, "REMOVE_STUDENT", str(student_id))
+        reports.invalidate_dashboard(student_id)
+        live.course_changed(db, course_id)
+        http_cache.bump(("course", course_id))
+        log_audit(me.id, "ENROLL", course_id, "REMOVE_STUDENT", str(student_id))
     return {"msg": "Removed"}
 
-@app.get("/admin/audit-logs", response_model=list[schemas.AuditLogResponse])
-def get_audit_logs(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+# 최신순, since 이상 until 미만 / archived=true 이면 보관 테이블(archive_audit.py 로 옮긴 이전 학기분)에서 검색
+@app.get("/admin/audit-logs", response_model=schemas.AuditLogPage)
+def get_audit_logs(actor_id: Optional[int] = None, target_type: Optional[str] = None, target_id: Optional[int] = None,
+                   action: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   archived: bool = False, cursor: Optional[str] = None, limit: int = listing.PAGE_DEFAULT,
+                   current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "ADMIN": raise HTTPException(status_code=403)
-    return db.query(models.AuditLog).order_by(models.AuditLog.created_at.desc()).limit(100).all()
+    model = models.AuditLogArchive if archived else models.AuditLog
+    try:
+        return listing.audit_page(db, model, actor_id, target_type, target_id, action, since, until, cursor, limit)
+    except ValueError:
+        raise HTTPException(400, detail="잘못된 cursor")
+
+# 4. 학기 달력 (학기/공휴일 관리, 보강일 일괄 이동)
+@app.get("/admin/semesters", response_model=list[schemas.SemesterResponse])
+def get_semesters(me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if me.role != "ADMIN": raise HTTPException(403)
+    return db.query(models.Semester).order_by(models.Semester.start_date.desc()).all()
+
+# 개강일/주차 수 변경은 이후 개설되는 강의부터 적용, 공휴일은 기존 주차에도 반영
+@app.post("/admin/semesters", response_model=schemas.SemesterResponse)
+def save_semester(s: schemas.SemesterCreate, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if me.role != "ADMIN": raise HTTPException(403)
+    sem = db.query(models.Semester).filter(models.Semester.code == s.code).first()
+    if not sem:
+        sem = models.Semester(code=s.code)
+        db.add(sem)
+    sem.start_date, sem.weeks = s.start_date, s.weeks
+    db.flush()
+    semesters.set_holidays(db, sem, [(h.date, h.name) for h in s.holidays])
+    db.commit()
+    http_cache.bump_all()  # 학기 전체 강의의 주차가 바뀜
+    log_audit(me.id, "SEMESTER", sem.id, "SAVE", f"{s.code} ({s.start_date}, {s.weeks}주, 공휴일 {len(s.holidays)}일)")
+    db.refresh(sem)
+    return sem
+
+@app.put("/admin/semesters/{code}/holidays")
+def update_holidays(code: str, holidays: list[schemas.HolidayItem], me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if me.role != "ADMIN": raise HTTPException(403)
+    sem = semesters.get_semester(db, code)
+    if not sem: raise HTTPException(404, detail="등록되지 않은 학기")
+    updated = semesters.set_holidays(db, sem, [(h.date, h.name) for h in holidays])
+    db.commit()
+    http_cache.bump_all()
+    log_audit(me.id, "SEMESTER", sem.id, "HOLIDAYS", f"{code}: {len(holidays)}일")
+    return {"msg": "Updated", "sessions": updated}
+
+@app.post("/admin/semesters/{code}/reschedule")
+def reschedule_semester(code: str, r: schemas.RescheduleRequest, me: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if me.role != "ADMIN": raise HTTPException(403)
+    sem = semesters.get_semester(db, code)
+    if not sem: raise HTTPException(404, detail="등록되지 않은 학기")
+    moved = semesters.reschedule(db, sem, r.from_date, r.to_date)
+    db.commit()
+    http_cache.bump_all()
+    log_audit(me.id, "SEMESTER", sem.id, "RESCHEDULE", f"{code}: {r.from_date} -> {r.to_date} ({len(moved)}개 주차)")
+    return {"msg": "Rescheduled", "moved": len(moved)}
 
 @app.get("/admin/system-status")
-def get_system_status(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def get_system_status(current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "ADMIN": raise HTTPException(status_code=403)
-    user_count = db.query(models.User).count()
-    course_count = db.query(models.Course).count()
-    return {"status": "OK", "database": "Connected", "users": user_count, "courses": course_count, "server_time": datetime.now()}
+    overview = stats.get_overview(db)
+    return {"status": "OK", "database": "Connected", "users": overview["users"], "courses": overview["courses"],
+            "audit": audit_writer.metrics(), "checkin": checkin_pipeline.metrics(),
+            "db_pool": {name: m.status() for name, m in pool_monitors.items()},
+            "requests": metrics.summary(collect_metrics()[0]), "server_time": datetime.now()}
+
+def metric_gauges():
+    pools = {name: m.status() for name, m in pool_monitors.items()}
+    return {"audit_queue_depth": ("감사 로그 큐 대기 건수", audit_writer.pending()),
+            "checkin_queue_depth": ("출석 기록 큐 대기 건수", checkin_pipeline.pending()),
+            "checkin_failed_rows": ("저장을 포기한 출석 기록 수 (CHECKIN_DEADLETTER 파일)", checkin_pipeline.metrics()["failed"]),
+            "db_pool_checked_out": ("사용 중인 DB 커넥션 수", [({"engine": n}, p.get("checked_out", 0)) for n, p in pools.items()]),
+            "db_pool_saturation": ("DB 커넥션 풀 사용률", [({"engine": n}, p.get("saturation", 0.0)) for n, p in pools.items()])}
+
+# 워커가 여럿이면 워커별 스냅숏을 METRICS_DIR 에 쓰고 합산해서 노출 (metrics.py 참고), 워커 하나면 이 프로세스 값 그대로
+metrics_exporter = metrics.Exporter(metrics.METRICS_DIR, gauges=metric_gauges) if metrics.METRICS_DIR else None
+
+def collect_metrics():
+    if metrics_exporter is None: return metrics.registry, metric_gauges()
+    metrics_exporter.write()   # 응답하는 워커는 방금 값으로
+    return metrics.collect(metrics.METRICS_DIR)
+
+# [NEW] Prometheus 수집용 (nginx 에서 외부 접근 차단, 내부망에서 app:8000/metrics 로 수집, 모든 워커 합산)
+@app.get("/metrics")
+async def get_metrics():
+    registry, extra = await run_in_threadpool(collect_metrics)
+    return Response(metrics.render(registry, extra=extra), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # ==========================================
 # [Instructor] 교원 영역
 # ==========================================
+# [NEW] 아래 조회 API 들은 http_cache 로 ETag/304 처리 (변경 API 에서 강의별 버전을 올림)
 @app.get("/instructor/dashboard", response_model=list[schemas.CourseResponse])
-def get_instructor_dashboard(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+async def get_instructor_dashboard(request: Request, current_user: auth.Principal = Depends(auth.get_current_user_async), db = Depends(get_async_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(status_code=403, detail="권한 없음")
-    return db.query(models.Course).filter(models.Course.instructor_id == current_user.id).all()
+    build = lambda: db.run_sync(lambda s: s.query(models.Course).filter(models.Course.instructor_id == current_user.id).all())
+    return await http_cache.respond(request, ["courses"], ("instructor_dashboard", current_user.id), build, list[schemas.CourseResponse])
 
 @app.post("/instructor/courses/{course_id}/sessions", response_model=schemas.SessionResponse)
-def create_session_instructor(course_id: int, session: schemas.SessionCreate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def create_session_instructor(course_id: int, session: schemas.SessionCreate, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(status_code=403, detail="권한 없음")
     new_session = models.ClassSession(course_id=course_id, week_number=session.week_number, session_date=session.session_date, attendance_method=session.attendance_method)
     db.add(new_session)
     db.commit()
+    reports.invalidate_course_dashboards(db, course_id)
+    http_cache.bump(("course", course_id))
     return new_session
 
 @app.get("/instructor/courses/{course_id}/sessions")
-def get_instructor_sessions(course_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    return db.query(models.ClassSession).filter(models.ClassSession.course_id == course_id).all()
+async def get_instructor_sessions(course_id: int, request: Request, current_user: auth.Principal = Depends(auth.get_current_user_async), db = Depends(get_async_db)):
+    build = lambda: db.run_sync(lambda s: s.query(models.ClassSession).filter(models.ClassSession.course_id == course_id).all())
+    return await http_cache.respond(request, [("course", course_id)], ("instructor_sessions", course_id), build)
 
 @app.patch("/sessions/{session_id}/status")
-def update_session_status(session_id: int, is_open: bool, method: str, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_session_status(session_id: int, is_open: bool, method: str, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(status_code=403, detail="권한 없음")
     session = db.query(models.ClassSession).filter(models.ClassSession.id == session_id).first()
     session.is_open = is_open
@@ -322,52 +522,74 @@ def update_session_status(session_id: int, is_open: bool, method: str, current_u
     if is_open and method == 'AUTH_CODE' and not session.auth_code:
         session.auth_code = ''.join(random.choices(string.digits, k=4))
     db.commit()
-    log_audit(db, current_user.id, "SESSION", session.id, "UPDATE_STATUS", f"{is_open}")
+    checkin_pipeline.forget(session.id)
+    http_cache.bump(("course", session.course_id))
+    if is_open: live.open_session(db, session)
+    else: live.close_session(session.id)
+    publish_session_state(session)
+    publish_stat(session.id)
+    log_audit(current_user.id, "SESSION", session.id, "UPDATE_STATUS", f"{is_open}")
     return {"message": "상태 변경 완료", "auth_code": session.auth_code}
 
 @app.get("/sessions/{session_id}/stat")
-def get_session_live_stat(session_id: int, db: Session = Depends(get_db)):
-    session = db.query(models.ClassSession).filter(models.ClassSession.id == session_id).first()
-    total_students = db.query(models.Enrollment).filter(models.Enrollment.course_id == session.course_id).count()
-    attended_count = db.query(models.Attendance).filter(models.Attendance.session_id == session_id, models.Attendance.status.in_([1, 4])).count()
-    return {"total": total_students, "attended": attended_count, "auth_code": session.auth_code}
+async def get_session_live_stat(session_id: int, db = Depends(get_async_db)):
+    stat = live.peek(session_id)  # 카운터가 있으면 DB 접근 없이 응답
+    if stat is None: stat = await db.run_sync(live.get_stat, session_id)
+    if stat is None: raise HTTPException(status_code=404, detail="수업 없음")
+    return stat
+
+# [NEW] 실시간 푸시 (SSE): 출석 집계/투표 집계/세션 상태 변경을 폴링 없이 전달
+def session_snapshot(db, session_id):
+    try:
+        session = db.query(models.ClassSession).filter(models.ClassSession.id == session_id).first()
+        if not session: return None
+        return [("session", session_state(session)),
+                ("stat", live.get_stat(db, session_id)),
+                ("vote", reports.vote_tally(db, session_id))]
+    finally:
+        db.close()  # 스트림이 열려있는 동안 DB 커넥션을 잡고 있지 않도록 반환
+
+@app.get("/sessions/{session_id}/events")
+async def session_events(session_id: int, request: Request, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if current_user.role != "INSTRUCTOR": raise HTTPException(status_code=403, detail="권한 없음")
+    sub = events.broker.subscribe([f"session:{session_id}"])
+    initial = await run_in_threadpool(session_snapshot, db, session_id)
+    if initial is None:
+        events.broker.unsubscribe(sub)
+        raise HTTPException(status_code=404, detail="수업 없음")
+    return StreamingResponse(events.stream(request, sub, initial), media_type="text/event-stream", headers=events.SSE_HEADERS)
+
+@app.get("/instructor/sessions/{session_id}/votes")
+def get_session_votes(session_id: int, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    if current_user.role != "INSTRUCTOR": raise HTTPException(status_code=403, detail="권한 없음")
+    return reports.vote_tally(db, session_id)
 
 @app.get("/instructor/sessions/{session_id}/attendances")
-def get_session_attendances(session_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def get_session_attendances(session_id: int, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(status_code=403, detail="권한 없음")
     session = db.query(models.ClassSession).filter(models.ClassSession.id == session_id).first()
-    enrollments = db.query(models.Enrollment).filter(models.Enrollment.course_id == session.course_id).all()
-    roster = []
-    vote_y = 0
-    vote_n = 0
-    for enroll in enrollments:
-        student = db.query(models.User).filter(models.User.id == enroll.user_id).first()
-        att = db.query(models.Attendance).filter_by(session_id=session_id, student_id=student.id).first()
-        if att and att.vote_response == 'Y': vote_y += 1
-        if att and att.vote_response == 'N': vote_n += 1
-        roster.append({
-            "student_id": student.id, 
-            "student_number": student.student_number, 
-            "student_name": student.name,
-            "email": student.email, 
-            "status": att.status if att else 0, 
-            "proof_file": att.proof_file if att else None,
-            "appeal_reason": att.appeal_reason if att else None
-        })
-    return {"roster": roster, "vote_stat": {"Y": vote_y, "N": vote_n}}
+    if not session: raise HTTPException(status_code=404, detail="수업 없음")
+    return reports.build_session_roster(db, session)
 
 @app.patch("/instructor/sessions/{session_id}/attendances")
-def update_attendance_manual(session_id: int, update_data: schemas.AttendanceUpdate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_attendance_manual(session_id: int, update_data: schemas.AttendanceUpdate, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(status_code=403, detail="권한 없음")
+    checkin_pipeline.settle(db, session_id, update_data.student_id)
     att = db.query(models.Attendance).filter_by(session_id=session_id, student_id=update_data.student_id).first()
+    old_status = att.status if att else None
     if att: att.status = update_data.status
     else: db.add(models.Attendance(session_id=session_id, student_id=update_data.student_id, status=update_data.status))
     db.commit()
-    log_audit(db, current_user.id, "ATTENDANCE", session_id, "MANUAL_UPDATE", f"Student {update_data.student_id} -> {update_data.status}")
+    reports.invalidate_dashboard(update_data.student_id)
+    http_cache.bump_sessions(db, session_id)
+    checkin_pipeline.mark_seen(session_id, update_data.student_id)
+    live.status_changed(session_id, old_status, update_data.status)
+    publish_stat(session_id)
+    log_audit(current_user.id, "ATTENDANCE", session_id, "MANUAL_UPDATE", f"Student {update_data.student_id} -> {update_data.status}")
     return {"message": "수정되었습니다."}
 
 @app.patch("/instructor/sessions/{session_id}/date")
-def update_session_date(session_id: int, date_data: schemas.SessionUpdate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_session_date(session_id: int, date_data: schemas.SessionUpdate, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(403)
     session = db.query(models.ClassSession).filter(models.ClassSession.id == session_id).first()
     if not session: raise HTTPException(404)
@@ -376,177 +598,178 @@ def update_session_date(session_id: int, date_data: schemas.SessionUpdate, curre
     session.session_date = date_data.session_date
     session.is_holiday = False 
     db.commit()
-    log_audit(db, current_user.id, "SESSION", session_id, "RESCHEDULE", str(date_data.session_date))
+    http_cache.bump(("course", session.course_id))
+    log_audit(current_user.id, "SESSION", session_id, "RESCHEDULE", str(date_data.session_date))
     return {"msg": "Updated"}
 
 @app.get("/instructor/courses/{course_id}/stack_report")
-def get_stack_report(course_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def get_stack_report(course_id: int, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(403)
-    sessions = db.query(models.ClassSession).filter_by(course_id=course_id).all()
-    weekly_rates = []
-    total_enroll = db.query(models.Enrollment).filter_by(course_id=course_id).count()
-    for s in sessions:
-        if total_enroll == 0:
-            weekly_rates.append(0)
-            continue
-        attended = db.query(models.Attendance).filter(models.Attendance.session_id == s.id, models.Attendance.status.in_([1, 4])).count()
-        weekly_rates.append(round((attended / total_enroll) * 100, 1))
-
-    total_req = db.query(models.Attendance).join(models.ClassSession).filter(models.ClassSession.course_id == course_id, models.Attendance.proof_file != None).count()
-    approved = db.query(models.Attendance).join(models.ClassSession).filter(models.ClassSession.course_id == course_id, models.Attendance.status == 4).count()
-    approval_rate = round((approved / total_req * 100), 1) if total_req > 0 else 0.0
-
-    students = db.query(models.User).join(models.Enrollment).filter(models.Enrollment.course_id == course_id).all()
-    risk_list = []
-    for stu in students:
-        atts = db.query(models.Attendance).join(models.ClassSession).filter(models.ClassSession.course_id == course_id, models.Attendance.student_id == stu.id).all()
-        absent = 0
-        late = 0
-        consecutive_late = 0
-        max_consecutive_late = 0
-        for a in atts:
-            if a.status == 3: absent += 1
-            if a.status == 2: 
-                late += 1
-                consecutive_late += 1
-            else: consecutive_late = 0
-            max_consecutive_late = max(max_consecutive_late, consecutive_late)
-        converted = absent + (late // 3)
-        is_risk = (converted >= 3) or (max_consecutive_late >= 2)
-        risk_list.append({"student_name": stu.name, "total_absent": absent, "total_late": late, "converted_absent": converted, "is_risk": is_risk})
-        
-    risk_list.sort(key=lambda x: x['converted_absent'], reverse=True)
-    return {"weekly_attendance": weekly_rates, "official_approval_rate": approval_rate, "risk_group": risk_list}
+    return analytics.stack_report(db, course_id)
 
 class NoticeUpdate(BaseModel):
     notice: str
 
 @app.patch("/instructor/courses/{course_id}/notice")
-def update_course_notice(course_id: int, notice_data: NoticeUpdate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def update_course_notice(course_id: int, notice_data: NoticeUpdate, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(403)
     course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if course.instructor_id != current_user.id: raise HTTPException(403)
     course.notice = notice_data.notice
     db.commit()
-    log_audit(db, current_user.id, "COURSE", course_id, "UPDATE_NOTICE")
+    reports.invalidate_course_dashboards(db, course_id)
+    log_audit(current_user.id, "COURSE", course_id, "UPDATE_NOTICE")
     return {"msg": "Notice updated"}
 
 @app.patch("/instructor/sessions/{session_id}/vote")
-def toggle_vote(session_id: int, is_voting: bool, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def toggle_vote(session_id: int, is_voting: bool, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if current_user.role != "INSTRUCTOR": raise HTTPException(403)
     session = db.query(models.ClassSession).filter_by(id=session_id).first()
     session.is_voting = is_voting
     db.commit()
-    log_audit(db, current_user.id, "SESSION", session_id, "VOTE_TOGGLE", str(is_voting))
+    http_cache.bump(("course", session.course_id))
+    publish_session_state(session)
+    log_audit(current_user.id, "SESSION", session_id, "VOTE_TOGGLE", str(is_voting))
     return {"msg": "Vote status changed"}
 
 # ==========================================
 # [Student] 학생 영역
 # ==========================================
 @app.post("/courses/{course_id}/enroll")
-def enroll_course(course_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def enroll_course(course_id: int, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if db.query(models.Enrollment).filter_by(user_id=current_user.id, course_id=course_id).first():
         raise HTTPException(status_code=400, detail="이미 수강 중")
     db.add(models.Enrollment(user_id=current_user.id, course_id=course_id))
-    db.commit()
+    try: db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="이미 수강 중")
+    reports.invalidate_dashboard(current_user.id)
+    live.course_changed(db, course_id)
+    http_cache.bump(("course", course_id))
     return {"message": "수강신청 완료"}
 
 @app.get("/student/dashboard")
-def get_student_dashboard_enhanced(current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    enrollments = db.query(models.Enrollment).filter(models.Enrollment.user_id == current_user.id).all()
-    dashboard_data = []
-    for enroll in enrollments:
-        course = db.query(models.Course).filter(models.Course.id == enroll.course_id).first()
-        total_sessions = db.query(models.ClassSession).filter(models.ClassSession.course_id == course.id).count()
-        absent_count = db.query(models.Attendance).join(models.ClassSession).filter(models.ClassSession.course_id == course.id, models.Attendance.student_id == current_user.id, models.Attendance.status == 3).count()
-        attended_count = db.query(models.Attendance).join(models.ClassSession).filter(models.ClassSession.course_id == course.id, models.Attendance.student_id == current_user.id, models.Attendance.status.in_([1, 4])).count()
-        rate = (attended_count / total_sessions * 100) if total_sessions > 0 else 0.0
-        is_warning = (absent_count >= 2)
-        dashboard_data.append({
-            "course_id": course.id, "course_title": course.title, "semester": course.semester,
-            "notice": course.notice, "attendance_rate": round(rate, 1), "is_warning": is_warning
-        })
-    return dashboard_data
+async def get_student_dashboard_enhanced(current_user: auth.Principal = Depends(auth.get_current_user_async), db = Depends(get_async_db)):
+    # 버전 확인(Redis)은 이벤트 루프 밖에서, 만드는 것만 run_sync
+    lookup = reports.cached_dashboard
+    token, data = await run_in_threadpool(lookup, current_user.id) if reports.dashboard_versions.shared else lookup(current_user.id)
+    if data is None:
+        data = await db.run_sync(reports.build_student_dashboard, current_user.id)
+        reports.dashboard_cache.set(current_user.id, (token, data))
+    return data
+
+# [NEW] 학생용 실시간 푸시: 수강 중인 강의의 출석 시작/투표 시작 알림
+def student_live_sessions(db, course_ids):
+    try:
+        if not course_ids: return []
+        live_sessions = db.query(models.ClassSession).filter(
+            models.ClassSession.course_id.in_(course_ids), (models.ClassSession.is_open == True) | (models.ClassSession.is_voting == True)
+        ).all()
+        return [("session", session_state(s)) for s in live_sessions]
+    finally:
+        db.close()
+
+def student_course_ids(db, user_id):
+    return [cid for (cid,) in db.query(models.Enrollment.course_id).filter(models.Enrollment.user_id == user_id)]
+
+@app.get("/student/events")
+async def student_events(request: Request, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    course_ids = await run_in_threadpool(student_course_ids, db, current_user.id)
+    sub = events.broker.subscribe([f"course:{cid}" for cid in course_ids])
+    initial = await run_in_threadpool(student_live_sessions, db, course_ids)
+    return StreamingResponse(events.stream(request, sub, initial), media_type="text/event-stream", headers=events.SSE_HEADERS)
+
+# 느린 폴링 fallback (EventSource 미지원, 또는 푸시가 다른 워커에서 발행돼 전달되지 않는 경우 대비)
+@app.get("/student/live")
+def student_live(current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    return [data for _, data in student_live_sessions(db, student_course_ids(db, current_user.id))]
 
 @app.post("/student/sessions/{session_id}/attend")
-def attend_student(session_id: int, code: str = None, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    session = db.query(models.ClassSession).filter(models.ClassSession.id == session_id).first()
-    if not session: raise HTTPException(status_code=404, detail="수업 없음")
-    if not session.is_open: raise HTTPException(status_code=400, detail="출석체크 시간이 아닙니다.")
-    if session.attendance_method == 'AUTH_CODE':
-        if not code: raise HTTPException(status_code=400, detail="인증번호 필요")
-        if code != session.auth_code: raise HTTPException(status_code=400, detail="인증번호 불일치")
-    if db.query(models.Attendance).filter_by(session_id=session_id, student_id=current_user.id).first():
-        raise HTTPException(status_code=400, detail="이미 출석하셨습니다.")
-    db.add(models.Attendance(session_id=session_id, student_id=current_user.id, status=1))
-    db.commit()
+async def attend_student(session_id: int, code: str = None, current_user: auth.Principal = Depends(auth.get_current_user_async), db = Depends(get_async_db)):
+    # 검증은 캐시된 세션 정보로, 저장은 백그라운드 배치로 (checkin.py, 큐/Redis 대기는 이벤트 루프 밖에서)
+    await checkin_pipeline.check_in_async(db, session_id, current_user.id, code)
     return {"status": "출석 완료"}
 
 @app.get("/student/courses/{course_id}/sessions")
-def get_student_sessions(course_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    sessions = db.query(models.ClassSession).filter(models.ClassSession.course_id == course_id).all()
-    result = []
-    for s in sessions:
-        att = db.query(models.Attendance).filter_by(session_id=s.id, student_id=current_user.id).first()
-        result.append({
-            "id": s.id, "week_number": s.week_number, "session_date": s.session_date, 
-            "is_open": s.is_open, "is_voting": s.is_voting, "attendance_method": s.attendance_method, 
-            "my_status": att.status if att else 0
-        })
-    return result
+async def get_student_sessions(course_id: int, request: Request, current_user: auth.Principal = Depends(auth.get_current_user_async), db = Depends(get_async_db)):
+    build = lambda: db.run_sync(reports.build_student_sessions, course_id, current_user.id)
+    return await http_cache.respond(request, [("course", course_id)], ("student_sessions", course_id, current_user.id), build)
 
-@app.get("/courses/{course_id}/report", response_model=schemas.CourseReportResponse)
-def get_course_report(course_id: int, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def find_report_course(db: Session, course_id: int):
     course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if not course: raise HTTPException(status_code=404, detail="강의가 없습니다.")
-    enrollments = db.query(models.Enrollment).filter(models.Enrollment.course_id == course_id).all()
     total_sessions = db.query(models.ClassSession).filter(models.ClassSession.course_id == course_id).count()
-    report_list = []
-    for enrollment in enrollments:
-        student = db.query(models.User).filter(models.User.id == enrollment.user_id).first()
-        attended_count = db.query(models.Attendance).join(models.ClassSession).filter(models.ClassSession.course_id == course_id, models.Attendance.student_id == student.id, models.Attendance.status.in_([1, 4])).count()
-        rate = (attended_count / total_sessions * 100) if total_sessions > 0 else 0.0
-        report_list.append(schemas.StudentReport(student_name=student.name, total_sessions=total_sessions, attended_count=attended_count, attendance_rate=round(rate, 1)))
-    return schemas.CourseReportResponse(course_title=course.title, reports=report_list)
+    return course, total_sessions
 
-@app.post("/student/sessions/{session_id}/excuse")
-def apply_excuse(session_id: int, file: UploadFile = File(...), current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
-    file_ext = file.filename.split(".")[-1]
-    file_name = f"{current_user.id}_{session_id}_{int(time.time())}.{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, file_name)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    att = db.query(models.Attendance).filter_by(session_id=session_id, student_id=current_user.id).first()
+def build_report(db: Session, course_id: int):
+    return reports.build_course_report(db, *find_report_course(db, course_id))
+
+@app.get("/courses/{course_id}/report", response_model=schemas.CourseReportResponse)
+async def get_course_report(course_id: int, request: Request, stream: Optional[str] = None, current_user: auth.Principal = Depends(auth.get_current_user_async), db = Depends(get_async_db)):
+    # [NEW] ?stream=json|csv : 대형 강의 리포트를 행 단위로 스트리밍
+    if stream in ("json", "csv"):
+        course, total_sessions = await db.run_sync(find_report_course, course_id)
+        body = reports.stream_course_report(SessionLocal, course_id, course.title, total_sessions, stream)
+        media_type = "text/csv; charset=utf-8" if stream == "csv" else "application/json"
+        return StreamingResponse(body, media_type=media_type)
+    build = lambda: db.run_sync(build_report, course_id)
+    return await http_cache.respond(request, [("course", course_id)], ("course_report", course_id), build, schemas.CourseReportResponse)
+
+def record_excuse(db: Session, session_id: int, student_id: int, file_name: str):
+    att = db.query(models.Attendance).filter_by(session_id=session_id, student_id=student_id).first()
     if not att:
-        att = models.Attendance(session_id=session_id, student_id=current_user.id)
+        att = models.Attendance(session_id=session_id, student_id=student_id)
         db.add(att)
+    old_status = att.status
     att.status = 5
     att.proof_file = file_name
     db.commit()
+    return old_status, http_cache.session_course_ids(db, session_id)
+
+# [NEW] 파일은 청크 단위로 해시하며 저장 (내용이 같으면 같은 파일), 크기 제한은 storage.UploadSizeLimit 에서 먼저 적용
+@app.post("/student/sessions/{session_id}/excuse")
+async def apply_excuse(session_id: int, file: UploadFile = File(...), current_user: auth.Principal = Depends(auth.get_current_user_async), db = Depends(get_async_db)):
+    file_name, _ = await storage.save_upload(file)
+    # settle 의 커밋 대기와 Redis 호출은 스레드풀에서, DB 단계만 run_sync (DB_MODE=async 면 이벤트 루프 스레드)
+    await checkin_pipeline.settle_async(db, session_id, current_user.id)
+    old_status, course_ids = await db.run_sync(record_excuse, session_id, current_user.id, file_name)
+    await run_in_threadpool(after_excuse, session_id, current_user.id, old_status, course_ids)
     return {"msg": "Uploaded", "path": file_name}
 
+def after_excuse(session_id: int, student_id: int, old_status, course_ids):
+    http_cache.bump(*(("course", cid) for cid in course_ids))
+    reports.invalidate_dashboard(student_id)
+    checkin_pipeline.mark_seen(session_id, student_id)
+    live.status_changed(session_id, old_status, 5)
+
 class AppealCreate(BaseModel):
     reason: str
 
 @app.post("/student/sessions/{session_id}/appeal")
-def create_appeal(session_id: int, appeal: AppealCreate, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def create_appeal(session_id: int, appeal: AppealCreate, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+    checkin_pipeline.settle(db, session_id, current_user.id)
     att = db.query(models.Attendance).filter_by(session_id=session_id, student_id=current_user.id).first()
     if not att:
         att = models.Attendance(session_id=session_id, student_id=current_user.id, status=0)
         db.add(att)
     att.appeal_reason = appeal.reason
     db.commit()
-    log_audit(db, current_user.id, "ATTENDANCE", att.id, "APPEAL", appeal.reason)
+    checkin_pipeline.mark_seen(session_id, current_user.id)
+    log_audit(current_user.id, "ATTENDANCE", att.id, "APPEAL", appeal.reason)
     return {"msg": "Appeal sent"}
 
 @app.post("/student/sessions/{session_id}/vote")
-def cast_vote(session_id: int, vote: str, current_user: models.User = Depends(auth.get_current_user), db: Session = Depends(get_db)):
+def cast_vote(session_id: int, vote: str, current_user: auth.Principal = Depends(auth.get_current_user), db: Session = Depends(get_db)):
     if vote not in ['Y', 'N']: raise HTTPException(400)
+    checkin_pipeline.settle(db, session_id, current_user.id)
     att = db.query(models.Attendance).filter_by(session_id=session_id, student_id=current_user.id).first()
     if not att:
         att = models.Attendance(session_id=session_id, student_id=current_user.id)
         db.add(att)
     att.vote_response = vote
     db.commit()
-    log_audit(db, current_user.id, "VOTE", session_id, "CAST_VOTE", vote)
+    checkin_pipeline.mark_seen(session_id, current_user.id)
+    events.broker.publish(f"session:{session_id}", "vote", reports.vote_tally(db, session_id))
+    log_audit(current_user.id, "VOTE", session_id, "CAST_VOTE", vote)
     return {"msg": "Voted"}
\ No newline at end of file
@@ -0,0 +1,265 @@
+# metrics.py
+# 요청/SQL 지표 수집 + Prometheus 텍스트 형식 노출 (GET /metrics, 외부 라이브러리 없음)
+# - 미들웨어: 라우트(경로 템플릿)별 지연 히스토그램, 상태 코드별 건수, 처리 중 요청 수
+# - SQLAlchemy 이벤트: 요청마다 실행한 SQL 문 수와 DB 시간 -> 라우트별 "요청당 쿼리 수" 히스토그램
+#   (학생 수만큼 쿼리가 늘어나는 N+1 이 있으면 해당 라우트의 분포가 오른쪽으로 밀림)
+#   요청 밖(출석/감사 로그 writer 등 백그라운드 스레드)에서 실행된 SQL 은 background_* 로 따로 집계
+# - 관리자 system-status 에는 summary() 요약 (느린 라우트, 쿼리가 많은 라우트)
+# 워커가 여럿이면(METRICS_DIR 지정, serve.py 가 설정) 워커마다 METRICS_INTERVAL 초마다 METRICS_DIR/<pid>.json 에 스냅숏을 쓰고
+#   /metrics 를 받은 워커가 모든 파일을 합산해서 응답 (app:8000 이 어느 워커로 가도 같은 누적값, 카운터가 줄지 않음)
+#   끝난 워커의 파일도 남겨 카운터에 계속 포함, 처리 중 요청 수와 게이지(extra)는 살아있는 워커만
+import contextvars
+import json
+import os
+import threading
+import time
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+UNMATCHED = "unmatched"   # 라우트가 없는 경로는 하나로 묶음 (라벨 수 폭증 방지)
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_INTERVAL = 5
+
+_request_sql = contextvars.ContextVar("request_sql", default=None)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # 마지막 칸 = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]: i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        # 버킷 경계 기준 근사값 (해당 분위가 속한 버킷의 상한, 마지막 경계를 넘으면 마지막 경계)
+        if not self.count: return 0.0
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target: return bound
+        return self.buckets[-1]
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.in_flight = 0
+            self.requests = {}      # (method, route, status) -> 건수
+            self.latency = {}       # (method, route) -> Histogram
+            self.queries = {}       # (method, route) -> Histogram (요청당 SQL 문 수)
+            self.db_seconds = {}    # (method, route) -> DB 시간 합
+            self.background = [0, 0.0]   # 요청 밖 SQL [문 수, 시간]
+            self.started = time.time()
+
+    def begin(self):
+        with self._lock: self.in_flight += 1
+
+    def end(self, method, route, status, seconds, n_sql, sql_seconds):
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_BUCKETS)).observe(n_sql)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + sql_seconds
+
+    def observe_background(self, seconds):
+        with self._lock:
+            self.background[0] += 1
+            self.background[1] += seconds
+
+    # --- 워커 간 합산 ---
+    def snapshot(self):
+        hist = lambda h: {"counts": h.counts, "sum": h.sum, "count": h.count}
+        with self._lock:
+            return {"in_flight": self.in_flight, "started": self.started, "background": list(self.background),
+                    "requests": [[list(k), n] for k, n in self.requests.items()],
+                    "latency": [[list(k), hist(h)] for k, h in self.latency.items()],
+                    "queries": [[list(k), hist(h)] for k, h in self.queries.items()],
+                    "db_seconds": [[list(k), v] for k, v in self.db_seconds.items()]}
+
+    def merge(self, snap, live=True):
+        def add_hist(target, buckets, key, data):
+            h = target.setdefault(key, Histogram(buckets))
+            h.counts = [a + b for a, b in zip(h.counts, data["counts"])]
+            h.sum += data["sum"]
+            h.count += data["count"]
+        with self._lock:
+            if live: self.in_flight += snap["in_flight"]
+            self.started = min(self.started, snap["started"])
+            self.background[0] += snap["background"][0]
+            self.background[1] += snap["background"][1]
+            for k, n in snap["requests"]: self.requests[tuple(k)] = self.requests.get(tuple(k), 0) + n
+            for k, data in snap["latency"]: add_hist(self.latency, LATENCY_BUCKETS, tuple(k), data)
+            for k, data in snap["queries"]: add_hist(self.queries, QUERY_BUCKETS, tuple(k), data)
+            for k, v in snap["db_seconds"]: self.db_seconds[tuple(k)] = self.db_seconds.get(tuple(k), 0.0) + v
+
+registry = Registry()
+
+# --- 요청 미들웨어 (ASGI) ---
+class RequestMetrics:
+    def __init__(self, app, registry=registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        sql = [0, 0.0]   # 이 요청의 [SQL 문 수, DB 시간] (스레드풀로 넘어가도 contextvar 로 전달됨)
+        token = _request_sql.set(sql)
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start": status = message["status"]
+            await send(message)
+        self.registry.begin()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_sql.reset(token)
+            route = scope.get("route")
+            self.registry.end(scope["method"], getattr(route, "path", UNMATCHED), status, time.perf_counter() - t0, sql[0], sql[1])
+
+# --- SQL 이벤트 ---
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["metrics_t0"] = time.perf_counter()
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    t0 = conn.info.pop("metrics_t0", None)
+    if t0 is None: return
+    seconds = time.perf_counter() - t0
+    sql = _request_sql.get()
+    if sql is None:
+        registry.observe_background(seconds)
+    else:
+        sql[0] += 1
+        sql[1] += seconds
+
+def instrument(engine):
+    if event.contains(engine, "before_cursor_execute", _before_execute): return
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+
+# --- 워커 간 합산 (METRICS_DIR) ---
+def _alive(pid):
+    try: os.kill(pid, 0)
+    except ProcessLookupError: return False
+    except PermissionError: pass
+    return True
+
+class Exporter:
+    # gauges: 이 워커의 게이지를 돌려주는 함수 {이름: (설명, 값 또는 [(라벨, 값), ...])} (render 의 extra 형식)
+    def __init__(self, directory, registry=registry, gauges=None, interval=METRICS_INTERVAL):
+        self.directory = directory
+        self.registry = registry
+        self.gauges = gauges
+        self.interval = interval
+        self.path = os.path.join(directory, f"{os.getpid()}.json")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        data = {"pid": os.getpid(), "registry": self.registry.snapshot(), "gauges": self.gauges() if self.gauges else {}}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f: json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try: self.write()
+            except Exception as e: print(f"지표 스냅숏 저장 실패: {e}")
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.write()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(self.interval)
+        self.write()   # 마지막 누적값을 남김 (카운터가 줄지 않도록)
+
+# 모든 워커의 스냅숏 합산: (합친 Registry, 워커별 pid 라벨을 붙인 게이지)
+def collect(directory):
+    merged, gauges = Registry(), {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"): continue
+        try:
+            with open(os.path.join(directory, name)) as f: data = json.load(f)
+        except (OSError, ValueError):
+            continue   # 쓰는 중인 파일 등은 다음 수집 때
+        live = _alive(data["pid"])
+        merged.merge(data["registry"], live)
+        if not live: continue
+        for gname, (help_text, value) in data["gauges"].items():
+            values = value if isinstance(value, list) else [({}, value)]
+            gauges.setdefault(gname, (help_text, []))[1].extend((dict(labels, pid=data["pid"]), v) for labels, v in values)
+    return merged, gauges
+
+# --- 노출 ---
+def _labels(**kw):
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in kw.items()) + "}"
+
+def _histogram_lines(name, hist, **labels):
+    lines, cumulative = [], 0
+    for bound, n in zip(hist.buckets, hist.counts):
+        cumulative += n
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {hist.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {hist.sum:.6f}")
+    lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+    return lines
+
+def render(registry=registry, extra=None):
+    # extra: {지표 이름: (설명, 값 또는 [(라벨, 값), ...])} - 큐 깊이, 커넥션 풀 사용량 등 게이지
+    with registry._lock:
+        out = ["# HELP http_requests_in_flight 처리 중인 요청 수", "# TYPE http_requests_in_flight gauge",
+               f"http_requests_in_flight {registry.in_flight}",
+               "# HELP http_requests_total 요청 수 (라우트/상태 코드별)", "# TYPE http_requests_total counter"]
+        for (method, route, status), n in sorted(registry.requests.items()):
+            out.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {n}")
+        out += ["# HELP http_request_duration_seconds 요청 처리 시간", "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), hist in sorted(registry.latency.items()):
+            out += _histogram_lines("http_request_duration_seconds", hist, method=method, route=route)
+        out += ["# HELP http_request_sql_statements 요청당 SQL 문 수", "# TYPE http_request_sql_statements histogram"]
+        for (method, route), hist in sorted(registry.queries.items()):
+            out += _histogram_lines("http_request_sql_statements", hist, method=method, route=route)
+        out += ["# HELP http_request_db_seconds_total 요청 처리 중 DB 시간 합", "# TYPE http_request_db_seconds_total counter"]
+        for (method, route), seconds in sorted(registry.db_seconds.items()):
+            out.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {seconds:.6f}")
+        out += ["# HELP background_sql_statements_total 요청 밖(백그라운드) SQL 문 수", "# TYPE background_sql_statements_total counter",
+                f"background_sql_statements_total {registry.background[0]}",
+                "# HELP background_db_seconds_total 요청 밖(백그라운드) DB 시간 합", "# TYPE background_db_seconds_total counter",
+                f"background_db_seconds_total {registry.background[1]:.6f}"]
+    for name, (help_text, value) in (extra or {}).items():
+        out += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        if isinstance(value, list): out += [f"{name}{_labels(**labels)} {v}" for labels, v in value]   # [(라벨, 값), ...]
+        else: out.append(f"{name} {value}")
+    return "\n".join(out) + "\n"
+
+def summary(registry=registry, top=5):
+    with registry._lock:
+        routes = []
+        for key, hist in registry.latency.items():
+            queries = registry.queries[key]
+            routes.append({"route": f"{key[0]} {key[1]}", "requests": hist.count,
+                           "avg_ms": round(hist.sum / hist.count * 1000, 1), "p95_ms": round(hist.quantile(0.95) * 1000, 1),
+                           "avg_queries": round(queries.sum / queries.count, 1), "p95_queries": queries.quantile(0.95),
+                           "db_ms": round(registry.db_seconds[key] / hist.count * 1000, 1)})
+        errors = sum(n for (_, _, status), n in registry.requests.items() if status >= 500)
+        total = sum(registry.requests.values())
+        return {"uptime_s": round(time.time() - registry.started), "in_flight": registry.in_flight,
+                "requests": total, "errors_5xx": errors,
+                "slowest": sorted(routes, key=lambda r: r["p95_ms"], reverse=True)[:top],
+                "most_queries": sorted(routes, key=lambda r: r["avg_queries"], reverse=True)[:top]}
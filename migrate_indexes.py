@@ -0,0 +1,127 @@
+# migrate_indexes.py
+# 기존 DB(MySQL)에 models.py 의 인덱스/유니크 제약을 반영하는 마이그레이션
+# create_all 은 이미 있는 테이블을 바꾸지 않으므로 운영 DB 는 이 스크립트로 한 번 적용
+#   0) 모델에 새로 생긴 컬럼 추가 (예: users.token_version)
+#   1) 유니크 제약에 걸리는 중복 행 정리 (먼저 생긴 행 = 기존 코드가 .first() 로 읽던 행을 남김)
+#   2) 없는 인덱스/유니크 제약만 생성 (같은 컬럼 구성의 인덱스가 있으면 건너뜀, 여러 번 실행해도 안전)
+#   3) 핫 쿼리 실행 계획 확인 (풀 스캔이면 실패)
+# 실행: DATABASE_URL=... python migrate_indexes.py [--dry-run] [--check-only]
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy import Index, MetaData, UniqueConstraint, and_, delete, func, inspect, select, text
+import db_lifecycle
+import models
+
+# 유니크 제약을 걸기 전에 중복을 정리할 테이블: (모델, 키 컬럼)
+DEDUPE = [
+    (models.Attendance, ("session_id", "student_id")),
+    (models.Enrollment, ("user_id", "course_id")),
+]
+
+def dedupe(conn, model, keys, dry_run=False):
+    cols = [getattr(model, k) for k in keys]
+    groups = conn.execute(select(*cols, func.min(model.id)).group_by(*cols).having(func.count() > 1)).all()
+    removed = 0
+    for row in groups:
+        cond = and_(*(c == v for c, v in zip(cols, row[:-1])), model.id != row[-1])
+        if dry_run: removed += conn.execute(select(func.count()).select_from(model).where(cond)).scalar()
+        else: removed += conn.execute(delete(model).where(cond)).rowcount
+    return removed
+
+def wanted_indexes():
+    # models.py 에 선언된 인덱스 + 유니크 제약(유니크 인덱스로 생성)
+    for table in models.Base.metadata.sorted_tables:
+        for idx in table.indexes:
+            yield table, idx.name, [c.name for c in idx.columns], idx.unique, idx
+        for con in table.constraints:
+            if isinstance(con, UniqueConstraint) and con.name:
+                yield table, con.name, [c.name for c in con.columns], True, None
+
+def missing_indexes(conn):
+    insp = inspect(conn)
+    existing = {}
+    for table in models.Base.metadata.sorted_tables:
+        if not insp.has_table(table.name): continue
+        found = [(i["name"], i["column_names"], bool(i["unique"])) for i in insp.get_indexes(table.name)]
+        found += [(u["name"], u["column_names"], True) for u in insp.get_unique_constraints(table.name)]
+        existing[table.name] = found
+    missing = []
+    for table, name, cols, unique, idx in wanted_indexes():
+        if table.name not in existing: continue  # 테이블 자체가 없으면 create_all 이 만듦
+        if any(n == name or (c == cols and (u or not unique)) for n, c, u in existing[table.name]): continue
+        if idx is None:  # models 의 Table 에 붙지 않도록 복사본 위에서 유니크 인덱스 생성
+            scratch = table.to_metadata(MetaData())
+            idx = Index(name, *(scratch.c[c] for c in cols), unique=True)
+        missing.append(idx)
+    return missing
+
+def migrate(engine, dry_run=False):
+    with engine.connect() as conn:
+        if not dry_run:
+            for name in db_lifecycle.add_missing_columns(conn, models.Base.metadata): print(f"➕ 컬럼 추가: {name}")
+        for model, keys in DEDUPE:
+            n = dedupe(conn, model, keys, dry_run)
+            if n: print(f"🧹 {model.__tablename__}: 중복 {n}건 {'삭제 예정' if dry_run else '삭제'}")
+        created = []
+        for idx in missing_indexes(conn):
+            print(f"🔧 {idx.table.name}.{idx.name} ({', '.join(c.name for c in idx.columns)}){' UNIQUE' if idx.unique else ''}")
+            if not dry_run: idx.create(bind=conn)
+            created.append(idx.name)
+        if not dry_run: conn.commit()
+    return created
+
+# --- 실행 계획 확인 ---
+def hot_queries():
+    A, E, S, U, L = models.Attendance, models.Enrollment, models.ClassSession, models.User, models.AuditLog
+    return {
+        "출석 기록 (세션+학생)": select(A).where(A.session_id == 1, A.student_id == 1),
+        "출석 인원 (세션+상태)": select(func.count()).select_from(A).where(A.session_id == 1, A.status.in_((1, 4))),
+        "수강생 목록 (강의)": select(E.user_id).where(E.course_id == 1),
+        "수강 여부 (학생+강의)": select(E.id).where(E.user_id == 1, E.course_id == 1),
+        "회차 목록 (강의, 주차순)": select(S).where(S.course_id == 1).order_by(S.week_number),
+        "학번 조회": select(U).where(U.student_number == "2025001"),
+        "증빙 파일 권한 확인": select(A.id).where(A.proof_file == "x.png"),
+        "최근 감사 로그": select(L).order_by(L.created_at.desc(), L.id.desc()).limit(51),
+        "감사 로그 (행위자별)": select(L).where(L.actor_id == 1).order_by(L.created_at.desc(), L.id.desc()).limit(51),
+        "감사 로그 (대상별)": select(L).where(L.target_type == "SESSION", L.target_id == 1).order_by(L.created_at.desc(), L.id.desc()).limit(51),
+        "감사 로그 (액션+기간)": select(L).where(L.action == "CAST_VOTE", L.created_at >= datetime(2025, 9, 1)).order_by(L.created_at.desc(), L.id.desc()).limit(51),
+    }
+
+def explain(conn, stmt):
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    if conn.dialect.name == "mysql":
+        return [f"{r['table']}: type={r['type']} key={r['key']}" for r in conn.execute(text("EXPLAIN " + sql)).mappings()]
+    return []
+
+def is_full_scan(plan_line):
+    # SQLite: "SCAN attendances" (인덱스 없이 전체 스캔), MySQL: type=ALL
+    if plan_line.startswith("SCAN "): return " USING " not in plan_line
+    return " type=ALL " in plan_line
+
+def check_plans(engine):
+    failures = []
+    with engine.connect() as conn:
+        for name, stmt in hot_queries().items():
+            plan = explain(conn, stmt)
+            if any(is_full_scan(line) for line in plan): failures.append((name, plan))
+    return failures
+
+if __name__ == "__main__":
+    from database import engine
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="변경 없이 정리/생성 대상만 출력")
+    parser.add_argument("--check-only", action="store_true", help="실행 계획만 확인")
+    args = parser.parse_args()
+
+    if not args.check_only:
+        if not args.dry_run: models.Base.metadata.create_all(bind=engine)
+        created = migrate(engine, args.dry_run)
+        print(f"✅ 인덱스 {len(created)}개 {'생성 예정' if args.dry_run else '생성'}")
+    failures = check_plans(engine)
+    for name, plan in failures:
+        print(f"❌ 풀 스캔: {name} -> {plan}")
+    if failures: sys.exit(1)
+    print("✅ 핫 쿼리 실행 계획 확인 완료 (풀 스캔 없음)")
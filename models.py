@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Date, DateTime, Text, Boolean, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from database import Base
@@ -19,9 +19,10 @@ class User(Base):
     email = Column(String(100), unique=True, index=True, nullable=False)
     password = Column(String(255), nullable=False)
     name = Column(String(50), nullable=False)
-    student_number = Column(String(20), nullable=True)
+    student_number = Column(String(20), nullable=True, index=True)
     role = Column(Enum('ADMIN', 'INSTRUCTOR', 'STUDENT'), nullable=False)
     department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # 권한/비밀번호 변경 시 증가 -> 이전 토큰 무효
     created_at = Column(DateTime, default=func.now())
     department = relationship("Department", back_populates="users")
     enrollments = relationship("Enrollment", back_populates="user")
@@ -48,6 +49,8 @@ class Course(Base):
 
 class ClassSession(Base):
     __tablename__ = "class_sessions"
+    # [NEW] 강의별 회차 목록 (week_number 순 정렬)
+    __table_args__ = (Index("ix_class_session_course_week", "course_id", "week_number"),)
     id = Column(Integer, primary_key=True, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
     week_number = Column(Integer, nullable=False)
@@ -65,6 +68,11 @@ class ClassSession(Base):
 # ... (Enrollment 기존 유지) ...
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    # [NEW] 학생당 강의별 수강은 하나 / 강의별 수강생 조회
+    __table_args__ = (
+        UniqueConstraint("user_id", "course_id", name="uq_enrollment_user_course"),
+        Index("ix_enrollment_course", "course_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
@@ -74,13 +82,18 @@ class Enrollment(Base):
 
 class Attendance(Base):
     __tablename__ = "attendances"
+    # [NEW] 학생당 세션별 기록은 하나 (출석 배치 INSERT 의 중복 처리 기준) / 세션별 출석 인원 집계
+    __table_args__ = (
+        UniqueConstraint("session_id", "student_id", name="uq_attendance_session_student"),
+        Index("ix_attendance_session_status", "session_id", "status"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("class_sessions.id"), nullable=False)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # 0:미정, 1:출석, 2:지각, 3:결석, 4:공결, 5:신청중
     status = Column(Integer, default=0)
-    proof_file = Column(String(255), nullable=True)
+    proof_file = Column(String(255), nullable=True, index=True)  # 업로드 파일 내려받기 권한 확인
     
     # [NEW] 이의제기 메시지
     appeal_reason = Column(Text, nullable=True)
@@ -93,10 +106,50 @@ class Attendance(Base):
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    # [NEW] 감사 로그 검색: 필터 + 최신순(created_at, id) keyset 페이지네이션
+    __table_args__ = (
+        Index("ix_audit_actor_created", "actor_id", "created_at"),
+        Index("ix_audit_target_created", "target_type", "target_id", "created_at"),
+        Index("ix_audit_action_created", "action", "created_at"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     actor_id = Column(Integer, ForeignKey("users.id"))
     target_type = Column(String(50))
     target_id = Column(Integer)
     action = Column(String(50))
     details = Column(Text)
-    created_at = Column(DateTime, default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+# [NEW] 오래된 감사 로그 보관용 (archive_audit.py 로 이동, 현재 테이블은 최근 학기만 유지)
+class AuditLogArchive(Base):
+    __tablename__ = "audit_logs_archive"
+    __table_args__ = (
+        Index("ix_audit_archive_actor_created", "actor_id", "created_at"),
+        Index("ix_audit_archive_target_created", "target_type", "target_id", "created_at"),
+        Index("ix_audit_archive_action_created", "action", "created_at"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=False)  # 원래 audit_logs.id 유지
+    actor_id = Column(Integer)
+    target_type = Column(String(50))
+    target_id = Column(Integer)
+    action = Column(String(50))
+    details = Column(Text)
+    created_at = Column(DateTime, index=True)
+
+# [NEW] 학기 달력 (개강일/주차 수) 과 학기별 공휴일
+class Semester(Base):
+    __tablename__ = "semesters"
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String(20), unique=True, nullable=False)   # Course.semester 와 같은 값 (예: 2025-2)
+    start_date = Column(Date, nullable=False)
+    weeks = Column(Integer, default=17, nullable=False)
+    holidays = relationship("Holiday", back_populates="semester", cascade="all, delete-orphan")
+
+class Holiday(Base):
+    __tablename__ = "holidays"
+    __table_args__ = (UniqueConstraint("semester_id", "date", name="uq_holiday_semester_date"),)
+    id = Column(Integer, primary_key=True, index=True)
+    semester_id = Column(Integer, ForeignKey("semesters.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    name = Column(String(50), nullable=True)
+    semester = relationship("Semester", back_populates="holidays")
@@ -0,0 +1,179 @@
+# reports.py
+# 조회 전용 집계 쿼리 모음 (학생별 N+1 루프 대체)
+import csv
+import io
+import json
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+from cache import TTLCache, make_versions
+import models
+import storage
+
+# 학생 대시보드 캐시 (user_id -> (버전 토큰, 응답)). 쓰기 경로에서 학생별 버전을 올려 무효화하고 TTL은 안전장치
+# 버전은 LIVE_BACKEND=redis://... 이면 Redis 카운터라 다른 워커에서 올린 무효화도 바로 반영 (cache.make_versions)
+DASHBOARD_TTL = 30
+dashboard_cache = TTLCache(ttl=DASHBOARD_TTL)
+dashboard_versions = make_versions("dashver:", ttl=DASHBOARD_TTL)
+
+# [출석 명단] 수강생 + 사용자 + 해당 주차 출석을 한 번의 조인으로 조회
+def build_session_roster(db: Session, session: models.ClassSession):
+    att = models.Attendance
+    vote_y = func.sum(case((att.vote_response == 'Y', 1), else_=0)).over()
+    vote_n = func.sum(case((att.vote_response == 'N', 1), else_=0)).over()
+    rows = (
+        db.query(
+            models.User.id, models.User.student_number, models.User.name, models.User.email,
+            att.status, att.proof_file, att.appeal_reason,
+            vote_y.label("vote_y"), vote_n.label("vote_n"),
+        )
+        .select_from(models.Enrollment)
+        .join(models.User, models.User.id == models.Enrollment.user_id)
+        .outerjoin(att, and_(att.student_id == models.User.id, att.session_id == session.id))
+        .filter(models.Enrollment.course_id == session.course_id)
+        .order_by(models.Enrollment.id)
+        .all()
+    )
+    roster = [{
+        "student_id": r.id,
+        "student_number": r.student_number,
+        "student_name": r.name,
+        "email": r.email,
+        "status": r.status if r.status is not None else 0,
+        "proof_file": r.proof_file,
+        "proof_thumb": storage.thumb_url(r.proof_file),  # 이미지 증빙 미리보기 (없으면 None)
+        "appeal_reason": r.appeal_reason
+    } for r in rows]
+    # 윈도우 합계는 모든 행에 동일하게 붙으므로 첫 행만 읽음
+    vote_stat = {"Y": int(rows[0].vote_y or 0), "N": int(rows[0].vote_n or 0)} if rows else {"Y": 0, "N": 0}
+    return {"roster": roster, "vote_stat": vote_stat}
+
+# [학생 대시보드] 수강 강의별 주차 수/결석 수/출석 수를 GROUP BY 한 번으로 집계
+def build_student_dashboard(db: Session, user_id: int):
+    att = models.Attendance
+    rows = (
+        db.query(
+            models.Course.id, models.Course.title, models.Course.semester, models.Course.notice,
+            func.count(func.distinct(models.ClassSession.id)).label("total_sessions"),
+            func.sum(case((att.status == 3, 1), else_=0)).label("absent_count"),
+            func.sum(case((att.status.in_([1, 4]), 1), else_=0)).label("attended_count"),
+        )
+        .select_from(models.Enrollment)
+        .join(models.Course, models.Course.id == models.Enrollment.course_id)
+        .outerjoin(models.ClassSession, models.ClassSession.course_id == models.Course.id)
+        .outerjoin(att, and_(att.session_id == models.ClassSession.id, att.student_id == user_id))
+        .filter(models.Enrollment.user_id == user_id)
+        .group_by(models.Enrollment.id, models.Course.id, models.Course.title, models.Course.semester, models.Course.notice)
+        .order_by(models.Enrollment.id)
+        .all()
+    )
+    dashboard_data = []
+    for r in rows:
+        attended = int(r.attended_count or 0)
+        rate = (attended / r.total_sessions * 100) if r.total_sessions > 0 else 0.0
+        dashboard_data.append({
+            "course_id": r.id, "course_title": r.title, "semester": r.semester,
+            "notice": r.notice, "attendance_rate": round(rate, 1), "is_warning": int(r.absent_count or 0) >= 2
+        })
+    return dashboard_data
+
+def get_student_dashboard(db: Session, user_id: int):
+    token, data = cached_dashboard(user_id)
+    if data is None:
+        data = build_student_dashboard(db, user_id)
+        dashboard_cache.set(user_id, (token, data))
+    return data
+
+# (현재 버전 토큰, 캐시된 응답 또는 None). 저장할 때는 만들기 전에 읽은 토큰을 씀
+# -> 만드는 도중에 무효화되면 다음 조회에서 토큰이 달라 다시 만듦
+def cached_dashboard(user_id: int):
+    token = dashboard_versions.get([user_id])[0]
+    item = dashboard_cache.get(user_id)
+    return token, (item[1] if item is not None and item[0] == token else None)
+
+def invalidate_dashboard(*user_ids):
+    if not user_ids: return
+    dashboard_cache.invalidate(*user_ids)
+    dashboard_versions.bump(*user_ids)
+
+# 강의 전체에 영향을 주는 변경(공지, 주차 추가/삭제 등) 시 수강생 전원 무효화
+def invalidate_course_dashboards(db: Session, course_id: int):
+    invalidate_dashboard(*[uid for (uid,) in db.query(models.Enrollment.user_id).filter(models.Enrollment.course_id == course_id)])
+
+# [강의 리포트] 학생별 출석 수를 서브쿼리 GROUP BY 한 번으로 집계
+def course_report_query(db: Session, course_id: int):
+    attended = (
+        db.query(models.Attendance.student_id.label("student_id"), func.count(models.Attendance.id).label("attended_count"))
+        .join(models.ClassSession, models.ClassSession.id == models.Attendance.session_id)
+        .filter(models.ClassSession.course_id == course_id, models.Attendance.status.in_([1, 4]))
+        .group_by(models.Attendance.student_id)
+        .subquery()
+    )
+    return (
+        db.query(models.User.name, func.coalesce(attended.c.attended_count, 0).label("attended_count"))
+        .select_from(models.Enrollment)
+        .join(models.User, models.User.id == models.Enrollment.user_id)
+        .outerjoin(attended, attended.c.student_id == models.Enrollment.user_id)
+        .filter(models.Enrollment.course_id == course_id)
+        .order_by(models.Enrollment.id)
+    )
+
+def report_row(name, total_sessions, attended_count):
+    rate = (attended_count / total_sessions * 100) if total_sessions > 0 else 0.0
+    return {"student_name": name, "total_sessions": total_sessions, "attended_count": attended_count, "attendance_rate": round(rate, 1)}
+
+def build_course_report(db: Session, course: models.Course, total_sessions: int):
+    rows = course_report_query(db, course.id).all()
+    return {"course_title": course.title, "reports": [report_row(r.name, total_sessions, int(r.attended_count)) for r in rows]}
+
+# [스트리밍 리포트] 대형 강의용: 행 단위로 읽고 바로 내보냄 (전체 리스트를 메모리에 만들지 않음)
+STREAM_BATCH = 500
+
+def stream_course_report(session_factory, course_id: int, course_title: str, total_sessions: int, fmt: str = "json"):
+    # 응답 전송 중에도 유지되어야 하므로 요청 세션과 별도의 세션 사용
+    db = session_factory()
+    try:
+        rows = course_report_query(db, course_id).execution_options(stream_results=True, yield_per=STREAM_BATCH)
+        buf = io.StringIO()
+        if fmt == "csv":
+            writer = csv.writer(buf)
+            writer.writerow(["student_name", "total_sessions", "attended_count", "attendance_rate"])
+        else:
+            buf.write('{"course_title": ' + json.dumps(course_title, ensure_ascii=False) + ', "reports": [')
+        for i, r in enumerate(rows):
+            item = report_row(r.name, total_sessions, int(r.attended_count))
+            if fmt == "csv":
+                writer.writerow(item.values())
+            else:
+                buf.write(("," if i else "") + json.dumps(item, ensure_ascii=False))
+            if (i + 1) % STREAM_BATCH == 0:
+                yield buf.getvalue()
+                buf.seek(0); buf.truncate()
+        if fmt != "csv": buf.write("]}")
+        yield buf.getvalue()
+    finally:
+        db.close()
+
+# [투표 집계] 세션의 Y/N 응답 수
+def vote_tally(db: Session, session_id: int):
+    rows = db.query(models.Attendance.vote_response, func.count(models.Attendance.id))\
+        .filter(models.Attendance.session_id == session_id, models.Attendance.vote_response.in_(['Y', 'N']))\
+        .group_by(models.Attendance.vote_response).all()
+    tally = {"Y": 0, "N": 0}
+    tally.update({v: int(c) for v, c in rows})
+    return tally
+
+# [학생 주차 목록] 세션 + 내 출석 상태를 외부 조인 한 번으로 조회
+def build_student_sessions(db: Session, course_id: int, user_id: int):
+    att = models.Attendance
+    rows = (
+        db.query(models.ClassSession, att.status)
+        .outerjoin(att, and_(att.session_id == models.ClassSession.id, att.student_id == user_id))
+        .filter(models.ClassSession.course_id == course_id)
+        .order_by(models.ClassSession.id)
+        .all()
+    )
+    return [{
+        "id": s.id, "week_number": s.week_number, "session_date": s.session_date,
+        "is_open": s.is_open, "is_voting": s.is_voting, "attendance_method": s.attendance_method,
+        "my_status": st if st is not None else 0
+    } for s, st in rows]
@@ -2,7 +2,7 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, date
 
 class UserRole(str, Enum):
     ADMIN = "ADMIN"
@@ -42,6 +42,12 @@ class UserResponse(BaseModel):
     department_id: Optional[int] = None
     class Config: from_attributes = True
 
+# [NEW] 관리자 목록 페이지 (next_cursor 를 다음 요청의 cursor 로, total 은 첫 페이지에만)
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[int] = None
+    total: Optional[int] = None
+
 class CourseUpdate(BaseModel):
     title: str
     course_type: str
@@ -67,6 +73,35 @@ class CourseResponse(BaseModel):
     department_id: Optional[int] = None
     class Config: from_attributes = True
 
+class CoursePage(BaseModel):
+    items: List[CourseResponse]
+    next_cursor: Optional[int] = None
+    total: Optional[int] = None
+
+# [NEW] 학기 달력
+class HolidayItem(BaseModel):
+    date: date
+    name: Optional[str] = None
+    class Config: from_attributes = True
+
+class SemesterCreate(BaseModel):
+    code: str          # Course.semester 와 같은 값 (예: 2025-2)
+    start_date: date
+    weeks: int = 17
+    holidays: List[HolidayItem] = []
+
+class SemesterResponse(BaseModel):
+    id: int
+    code: str
+    start_date: date
+    weeks: int
+    holidays: List[HolidayItem]
+    class Config: from_attributes = True
+
+class RescheduleRequest(BaseModel):
+    from_date: date
+    to_date: date
+
 # --- 이하 동일 ---
 class SessionCreate(BaseModel):
     week_number: int
@@ -122,7 +157,12 @@ class AuditLogResponse(BaseModel):
     id: int
     actor_id: Optional[int]
     target_type: str
+    target_id: Optional[int] = None
     action: str
     details: Optional[str]
     created_at: datetime
-    class Config: from_attributes = True
\ No newline at end of file
+    class Config: from_attributes = True
+
+class AuditLogPage(BaseModel):
+    items: List[AuditLogResponse]
+    next_cursor: Optional[str] = None
\ No newline at end of file
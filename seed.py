@@ -0,0 +1,208 @@
+# seed.py
+# 대학 규모 합성 데이터 생성 (성능 측정/개발용)
+# - 학과, 교수, 학생, 강의(학기 달력으로 주차 생성, 공휴일 반영), 수강, 지난 주차의 출석, 공결 증빙 파일, 감사 로그
+# - 모든 행은 Core bulk INSERT 를 CHUNK 건씩 (ORM 객체를 만들지 않음), 같은 --seed 면 같은 분포/배정
+# - 출석: 학생마다 성실도를 두어 출석 ~85%, 지각 ~6%, 결석 ~6%, 공결(승인 4 / 대기 5) ~3%, 일부 결석은 이의 신청
+#   수업일이 --as-of(기본: 오늘) 이후인 주차와 공휴일 주차는 기록 없음
+# - 증빙 파일은 storage 와 같은 "<sha256>.<확장자>" 이름으로 PROOF_FILES 개를 만들어 공결 기록이 나눠 씀
+# - 비밀번호는 모두 SEED_PASSWORD 하나의 해시 (bcrypt 를 수천 번 돌리지 않음)
+# 실행: DATABASE_URL=... python seed.py --scale medium [--students 5000 --courses 400] [--seed 7] [--as-of 2025-11-01]
+import argparse
+import hashlib
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+import auth
+import models
+import semesters
+import storage
+
+CHUNK = 5000
+SEED_PASSWORD = "seed1234"
+SEMESTER = "2025-2"
+PROOF_FILES = 200
+COURSES_PER_STUDENT = 6
+SCALES = {   # 학과, 교수, 학생, 강의
+    "small": (5, 20, 500, 40),
+    "medium": (12, 150, 3000, 300),
+    "large": (30, 600, 20000, 1200),
+}
+DEPT_NAMES = ["컴퓨터공학", "전자공학", "기계공학", "화학공학", "경영학", "경제학", "국어국문", "영어영문", "수학", "물리학",
+              "화학", "생명과학", "심리학", "사회학", "법학", "건축학", "산업공학", "통계학", "간호학", "디자인"]
+SUBJECTS = ["개론", "기초", "실습", "세미나", "특론", "설계", "응용", "고급", "연습", "캡스톤"]
+SURNAMES = "김이박최정강조윤장임한오서신권황안송류홍"
+GIVEN = "민서준도윤하지우현수예은시연채유진영재원태희성경아"
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+TYPES = ["전공"] * 6 + ["교양"] * 3 + ["실험"]
+
+def bulk(db: Session, model, rows, chunk=CHUNK):
+    table, batch, n = model.__table__, [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            db.execute(insert(table), batch)
+            n += len(batch)
+            batch = []
+    if batch:
+        db.execute(insert(table), batch)
+        n += len(batch)
+    return n
+
+def person_name(rng):
+    return rng.choice(SURNAMES) + rng.choice(GIVEN) + rng.choice(GIVEN)
+
+def make_proof_files(rng, count=PROOF_FILES, directory=storage.UPLOAD_DIR):
+    # 업로드와 같은 내용 주소 이름 (같은 내용이면 같은 파일)
+    os.makedirs(directory, exist_ok=True)
+    names = []
+    for i in range(count):
+        data = f"%PDF-1.4\n% seed proof {i} {rng.random()}\n%%EOF\n".encode()
+        name = f"{hashlib.sha256(data).hexdigest()}.pdf"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            with open(path, "wb") as f: f.write(data)
+        names.append(name)
+    return names
+
+def pick_status(rng, diligence):
+    # diligence: 학생별 성실도 (0.6 ~ 1.0), 낮을수록 지각/결석이 잦음
+    r = rng.random()
+    absent, late, excused = (1 - diligence) * 0.2 + 0.02, (1 - diligence) * 0.15 + 0.03, 0.03
+    if r < absent: return 3
+    if r < absent + late: return 2
+    if r < absent + late + excused: return 4 if rng.random() < 0.7 else 5
+    return 1
+
+def generate(db: Session, departments=12, instructors=150, students=3000, courses=300, seed=7, as_of=None,
+             semester=SEMESTER, courses_per_student=COURSES_PER_STUDENT, proof_files=PROOF_FILES, upload_dir=storage.UPLOAD_DIR):
+    rng = random.Random(seed)
+    as_of = as_of or datetime.now()
+    tag = uuid.uuid4().hex[:6]   # 여러 번 실행해도 이메일/학번이 겹치지 않게
+    t0 = time.perf_counter()
+    counts = {}
+    password = auth.get_password_hash(SEED_PASSWORD)
+
+    # 학과 (이미 있는 이름은 재사용)
+    names = [DEPT_NAMES[i % len(DEPT_NAMES)] + (f" {i // len(DEPT_NAMES) + 1}" if i >= len(DEPT_NAMES) else "") for i in range(departments)]
+    existing = dict(db.execute(select(models.Department.name, models.Department.id).where(models.Department.name.in_(names))).all())
+    counts["departments"] = bulk(db, models.Department, ({"name": n} for n in names if n not in existing))
+    dept_ids = [d for _, d in sorted(db.execute(select(models.Department.name, models.Department.id).where(models.Department.name.in_(names))).all(),
+                                     key=lambda r: names.index(r[0]))]
+
+    # 교수 / 학생
+    counts["instructors"] = bulk(db, models.User, ({"email": f"prof{i}@{tag}.seed", "password": password, "name": person_name(rng),
+                                                   "role": "INSTRUCTOR", "department_id": dept_ids[i % len(dept_ids)]} for i in range(instructors)))
+    counts["students"] = bulk(db, models.User, ({"email": f"stu{i}@{tag}.seed", "password": password, "name": person_name(rng),
+                                                "student_number": f"{tag[:2].upper()}{i:07d}", "role": "STUDENT",
+                                                "department_id": dept_ids[i % len(dept_ids)]} for i in range(students)))
+    users = db.execute(select(models.User.id, models.User.role, models.User.department_id).where(models.User.email.like(f"%@{tag}.seed")).order_by(models.User.id)).all()
+    prof_ids = [(uid, dept) for uid, role, dept in users if role == "INSTRUCTOR"]
+    student_rows = [(uid, dept) for uid, role, dept in users if role == "STUDENT"]
+
+    # 강의: 교수의 학과 소속, 요일/유형은 무작위
+    course_rows = []
+    for i in range(courses):
+        prof, dept = prof_ids[i % len(prof_ids)]
+        course_rows.append({"title": f"{DEPT_NAMES[dept_ids.index(dept) % len(DEPT_NAMES)]}{rng.choice(SUBJECTS)} {i + 1}", "semester": semester,
+                            "course_type": rng.choice(TYPES), "day_of_week": rng.choice(DAYS), "instructor_id": prof, "department_id": dept})
+    counts["courses"] = bulk(db, models.Course, course_rows)
+    prof_set = [p for p, _ in prof_ids]
+    course_list = db.execute(select(models.Course.id, models.Course.department_id, models.Course.day_of_week, models.Course.instructor_id)
+                             .where(models.Course.instructor_id.in_(prof_set)).order_by(models.Course.id)).all()
+    counts["sessions"] = semesters.generate_sessions(db, [(cid, semester, dow) for cid, _, dow, _ in course_list])
+
+    # 수강: 학과 강의 위주(2/3) + 다른 학과 강의, 강의 규모가 고르지 않도록 인기 가중치
+    by_dept = {}
+    for cid, dept, _, _ in course_list: by_dept.setdefault(dept, []).append(cid)
+    all_courses = [cid for cid, _, _, _ in course_list]
+    weight = {cid: rng.paretovariate(1.5) for cid in all_courses}
+    cum = {}   # 후보 목록별 누적 가중치 (학생마다 다시 계산하지 않음)
+    def cum_weights(key, pool):
+        if key not in cum:
+            total, out = 0.0, []
+            for c in pool:
+                total += weight[c]
+                out.append(total)
+            cum[key] = out
+        return cum[key]
+    enrollments = {}
+    want = min(courses_per_student, len(all_courses))
+    for uid, dept in student_rows:
+        picked = set()
+        own = by_dept.get(dept) or all_courses
+        while len(picked) < want:
+            key, pool = (dept, own) if len(picked) < want * 2 // 3 and len(picked) < len(own) else (None, all_courses)
+            picked.add(rng.choices(pool, cum_weights=cum_weights(key, pool))[0])
+        enrollments[uid] = sorted(picked)
+    counts["enrollments"] = bulk(db, models.Enrollment, ({"user_id": uid, "course_id": cid} for uid, cids in enrollments.items() for cid in cids))
+
+    # 출석: 지난 주차(공휴일 제외)만
+    past = {}
+    for sid, cid, when, holiday in db.execute(select(models.ClassSession.id, models.ClassSession.course_id, models.ClassSession.session_date,
+                                                     models.ClassSession.is_holiday).where(models.ClassSession.course_id.in_(all_courses))):
+        if not holiday and when < as_of: past.setdefault(cid, []).append((sid, when))
+    proofs = make_proof_files(rng, proof_files, upload_dir) if proof_files else []
+    diligence = {uid: rng.uniform(0.6, 1.0) for uid, _ in student_rows}
+    appeals = ["병원 진료로 지각했습니다.", "출석 체크 오류였습니다.", "교내 행사 참석", "교통 지연"]
+
+    def attendance_rows():
+        for uid, cids in enrollments.items():
+            for cid in cids:
+                for sid, when in past.get(cid, ()):
+                    status = pick_status(rng, diligence[uid])
+                    row = {"session_id": sid, "student_id": uid, "status": status, "proof_file": None, "appeal_reason": None,
+                           "checked_at": when + timedelta(minutes=rng.randint(0, 15) if status != 2 else rng.randint(10, 40))}
+                    if status in (4, 5) and proofs: row["proof_file"] = rng.choice(proofs)
+                    elif status == 3 and rng.random() < 0.05: row["appeal_reason"] = rng.choice(appeals)
+                    yield row
+    counts["attendances"] = bulk(db, models.Attendance, attendance_rows())
+
+    # 감사 로그: 강의 개설/수강 등록/주차 상태/출석 수정 이력을 학기 기간에 흩어서
+    start = min((w for rows in past.values() for _, w in rows), default=as_of) - timedelta(days=14)
+    span = max((as_of - start).total_seconds(), 1)
+    def audit_rows():
+        for cid, _, _, prof in course_list:
+            yield {"actor_id": prof, "target_type": "COURSE", "target_id": cid, "action": "CREATE", "details": f"course {cid}",
+                   "created_at": start}
+            for sid, when in past.get(cid, ()):
+                yield {"actor_id": prof, "target_type": "SESSION", "target_id": sid, "action": "UPDATE_STATUS", "details": "True", "created_at": when}
+                if rng.random() < 0.3:
+                    yield {"actor_id": prof, "target_type": "ATTENDANCE", "target_id": sid, "action": "MANUAL_UPDATE",
+                           "details": f"Student {rng.choice(student_rows)[0]} -> {rng.choice((1, 2, 4))}", "created_at": when + timedelta(minutes=50)}
+        for uid, cids in enrollments.items():
+            for cid in cids[:2]:
+                yield {"actor_id": prof_set[0], "target_type": "ENROLL", "target_id": cid, "action": "ADD_STUDENT", "details": str(uid),
+                       "created_at": start + timedelta(seconds=rng.uniform(0, min(span, 14 * 86400)))}
+    counts["audit_logs"] = bulk(db, models.AuditLog, audit_rows())
+    db.commit()
+    counts["proof_files"] = len(proofs)
+    return {"tag": tag, "seconds": round(time.perf_counter() - t0, 2), "counts": counts}
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=list(SCALES), default="medium")
+    parser.add_argument("--departments", type=int)
+    parser.add_argument("--instructors", type=int)
+    parser.add_argument("--students", type=int)
+    parser.add_argument("--courses", type=int)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--as-of", type=date.fromisoformat, help="이 날짜 이전 주차까지 출석 기록 (기본: 오늘)")
+    parser.add_argument("--no-uploads", action="store_true", help="증빙 파일을 만들지 않음")
+    args = parser.parse_args()
+
+    d, i, s, c = SCALES[args.scale]
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        result = generate(db, departments=args.departments or d, instructors=args.instructors or i, students=args.students or s,
+                          courses=args.courses or c, seed=args.seed, proof_files=0 if args.no_uploads else PROOF_FILES,
+                          as_of=datetime.combine(args.as_of, datetime.min.time()) if args.as_of else None)
+    finally:
+        db.close()
+    print(f"✅ 시드 {result['tag']} 생성 ({result['seconds']}초): " + ", ".join(f"{k} {v}" for k, v in result["counts"].items()))
+    print(f"   로그인: prof0@{result['tag']}.seed / stu0@{result['tag']}.seed (비밀번호 {SEED_PASSWORD})")
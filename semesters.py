@@ -0,0 +1,105 @@
+# semesters.py
+# 학기 달력: 학기(개강일/주차 수)와 공휴일을 DB 에 두고, 학기별 날짜표를 미리 계산해서
+# 여러 강의의 주차(ClassSession)를 한 번에 생성 / 공휴일 변경·보강일 이동도 한 번에 반영
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from cache import TTLCache
+import models
+
+DAY_MAP = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
+CLASS_START = time(9, 0)
+GRID_TTL = 300   # 초, 다른 워커에서 학기/공휴일을 바꿨을 때 반영되기까지의 최대 지연
+
+# 등록되지 않았을 때 처음 조회 시 자동으로 만드는 기본 학기 (기존 하드코딩 값)
+DEFAULT_SEMESTERS = {
+    "2025-2": (date(2025, 9, 1), 17, ["2025-10-03", "2025-10-06", "2025-10-07", "2025-10-08", "2025-10-09", "2025-12-25"]),
+}
+
+class SemesterGrid:
+    # 요일별 주차 날짜표: days["Wed"] = [(1주차 datetime, 공휴일 여부), ...]
+    def __init__(self, code, start_date, weeks, holidays):
+        self.code = code
+        self.start_date = start_date
+        self.weeks = weeks
+        self.holidays = frozenset(holidays)
+        self.days = {}
+        for name, weekday in DAY_MAP.items():
+            first = start_date + timedelta(days=(weekday - start_date.weekday()) % 7)
+            dates = [first + timedelta(weeks=w) for w in range(weeks)]
+            self.days[name] = [(datetime.combine(d, CLASS_START), d in self.holidays) for d in dates]
+
+    def session_rows(self, course_id, day_of_week):
+        return [{"course_id": course_id, "week_number": w + 1, "session_date": dt, "is_holiday": hol}
+                for w, (dt, hol) in enumerate(self.days[day_of_week if day_of_week in DAY_MAP else "Mon"])]
+
+grid_cache = TTLCache(ttl=GRID_TTL, maxsize=100)
+
+def get_semester(db: Session, code: str):
+    sem = db.query(models.Semester).filter(models.Semester.code == code).first()
+    if sem is None and code in DEFAULT_SEMESTERS:
+        start, weeks, holidays = DEFAULT_SEMESTERS[code]
+        # 동시에 처음 강의를 만드는 요청끼리 같은 학기를 넣을 수 있음: 진 쪽은 SAVEPOINT 만 되돌리고 먼저 들어간 행 사용
+        try:
+            with db.begin_nested():
+                sem = models.Semester(code=code, start_date=start, weeks=weeks,
+                                      holidays=[models.Holiday(date=date.fromisoformat(h)) for h in holidays])
+                db.add(sem)
+        except IntegrityError:
+            sem = db.query(models.Semester).filter(models.Semester.code == code).first()
+    return sem
+
+def get_grid(db: Session, code: str):
+    grid = grid_cache.get(code)
+    if grid is None:
+        sem = get_semester(db, code)
+        if sem is None: return None
+        grid = SemesterGrid(sem.code, sem.start_date, sem.weeks, [h.date for h in sem.holidays])
+        grid_cache.set(code, grid)
+    return grid
+
+def invalidate(code: str):
+    grid_cache.invalidate(code)
+
+# --- 주차 일괄 생성 ---
+# courses: (course_id, semester, day_of_week) 목록, 학기가 등록되지 않은 강의는 건너뜀
+# 커밋은 호출한 쪽에서 (강의 생성과 같은 트랜잭션)
+def generate_sessions(db: Session, courses):
+    rows = []
+    for course_id, code, day_of_week in courses:
+        grid = get_grid(db, code)
+        if grid is not None: rows += grid.session_rows(course_id, day_of_week)
+    if rows: db.execute(insert(models.ClassSession.__table__), rows)
+    return len(rows)
+
+def semester_course_ids(code: str):
+    return select(models.Course.id).where(models.Course.semester == code).scalar_subquery()
+
+# --- 공휴일 변경: 해당 학기 모든 주차의 is_holiday 를 UPDATE 한 번으로 다시 계산 ---
+def set_holidays(db: Session, sem: models.Semester, holidays):
+    holidays = dict(holidays)   # 같은 날짜가 여러 번 오면 마지막 이름 사용
+    db.execute(delete(models.Holiday).where(models.Holiday.semester_id == sem.id))
+    if holidays:
+        db.execute(insert(models.Holiday.__table__), [{"semester_id": sem.id, "date": d, "name": name} for d, name in holidays.items()])
+    db.expire(sem, ["holidays"])
+    days = sorted(d.isoformat() for d in holidays)
+    session_day = func.date(models.ClassSession.session_date)
+    result = db.execute(update(models.ClassSession)
+                        .where(models.ClassSession.course_id.in_(semester_course_ids(sem.code)))
+                        .values(is_holiday=session_day.in_(days) if days else False)
+                        .execution_options(synchronize_session=False))
+    invalidate(sem.code)
+    return result.rowcount
+
+# --- 보강/휴강일 이동: from_date 의 모든 주차를 to_date 로 (수업 시각 유지) ---
+def reschedule(db: Session, sem: models.Semester, from_date: date, to_date: date):
+    S = models.ClassSession
+    start = datetime.combine(from_date, time.min)
+    moved = db.execute(select(S.id, S.session_date).where(S.course_id.in_(semester_course_ids(sem.code)),
+                                                          S.session_date >= start, S.session_date < start + timedelta(days=1))).all()
+    if not moved: return []
+    is_holiday = to_date in {h.date for h in sem.holidays}
+    stmt = update(S.__table__).where(S.__table__.c.id == bindparam("sid")).values(session_date=bindparam("new_date"), is_holiday=is_holiday)
+    db.execute(stmt, [{"sid": sid, "new_date": datetime.combine(to_date, dt.time())} for sid, dt in moved])
+    return [sid for sid, _ in moved]
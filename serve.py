@@ -0,0 +1,61 @@
+# serve.py
+# 운영 실행 (Dockerfile CMD): python serve.py
+# - 워커 프로세스 WEB_CONCURRENCY 개, reload/파일 감시 없음
+#   기본: LIVE_BACKEND=redis://... (실시간 카운터/SSE/출석 중복 판단을 워커 간 공유) 이면 CPU 수, 아니면 1개
+#   정한 워커 수는 WEB_CONCURRENCY 로 워커에 전달 (live/checkin 이 멀티 워커용 동작을 고름)
+#   인증/대시보드/통계 등 TTL 캐시는 워커별로 남음 (각 *_TTL 초 안에 반영, 권한 변경은 auth 의 token_version)
+# - 한 번만 하면 되는 준비(DB 연결 대기 + 테이블 생성, 정적 파일 압축본)는 워커를 띄우기 전에 여기서 한 번
+#   -> 워커들은 테이블 생성 없이(DB_AUTO_CREATE=0) 바로 시작, DB 가 끝내 안 뜨면 종료해서 컨테이너 restart 에 맡김
+# - 종료(SIGTERM): 새 연결을 받지 않고 처리 중인 요청을 GRACEFUL_TIMEOUT 초까지 기다린 뒤
+#   각 워커의 lifespan 종료에서 출석/감사 로그/썸네일 큐를 비우고 끝남 (compose stop_grace_period 는 이보다 길게)
+# - 워커마다 생기는 bcrypt 프로세스 풀은 워커 수로 나눔
+# - 워커가 여럿이면 METRICS_DIR(기본 임시 디렉터리)로 /metrics 를 모든 워커 합산 (시작할 때 이전 실행의 스냅숏은 지움)
+# - keep-alive 는 nginx upstream keepalive_timeout(60초) 보다 길게 -> nginx 가 재사용하려던 연결을 앱이 먼저 닫지 않음
+# 개발: uvicorn main:app --reload (docker compose -f docker-compose.yml -f docker-compose.dev.yml up)
+#
+# 측정 (loadtest.py, 1 vCPU / SQLite 파일 DB, BCRYPT_ROUNDS=12, 같은 머신에서 부하 발생)
+#   워커 | 출석 체크 300건/동시 100                  | 로그인 60건/동시 60 (bcrypt)
+#   1    | 88.8~93.2 /s, p50 666~693ms, p99 2.9~3.3s | 2.2 /s, p99 27.9s, 동시 GET / p99 41ms
+#   2    | 44.1~56.9 /s, p50 1.3~1.4s, p99 5.0~6.7s  | 2.1 /s, p99 28.8s, 동시 GET / p99 42ms
+#   -> 코어가 하나면 워커를 늘려도 CPU 를 나눠 쓸 뿐이고 SQLite 쓰기 잠금 경합만 늘어 오히려 느려짐
+#      (로그인은 bcrypt 프로세스 풀이 이미 CPU 를 다 씀). 코어가 여러 개인 서버 + MySQL + Redis 에서 늘릴 것
+import glob
+import os
+import sys
+import tempfile
+import uvicorn
+import db_lifecycle
+import models
+import static_assets
+from database import engine
+
+SHARED_STATE = os.getenv("LIVE_BACKEND", "memory").startswith(("redis://", "rediss://"))
+WORKERS = int(os.getenv("WEB_CONCURRENCY") or ((os.cpu_count() or 1) if SHARED_STATE else 1))
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE_TIMEOUT = 75
+ACCESS_LOG = os.getenv("ACCESS_LOG", "0") == "1"   # 접근 로그는 nginx 에 있으므로 기본 끔
+
+def prepare():
+    startup = db_lifecycle.DatabaseStartup(engine)
+    if not startup.run(models.Base.metadata if db_lifecycle.AUTO_CREATE else None): sys.exit(1)
+    db_lifecycle.close_pool(engine)   # 준비에 쓴 커넥션은 워커에 넘기지 않음
+    os.environ["DB_AUTO_CREATE"] = "0"
+    try: print(f"정적 파일 압축본 {static_assets.build()}개 생성")
+    except OSError as e: print(f"정적 파일 압축본 생성 실패 (원본으로 서빙): {e}")
+
+if __name__ == "__main__":
+    os.environ["WEB_CONCURRENCY"] = str(WORKERS)   # 워커 프로세스가 상속 (live.make_backend, checkin.default_mode)
+    if WORKERS > 1 and not SHARED_STATE:
+        print("⚠️ LIVE_BACKEND(Redis) 없이 워커 여러 개: 실시간 카운터는 DB 조회, 출석은 direct 모드, 실시간 화면은 폴링으로 갱신")
+    # bcrypt 프로세스 풀은 워커마다 생기므로 전체가 CPU 절반을 넘지 않게 나눔 (auth.PASSWORD_WORKERS)
+    os.environ.setdefault("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2 // WORKERS)))
+    if WORKERS > 1:
+        os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "inoxde-metrics"))
+        for stale in glob.glob(os.path.join(os.environ["METRICS_DIR"], "*.json")): os.remove(stale)
+    prepare()
+    print(f"워커 {WORKERS}개로 시작 ({HOST}:{PORT})")
+    uvicorn.run("main:app", host=HOST, port=PORT, workers=WORKERS, reload=False,
+                timeout_graceful_shutdown=GRACEFUL_TIMEOUT, timeout_keep_alive=KEEPALIVE_TIMEOUT,
+                proxy_headers=True, forwarded_allow_ips="*", access_log=ACCESS_LOG)
@@ -0,0 +1,156 @@
+# sql_profiler.py
+# 개발용 SQL 프로파일러 / N+1 탐지 (SQL_PROFILE=1 일 때만 미들웨어와 SQL 이벤트를 등록, 운영에서는 비용 없음)
+# - 요청마다 실행된 SQL 을 정규화(공백, IN 목록, 리터럴)해서 같은 모양끼리 묶음
+# - 같은 모양이 REPEAT_THRESHOLD 번 이상이면 N+1 의심: 몇 번, 시간 합, 실행한 위치(프로젝트 코드의 파일:줄 함수)
+# - 가장 느린 SLOW_EXPLAIN 개 SELECT 는 같은 파라미터로 EXPLAIN 해서 실행 계획을 함께 기록
+# - 요청별 보고서를 PROFILE_DIR/<시각>_<메서드>_<경로>.json 으로 저장, N+1 의심이면 print 로 경고
+# 테스트/스크립트에서는 with capture(engine) as report: ... 후 report.repeated() 로 같은 분석 사용
+# 실행: SQL_PROFILE=1 uvicorn main:app --reload  (SQL_PROFILE_REPEAT=5, SQL_PROFILE_EXPLAIN=3, SQL_PROFILE_DIR=profiles)
+import contextvars
+import json
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+
+ENABLED = os.getenv("SQL_PROFILE", "0") == "1"
+REPEAT_THRESHOLD = int(os.getenv("SQL_PROFILE_REPEAT", "5"))
+SLOW_EXPLAIN = int(os.getenv("SQL_PROFILE_EXPLAIN", "3"))
+PROFILE_DIR = os.getenv("SQL_PROFILE_DIR", "profiles")
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SKIP_FILES = {os.path.abspath(__file__), os.path.join(PROJECT_DIR, "metrics.py")}
+
+_current = contextvars.ContextVar("sql_profile", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = r"(?:\?|%s|%\(\w+\)s|:\w+)"   # qmark(sqlite) / format, pyformat(pymysql) / named
+_IN_LIST = re.compile(rf"\bIN\s*\(\s*{_PARAM}(?:\s*,\s*{_PARAM})*\s*\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+def normalize(statement):
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+def call_site():
+    # SQL 을 실행한 프로젝트 코드의 가장 안쪽 프레임 (라이브러리/이 모듈 제외)
+    frame = sys._getframe(1)
+    while frame is not None:
+        name = frame.f_code.co_filename
+        path = os.path.abspath(name)
+        if not name.startswith("<") and path.startswith(PROJECT_DIR) and path not in SKIP_FILES and "site-packages" not in path:
+            return f"{os.path.relpath(path, PROJECT_DIR)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+class Report:
+    def __init__(self, method="", path=""):
+        self.method = method
+        self.path = path
+        self.statements = []   # (원문, 정규화, 초, 위치, 파라미터)
+        self.started = time.perf_counter()
+
+    def add(self, statement, seconds, site, params):
+        self.statements.append((statement, normalize(statement), seconds, site, params))
+
+    def groups(self):
+        out = {}
+        for statement, sql, seconds, site, _ in self.statements:
+            g = out.setdefault(sql, {"sql": sql, "count": 0, "total_ms": 0.0, "sites": []})
+            g["count"] += 1
+            g["total_ms"] += seconds * 1000
+            if site not in g["sites"]: g["sites"].append(site)
+        for g in out.values(): g["total_ms"] = round(g["total_ms"], 2)
+        return sorted(out.values(), key=lambda g: (g["count"], g["total_ms"]), reverse=True)
+
+    def repeated(self, threshold=None):
+        threshold = threshold or REPEAT_THRESHOLD
+        return [g for g in self.groups() if g["count"] >= threshold]
+
+    def slowest(self, n=SLOW_EXPLAIN):
+        return sorted(self.statements, key=lambda s: s[2], reverse=True)[:n]
+
+    def to_dict(self, engine=None, status=None, threshold=None):
+        slow = []
+        for statement, sql, seconds, site, params in self.slowest():
+            item = {"sql": sql, "ms": round(seconds * 1000, 2), "site": site}
+            if engine is not None: item["explain"] = explain(engine, statement, params)
+            slow.append(item)
+        return {"method": self.method, "path": self.path, "status": status,
+                "duration_ms": round((time.perf_counter() - self.started) * 1000, 1),
+                "statements": len(self.statements), "db_ms": round(sum(s[2] for s in self.statements) * 1000, 2),
+                "repeated": self.repeated(threshold), "slowest": slow, "groups": self.groups()[:20]}
+
+def explain(engine, statement, params):
+    if not statement.lstrip().upper().startswith("SELECT"): return None
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        with engine.connect() as conn:
+            return [[str(v) for v in row] for row in conn.exec_driver_sql(prefix + statement, params)]
+    except Exception as e:   # 파라미터 형식이 맞지 않는 문장 등: 보고서에 이유만 남김
+        return [f"EXPLAIN 실패: {e.__class__.__name__}: {str(e).splitlines()[0]}"]
+
+# --- SQL 이벤트 ---
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None: conn.info["profile_t0"] = time.perf_counter()
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    report, t0 = _current.get(), conn.info.pop("profile_t0", None)
+    if report is None or t0 is None: return
+    report.add(statement, time.perf_counter() - t0, call_site(), parameters)
+
+def instrument(engine):
+    if event.contains(engine, "before_cursor_execute", _before_execute): return
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+
+@contextmanager
+def capture(engine, method="", path=""):
+    instrument(engine)
+    report = Report(method, path)
+    token = _current.set(report)
+    try:
+        yield report
+    finally:
+        _current.reset(token)
+
+# --- 요청별 보고서 (ASGI 미들웨어) ---
+def write_report(data, directory=PROFILE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", data["path"]).strip("_") or "root"
+    path = os.path.join(directory, f"{datetime.now():%Y%m%d_%H%M%S_%f}_{data['method']}_{slug}.json")
+    with open(path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
+
+class ProfilerMiddleware:
+    def __init__(self, app, engine, threshold=None, directory=PROFILE_DIR):
+        self.app = app
+        self.engine = engine
+        self.threshold = threshold or REPEAT_THRESHOLD
+        self.directory = directory
+        instrument(engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        report = Report(scope["method"], scope["path"])
+        token = _current.set(report)
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start": status = message["status"]
+            await send(message)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if report.statements:
+                data = await run_in_threadpool(report.to_dict, self.engine, status, self.threshold)
+                path = await run_in_threadpool(write_report, data, self.directory)
+                for g in data["repeated"]:
+                    print(f"⚠️ N+1 의심 {report.method} {report.path}: {g['count']}회 {g['total_ms']}ms @ {', '.join(g['sites'])}\n   {g['sql']}\n   -> {path}")
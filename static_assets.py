@@ -0,0 +1,84 @@
+# static_assets.py
+# static/ 정적 파일 서빙
+# - 빌드: HTML 등 텍스트 파일 옆에 미리 압축한 .gz (brotli 모듈이 있으면 .br 도) 생성
+#   서버 시작 시(lifespan) 자동 실행, 원본보다 오래된 압축본만 다시 만듦 / nginx 는 gzip_static 으로 같은 파일 사용
+# - 서빙(앱이 직접 줄 때): Accept-Encoding 에 맞는 압축본 선택, ETag 는 파일 내용 해시(지문)
+#   HTML 은 주소가 고정이라 no-cache (매번 ETag 로 재검증 -> 바뀌지 않았으면 304, 본문 없음)
+# 실행: python static_assets.py [디렉터리]
+import gzip
+import hashlib
+import os
+import sys
+from mimetypes import guess_type
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성: 없으면 gzip 만
+    brotli = None
+
+STATIC_DIR = "static"
+COMPRESS_EXTS = {".html", ".css", ".js", ".json", ".svg", ".txt"}
+HTML_CACHE = "no-cache"
+ASSET_CACHE = "public, max-age=86400"   # nginx.conf 의 $static_cache_control 과 같게 유지
+
+def compressors():
+    out = [("gzip", ".gz", lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None: out.insert(0, ("br", ".br", lambda data: brotli.compress(data, quality=11)))
+    return out
+
+def build(directory=STATIC_DIR):
+    written = 0
+    for name in sorted(os.listdir(directory)):
+        src = os.path.join(directory, name)
+        if not os.path.isfile(src) or os.path.splitext(name)[1] not in COMPRESS_EXTS: continue
+        src_mtime = os.stat(src).st_mtime
+        data = None
+        for _, suffix, compress in compressors():
+            dst = src + suffix
+            if os.path.exists(dst) and os.stat(dst).st_mtime >= src_mtime: continue
+            if data is None:
+                with open(src, "rb") as f: data = f.read()
+            tmp = f"{dst}.{os.getpid()}.tmp"   # 워커 여러 개가 동시에 시작해도 안전하게
+            with open(tmp, "wb") as f: f.write(compress(data))
+            os.replace(tmp, dst)
+            written += 1
+    return written
+
+# 내용 해시 ETag: 배포/재시작으로 mtime 이 바뀌어도 내용이 같으면 그대로 304
+_etags = {}
+
+def content_etag(path, stat_result):
+    key = (path, stat_result.st_mtime_ns, stat_result.st_size)
+    etag = _etags.get(key)
+    if etag is None:
+        with open(path, "rb") as f: etag = f'"{hashlib.sha256(f.read()).hexdigest()[:32]}"'
+        _etags[key] = etag
+    return etag
+
+class CachedStatic(StaticFiles):
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        accepted = request_headers.get("accept-encoding", "")
+        path, used_stat, encoding = full_path, stat_result, None
+        for name, suffix, _ in compressors():
+            if name not in accepted: continue
+            try: st = os.stat(f"{full_path}{suffix}")
+            except OSError: continue
+            if st.st_mtime >= stat_result.st_mtime:
+                path, used_stat, encoding = f"{full_path}{suffix}", st, name
+                break
+        media_type = guess_type(str(full_path))[0] or "text/plain"
+        headers = {"Cache-Control": HTML_CACHE if media_type == "text/html" else ASSET_CACHE,
+                   "Vary": "Accept-Encoding", "ETag": content_etag(path, used_stat)}
+        if encoding: headers["Content-Encoding"] = encoding
+        response = FileResponse(path, status_code=status_code, headers=headers, media_type=media_type, stat_result=used_stat)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR
+    print(f"✅ 압축본 {build(directory)}개 생성 ({directory}, brotli {'사용' if brotli else '없음'})")
@@ -0,0 +1,37 @@
+# stats.py
+# 관리자 화면 통계: 학과별 구성원/강의 수 + 전체 합계
+# 학과 수와 무관하게 GROUP BY 쿼리 3개로 계산하고 짧게 캐시 (관리자 변경 API 에서 무효화)
+# 캐시는 워커별이므로 다른 워커의 변경은 최대 STATS_TTL 초 뒤에 반영
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from cache import TTLCache
+import models
+
+STATS_TTL = 10
+stats_cache = TTLCache(ttl=STATS_TTL, maxsize=1)
+
+def build_overview(db: Session):
+    users = dict(db.query(models.User.department_id, func.count()).group_by(models.User.department_id).all())
+    courses = dict(db.query(models.Course.department_id, func.count()).group_by(models.Course.department_id).all())
+    depts = db.query(models.Department.id, models.Department.name).order_by(models.Department.id).all()
+    return {
+        "departments": [{"id": d.id, "name": d.name, "user_count": users.get(d.id, 0), "course_count": courses.get(d.id, 0)} for d in depts],
+        "users": sum(users.values()),
+        "courses": sum(courses.values()),
+    }
+
+def get_overview(db: Session):
+    overview = stats_cache.get("overview")
+    if overview is None:
+        overview = build_overview(db)
+        stats_cache.set("overview", overview)
+    return overview
+
+def invalidate():
+    stats_cache.clear()
+
+# 삭제 가능 여부 판단용: 캐시를 거치지 않고 한 쿼리로 정확히 셈
+def department_counts(db: Session, dept_id: int):
+    users = select(func.count()).select_from(models.User).where(models.User.department_id == dept_id).scalar_subquery()
+    courses = select(func.count()).select_from(models.Course).where(models.Course.department_id == dept_id).scalar_subquery()
+    return db.execute(select(users, courses)).one()
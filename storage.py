@@ -0,0 +1,169 @@
+# storage.py
+# 공결 증빙 업로드 저장소
+# - 요청 본문 크기를 ASGI 단계에서 먼저 제한 (Content-Length 로 거르고, 받는 중에도 세어서 넘으면 413)
+# - 업로드 파일을 청크 단위로 읽으며 SHA-256 을 계산하고 임시 파일에 기록, 끝나면 "<해시>.<확장자>" 로 이동
+#   같은 내용을 다시 올리면 기존 파일을 그대로 사용 (중복 저장 없음)
+# - 이미지면 백그라운드 스레드에서 썸네일(JPEG) 생성 -> 교수 명단에서 원본 대신 미리보기 (Pillow 가 없으면 생략)
+# - 내려받기: 앱에서 권한(본인/담당 교수/관리자)만 확인하고, UPLOAD_ACCEL_PREFIX 가 있으면 nginx 가 파일을 직접 전송
+#   (X-Accel-Redirect), 없으면(개발 환경) 앱이 FileResponse 로 전송
+#   해시 이름 파일은 내용이 바뀌지 않으므로 브라우저 캐시를 길게
+# UPLOAD_MAX_MB 로 최대 크기 조정 (기본 10MB)
+import hashlib
+import os
+import queue
+import re
+import threading
+import uuid
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+import models
+
+try:
+    from PIL import Image
+except ImportError:  # 선택 의존성: 없으면 썸네일 없이 원본 링크만
+    Image = None
+
+UPLOAD_DIR = "uploads"
+THUMB_DIR = os.path.join(UPLOAD_DIR, "thumbs")
+MAX_UPLOAD = int(os.getenv("UPLOAD_MAX_MB", "10")) * 1024 * 1024
+FORM_OVERHEAD = 64 * 1024   # multipart 경계/헤더 여유분
+CHUNK = 1024 * 1024
+THUMB_SIZE = (320, 320)
+THUMB_QUALITY = 70
+IMAGE_EXTS = {"jpg", "jpeg", "png", "gif", "webp", "bmp"}
+ACCEL_PREFIX = os.getenv("UPLOAD_ACCEL_PREFIX")   # 예: /_protected_uploads/ (nginx internal location)
+UPLOAD_NAME = re.compile(r"(thumbs/)?[A-Za-z0-9_-][\w.-]*")
+HASHED_NAME = re.compile(r"(thumbs/)?[0-9a-f]{64}\.\w+(\.jpg)?")
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable"
+LEGACY_CACHE = "private, max-age=3600"
+
+def too_large():
+    return HTTPException(status_code=413, detail=f"파일이 너무 큽니다. (최대 {MAX_UPLOAD // (1024 * 1024)}MB)")
+
+# --- 요청 본문 크기 제한 (파일 전체를 받기 전에 차단) ---
+class UploadSizeLimit:
+    def __init__(self, app, path_pattern, max_bytes=None):
+        self.app = app
+        self.path = re.compile(path_pattern)
+        self.max_bytes = (max_bytes or MAX_UPLOAD) + FORM_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not self.path.fullmatch(scope["path"]):
+            return await self.app(scope, receive, send)
+        length = dict(scope["headers"]).get(b"content-length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            err = too_large()
+            return await JSONResponse({"detail": err.detail}, status_code=err.status_code)(scope, receive, send)
+        received = 0
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > self.max_bytes: raise too_large()   # Content-Length 없이(chunked) 보낸 경우
+            return message
+        await self.app(scope, limited_receive, send)
+
+# --- 저장 ---
+def safe_ext(filename):
+    ext = (filename or "").rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+    return ext if ext.isalnum() and len(ext) <= 10 else "bin"
+
+def thumb_name(file_name):
+    return f"thumbs/{file_name}.jpg"
+
+def thumb_url(file_name):
+    # 썸네일이 만들어진 경우에만 (레거시 파일/이미지 아님/Pillow 없음 -> None)
+    if not file_name: return None
+    name = thumb_name(file_name)
+    return name if os.path.exists(os.path.join(UPLOAD_DIR, name)) else None
+
+async def save_upload(file, max_bytes=None):
+    max_bytes = max_bytes or MAX_UPLOAD
+    digest, size = hashlib.sha256(), 0
+    tmp_path = os.path.join(UPLOAD_DIR, f".tmp-{uuid.uuid4().hex}")
+    out = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while chunk := await file.read(CHUNK):
+            size += len(chunk)
+            if size > max_bytes: raise too_large()
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        out.close()
+        os.remove(tmp_path)
+        raise
+    await run_in_threadpool(out.close)
+    file_name = f"{digest.hexdigest()}.{safe_ext(file.filename)}"
+    path = os.path.join(UPLOAD_DIR, file_name)
+    if os.path.exists(path): os.remove(tmp_path)   # 같은 내용이 이미 있음
+    else: os.replace(tmp_path, path)
+    if Image is not None and file_name.rsplit(".", 1)[-1] in IMAGE_EXTS: thumbnailer.submit(file_name)
+    return file_name, size
+
+# --- 내려받기 ---
+def source_name(name):
+    # 썸네일이면 원본 파일 이름 (권한은 원본 기준)
+    return name[len("thumbs/"):-len(".jpg")] if name.startswith("thumbs/") and name.endswith(".jpg") else name
+
+def can_view(db: Session, principal, name):
+    if principal.role == "ADMIN": return True
+    A, S, C = models.Attendance, models.ClassSession, models.Course
+    owner = db.query(A.id).join(S, S.id == A.session_id).join(C, C.id == S.course_id)\
+        .filter(A.proof_file == source_name(name), or_(A.student_id == principal.id, C.instructor_id == principal.id)).first()
+    return owner is not None
+
+def upload_response(name):
+    if not UPLOAD_NAME.fullmatch(name): raise HTTPException(status_code=404)
+    headers = {"Cache-Control": IMMUTABLE_CACHE if HASHED_NAME.fullmatch(name) else LEGACY_CACHE}
+    if ACCEL_PREFIX:
+        headers["X-Accel-Redirect"] = f"{ACCEL_PREFIX}{name}"
+        return Response(headers=headers)
+    path = os.path.join(UPLOAD_DIR, name)
+    if not os.path.isfile(path): raise HTTPException(status_code=404)
+    return FileResponse(path, headers=headers)
+
+# --- 썸네일 (백그라운드) ---
+def make_thumbnail(file_name):
+    dest = os.path.join(UPLOAD_DIR, thumb_name(file_name))
+    if os.path.exists(dest): return False
+    os.makedirs(THUMB_DIR, exist_ok=True)
+    tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+    with Image.open(os.path.join(UPLOAD_DIR, file_name)) as im:
+        im.thumbnail(THUMB_SIZE)
+        im.convert("RGB").save(tmp, "JPEG", quality=THUMB_QUALITY, optimize=True)
+    os.replace(tmp, dest)
+    return True
+
+class Thumbnailer:
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=1000)
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, file_name):
+        self.start()
+        try: self._queue.put_nowait(file_name)
+        except queue.Full: print(f"썸네일 큐 가득 참, 생략: {file_name}")
+
+    def start(self):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive(): return
+            self._worker = threading.Thread(target=self._run, name="thumbnailer", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            file_name = self._queue.get()
+            if file_name is None: break
+            try: make_thumbnail(file_name)
+            except Exception as e: print(f"썸네일 생성 실패 ({file_name}): {e}")
+
+    def stop(self, timeout=10):
+        if self._worker is None or not self._worker.is_alive(): return
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+thumbnailer = Thumbnailer()
@@ -2,7 +2,7 @@
 from database import SessionLocal
 import models
 import auth
-from datetime import timedelta, datetime
+import semesters
 
 def test_auto_schedule():
     print("🧪 [테스트 시작] 강의 생성 및 주차별 DB 자동 생성 확인")
@@ -37,23 +37,13 @@ def test_auto_schedule():
             instructor_id=instructor.id 
         )
         db.add(test_course)
-        db.commit()
-        db.refresh(test_course)
+        db.flush()
 
-        # 3. 17주차 데이터 생성 (main.py의 로직과 동일하게 수행)
-        # 2025년 9월 1일 월요일 개강 기준
-        start_date = datetime(2025, 9, 1, 9, 0, 0)
-        sessions = []
-        for i in range(17):
-            sessions.append(models.ClassSession(
-                course_id=test_course.id,
-                week_number=i+1,
-                session_date=start_date + timedelta(weeks=i),
-                attendance_method='ELECTRONIC',
-                is_open=False
-            ))
-        db.add_all(sessions)
+        # 3. 17주차 데이터 생성 (main.py 의 create_course 와 같은 학기 달력 사용)
+        # 2025-2 학기: 2025년 9월 1일 월요일 개강
+        semesters.generate_sessions(db, [(test_course.id, test_course.semester, test_course.day_of_week)])
         db.commit()
+        sessions = db.query(models.ClassSession).filter_by(course_id=test_course.id).order_by(models.ClassSession.week_number).all()
 
         # 4. 검증
         count = db.query(models.ClassSession).filter_by(course_id=test_course.id).count()
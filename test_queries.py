@@ -0,0 +1,991 @@
+# test_queries.py
+# 집계 쿼리의 쿼리 수가 수강 인원과 무관하게 일정한지 확인 (SQLite 메모리 DB 사용)
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi import HTTPException
+import models
+import reports
+import analytics
+import live
+import checkin
+import auth
+import database
+import audit
+import events
+
+def make_db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(bind=engine)()
+
+@contextmanager
+def count_queries(engine):
+    stmts = []
+    def on_execute(conn, cursor, statement, params, context, executemany):
+        stmts.append(statement)
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield stmts
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+def seed_course(db, n_students, n_weeks=1):
+    prof = models.User(email="prof@test.com", password="x", name="교수", role="INSTRUCTOR")
+    db.add(prof)
+    db.flush()
+    course = models.Course(title="테스트강의", semester="2025-2", instructor_id=prof.id)
+    db.add(course)
+    db.flush()
+    sessions = [models.ClassSession(course_id=course.id, week_number=w + 1, session_date=datetime(2025, 9, 1 + w)) for w in range(n_weeks)]
+    db.add_all(sessions)
+    students = [models.User(email=f"s{i}@test.com", password="x", name=f"학생{i}", student_number=f"2025{i:04d}", role="STUDENT") for i in range(n_students)]
+    db.add_all(students)
+    db.flush()
+    db.add_all([models.Enrollment(user_id=s.id, course_id=course.id) for s in students])
+    db.commit()
+    return course, sessions, students
+
+def test_session_roster_query_count_is_flat():
+    counts = []
+    for n in (3, 30, 300):
+        engine, db = make_db()
+        course, sessions, students = seed_course(db, n)
+        session = sessions[0]
+        db.add_all([
+            models.Attendance(session_id=session.id, student_id=students[0].id, status=1, vote_response='Y'),
+            models.Attendance(session_id=session.id, student_id=students[1].id, status=5, proof_file="a.png", vote_response='N'),
+            models.Attendance(session_id=session.id, student_id=students[2].id, status=2, vote_response='Y'),
+        ])
+        db.commit()
+        db.refresh(session)
+        with count_queries(engine) as stmts:
+            data = reports.build_session_roster(db, session)
+        counts.append(len(stmts))
+        assert len(data["roster"]) == n
+        assert data["vote_stat"] == {"Y": 2, "N": 1}
+        assert [r["status"] for r in data["roster"][:4]] == [1, 5, 2, 0][:min(n, 4)]
+        assert data["roster"][1]["proof_file"] == "a.png"
+        db.close()
+    assert counts == [1, 1, 1]
+
+def test_stack_report_streaks_follow_week_order():
+    counts = []
+    for n in (3, 60):
+        engine, db = make_db()
+        course, sessions, students = seed_course(db, n, n_weeks=4)
+        s0, s1, s2 = students[:3]
+        # 일부러 주차 역순으로 기록 삽입
+        db.add_all([
+            models.Attendance(session_id=sessions[1].id, student_id=s0.id, status=2),
+            models.Attendance(session_id=sessions[0].id, student_id=s0.id, status=2),
+            models.Attendance(session_id=sessions[2].id, student_id=s1.id, status=2),
+            models.Attendance(session_id=sessions[0].id, student_id=s1.id, status=2),
+            models.Attendance(session_id=sessions[0].id, student_id=s2.id, status=3),
+            models.Attendance(session_id=sessions[1].id, student_id=s2.id, status=4, proof_file="p.png"),
+            models.Attendance(session_id=sessions[2].id, student_id=s2.id, status=5, proof_file="q.png"),
+        ])
+        db.commit()
+        with count_queries(engine) as stmts:
+            report = analytics.stack_report(db, course.id)
+        counts.append(len(stmts))
+        by_name = {r["student_name"]: r for r in report["risk_group"]}
+        assert by_name[s0.name]["is_risk"] is True     # 1~2주차 연속 지각
+        assert by_name[s1.name]["is_risk"] is False    # 2주차 미기록으로 연속 끊김
+        assert by_name[s1.name]["total_late"] == 2
+        assert by_name[s2.name]["total_absent"] == 1
+        assert report["official_approval_rate"] == 50.0
+        assert report["weekly_attendance"][1] == round(1 / n * 100, 1)
+        assert len(report["weekly_attendance"]) == 4
+        db.close()
+    assert counts[0] == counts[1]
+
+def test_student_dashboard_grouped_and_cached():
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 2, n_weeks=4)
+    me = students[0]
+    extra = [models.Course(title=f"강의{i}", semester="2025-2", instructor_id=course.instructor_id) for i in range(4)]
+    db.add_all(extra)
+    db.flush()
+    db.add_all([models.Enrollment(user_id=me.id, course_id=c.id) for c in extra])
+    db.add_all([
+        models.Attendance(session_id=sessions[0].id, student_id=me.id, status=1),
+        models.Attendance(session_id=sessions[1].id, student_id=me.id, status=3),
+        models.Attendance(session_id=sessions[2].id, student_id=me.id, status=3),
+        models.Attendance(session_id=sessions[0].id, student_id=students[1].id, status=1),
+    ])
+    db.commit()
+    me_id = me.id
+    reports.invalidate_dashboard(me_id)
+    with count_queries(engine) as stmts:
+        data = reports.get_student_dashboard(db, me_id)
+    assert len(stmts) == 1
+    assert len(data) == 5
+    assert data[0]["attendance_rate"] == 25.0 and data[0]["is_warning"] is True
+    assert data[1]["attendance_rate"] == 0.0 and data[1]["is_warning"] is False
+    with count_queries(engine) as stmts:
+        assert reports.get_student_dashboard(db, me_id) == data
+    assert stmts == []
+    reports.invalidate_dashboard(me_id)
+    with count_queries(engine) as stmts:
+        reports.get_student_dashboard(db, me_id)
+    assert len(stmts) == 1
+    # 다른 워커의 무효화(공유 버전만 올라감): 이 워커에 남은 항목은 토큰이 달라 다시 만듦
+    reports.dashboard_versions.bump(me_id)
+    with count_queries(engine) as stmts:
+        reports.get_student_dashboard(db, me_id)
+    assert len(stmts) == 1
+    reports.invalidate_dashboard(me_id)
+    db.close()
+
+def test_course_report_bulk_and_stream_match():
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 40, n_weeks=3)
+    db.add_all([models.Attendance(session_id=s.id, student_id=students[0].id, status=st) for s, st in zip(sessions, (1, 4, 3))])
+    db.add(models.Attendance(session_id=sessions[0].id, student_id=students[1].id, status=1))
+    db.commit()
+    db.refresh(course)
+    with count_queries(engine) as stmts:
+        report = reports.build_course_report(db, course, len(sessions))
+    assert len(stmts) == 1
+    assert [r["attended_count"] for r in report["reports"][:3]] == [2, 1, 0]
+    assert report["reports"][0]["attendance_rate"] == 66.7
+    streamed = "".join(reports.stream_course_report(sessionmaker(bind=engine), course.id, course.title, len(sessions)))
+    assert json.loads(streamed) == report
+    csv_rows = "".join(reports.stream_course_report(sessionmaker(bind=engine), course.id, course.title, len(sessions), "csv")).splitlines()
+    assert len(csv_rows) == 41 and csv_rows[1] == f"{students[0].name},3,2,66.7"
+    db.close()
+
+def test_live_stat_served_from_counters():
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 5)
+    session = sessions[0]
+    db.add(models.Attendance(session_id=session.id, student_id=students[0].id, status=1))
+    session.is_open = True
+    db.commit()
+    live.backend = live.MemoryBackend()
+    live.open_session(db, session)
+    sid = session.id
+    with count_queries(engine) as stmts:
+        assert live.get_stat(db, sid)["attended"] == 1
+        live.status_changed(sid, None, 1)
+        live.status_changed(sid, 1, 5)      # 출석 -> 공결 신청중
+        live.status_changed(sid, 5, 4)      # 신청중 -> 공결 승인
+        stat = live.get_stat(db, sid)
+    assert stmts == []
+    assert stat == {"total": 5, "attended": 2, "auth_code": None}
+    # 재시작(카운터 유실) 시 DB에서 다시 적재
+    live.backend = live.MemoryBackend()
+    assert live.get_stat(db, sid)["attended"] == 1
+    assert live.backend.get(sid) is not None
+    # 재적재 중(DB 집계와 적재 사이)에 들어온 증감도 반영, 먼저 채운 값은 덮어쓰지 않음
+    live.backend = live.MemoryBackend()
+    count_from_db = live.count_from_db
+    def racing_count(db, session):
+        stat = count_from_db(db, session)
+        live.status_changed(session.id, None, 1)
+        return stat
+    live.count_from_db = racing_count
+    try:
+        assert live.get_stat(db, sid)["attended"] == 1
+    finally:
+        live.count_from_db = count_from_db
+    assert live.backend.get(sid)["attended"] == 2
+    live.backend.fill(sid, 5, 0, None)
+    assert live.backend.get(sid)["attended"] == 2
+    # 백엔드 없음(멀티 워커) 이면 항상 DB
+    live.backend = None
+    with count_queries(engine) as stmts:
+        live.get_stat(db, sid)
+    assert len(stmts) == 3
+    live.backend = live.make_backend()
+    db.close()
+
+def test_stat_publish_debounced_per_session():
+    calls = []
+    publish = events.Debouncer(0.05, calls.append)
+    for _ in range(50):
+        publish(1)
+        publish(2)
+    assert publish.pending() == 2
+    deadline = time.monotonic() + 2
+    while publish.pending() and time.monotonic() < deadline: time.sleep(0.01)
+    assert sorted(calls) == [1, 2]
+    publish(1)
+    time.sleep(0.2)
+    assert sorted(calls) == [1, 1, 2]
+
+def test_checkin_pipeline_batches_and_keeps_result_codes():
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 50)
+    session = sessions[0]
+    session.is_open = True
+    session.attendance_method = 'AUTH_CODE'
+    session.auth_code = '1234'
+    db.add(models.Attendance(session_id=session.id, student_id=students[0].id, status=0, vote_response='Y'))
+    db.commit()
+    sid = session.id
+    ids = [s.id for s in students]
+    flushed = []
+    pipeline = checkin.CheckinPipeline(sessionmaker(bind=engine), on_flush=lambda _db, rows, inserted: flushed.extend(rows), mode="queue")
+    def status_of(fn):
+        try: fn()
+        except HTTPException as e: return e.status_code, e.detail
+        return 200, None
+    assert status_of(lambda: pipeline.check_in(db, sid, ids[1])) == (400, "인증번호 필요")
+    assert status_of(lambda: pipeline.check_in(db, sid, ids[1], "0000")) == (400, "인증번호 불일치")
+    assert status_of(lambda: pipeline.check_in(db, sid, ids[0], "1234")) == (400, "이미 출석하셨습니다.")
+    assert status_of(lambda: pipeline.check_in(db, 9999, ids[1], "1234"))[0] == 404
+    # 세션 정보가 캐시된 뒤에는 출석 접수에 DB 조회가 없음
+    with count_queries(engine) as stmts:
+        for uid in ids[1:]:
+            pipeline.check_in(db, sid, uid, "1234")
+        assert status_of(lambda: pipeline.check_in(db, sid, ids[1], "1234")) == (400, "이미 출석하셨습니다.")
+    assert stmts == []
+    pipeline.stop()
+    assert len(flushed) == 49
+    assert db.query(models.Attendance).filter_by(session_id=sid, status=1).count() == 49
+    # 유니크 제약으로 중복 INSERT 는 무시됨
+    checkin.insert_ignore(db, [{"session_id": sid, "student_id": ids[1], "status": 1}])
+    assert db.query(models.Attendance).filter_by(session_id=sid).count() == 50
+    # 세션이 닫히면 캐시를 비우고 다시 읽음
+    session.is_open = False
+    db.commit()
+    pipeline.forget(sid)
+    assert status_of(lambda: pipeline.check_in(db, sid, ids[1], "1234")) == (400, "출석체크 시간이 아닙니다.")
+    # 다른 워커에서 세션을 다시 열고 인증번호를 바꾸면 공유 버전이 올라가 이 워커도 TTL 을 기다리지 않고 다시 읽음
+    import cache
+    shared = cache.LocalVersions(ttl=60)
+    here = checkin.CheckinPipeline(sessionmaker(bind=engine), mode="queue", versions=shared)
+    there = checkin.CheckinPipeline(sessionmaker(bind=engine), mode="queue", versions=shared)
+    session.is_open = True
+    db.commit()
+    assert status_of(lambda: here.check_in(db, sid, ids[1], "0000")) == (400, "인증번호 불일치")
+    session.auth_code = "0000"
+    db.commit()
+    there.forget(sid)
+    assert status_of(lambda: here.check_in(db, sid, ids[1], "0000")) == (400, "이미 출석하셨습니다.")
+    # 공유 저장소 없는 direct 모드는 캐시하지 않음
+    direct = checkin.CheckinPipeline(sessionmaker(bind=engine), mode="direct")
+    direct.record(db, sid)
+    session.is_open = False
+    db.commit()
+    assert status_of(lambda: direct.check_in(db, sid, ids[1], "0000")) == (400, "출석체크 시간이 아닙니다.")
+    db.close()
+
+def test_checkin_settle_waits_for_inflight_batch_and_counts_inserted_rows(tmp_path):
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 4)
+    session = sessions[0]
+    session.is_open = True
+    db.commit()
+    sid, ids = session.id, [s.id for s in students]
+    factory = sessionmaker(bind=engine)
+    counted = []
+    pipeline = checkin.CheckinPipeline(factory, on_flush=lambda _db, rows, inserted: counted.append(inserted), mode="queue",
+                                       deadletter=str(tmp_path / "failed.jsonl"))
+    pipeline.start = lambda: None   # writer 없이 flush 를 직접 호출
+    pipeline.check_in(db, sid, ids[0])
+    pipeline.check_in(db, sid, ids[1])
+    # 다른 경로가 먼저 기록을 만든 학생은 INSERT IGNORE 로 건너뛰고 세지 않음
+    db.add(models.Attendance(session_id=sid, student_id=ids[1], status=3))
+    db.commit()
+    # 배치가 커밋되기 전(저장 중)에 settle 하면 커밋을 기다린 뒤 돌아옴
+    insert_batch = checkin.insert_batch
+    settled, committed = [], []
+    def slow_insert(_db, rows):
+        waiter = threading.Thread(target=lambda: (pipeline.settle(factory(), sid, ids[0]), settled.append(time.monotonic())))
+        waiter.start()
+        time.sleep(0.2)
+        assert not settled
+        result = insert_batch(_db, rows)
+        committed.append(time.monotonic())
+        return result
+    checkin.insert_batch = slow_insert
+    try:
+        batch = [pipeline._queue.get_nowait() for _ in range(2)]
+        pipeline.flush(batch)
+    finally:
+        checkin.insert_batch = insert_batch
+    deadline = time.monotonic() + 2
+    while not settled and time.monotonic() < deadline: time.sleep(0.01)
+    assert settled and settled[0] >= committed[0]
+    assert counted == [{sid: 1}]
+    assert pipeline.metrics()["written"] == 1 and pipeline.metrics()["ignored"] == 1
+    # 저장에 끝내 실패한 배치는 파일에 남기고 replay 로 재기록
+    pipeline.check_in(db, sid, ids[2])
+    checkin.insert_batch = lambda _db, rows: (_ for _ in ()).throw(RuntimeError("db down"))
+    sleep, checkin.time.sleep = checkin.time.sleep, lambda s: None
+    try: pipeline.flush([pipeline._queue.get_nowait()])
+    finally: checkin.insert_batch, checkin.time.sleep = insert_batch, sleep
+    assert pipeline.metrics()["failed"] == 1
+    assert checkin.replay(factory, str(tmp_path / "failed.jsonl")) == 1
+    assert db.query(models.Attendance).filter_by(session_id=sid, student_id=ids[2], status=1).count() == 1
+    # 공유 저장소 없는 멀티 워커(direct): 다른 워커가 이미 기록했으면 DB 유니크 키로 같은 결과 코드
+    other = checkin.CheckinPipeline(factory, mode="direct")
+    other.seen.load(sid, set())   # 이 워커는 기록 전에 집합을 적재함
+    try: other.check_in(db, sid, ids[0])
+    except HTTPException as e: assert (e.status_code, e.detail) == (400, "이미 출석하셨습니다.")
+    else: assert False
+    db.close()
+
+def test_checkin_async_waits_off_the_event_loop(tmp_path):
+    # DB_MODE=async: 큐 대기(put 1초)와 settle 의 커밋 대기 동안에도 이벤트 루프가 다른 작업을 처리
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    course, sessions, students = seed_course(db, 4)
+    sessions[0].is_open = True
+    db.commit()
+    sid, ids = sessions[0].id, [s.id for s in students]
+    factory = sessionmaker(bind=engine)
+    flushed = []
+    direct = checkin.CheckinPipeline(factory, on_flush=lambda _db, rows, inserted: flushed.append(inserted), mode="direct")
+    queued = checkin.CheckinPipeline(factory, mode="queue")
+    queued.start = lambda: None
+    queued._queue.maxsize = 1
+    queued._inflight[(sid, ids[3])] = {}   # writer 가 저장 중인 행
+    threading.Timer(0.5, queued._release, [[(sid, ids[3])]]).start()
+
+    async def run():
+        async_engine = create_async_engine(database.to_async_url(url))
+        ticks, codes = [], []
+        async def ticker():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.02)
+        task = asyncio.create_task(ticker())
+        try:
+            async with async_sessionmaker(async_engine, expire_on_commit=False)() as adb:
+                await direct.check_in_async(adb, sid, ids[0])
+                await queued.check_in_async(adb, sid, ids[1])
+                try: await queued.check_in_async(adb, sid, ids[2])   # 큐가 가득 참
+                except HTTPException as e: codes.append(e.status_code)
+                await queued.settle_async(adb, sid, ids[3])
+        finally:
+            task.cancel()
+            await async_engine.dispose()
+        return ticks, codes
+    ticks, codes = asyncio.run(run())
+    assert codes == [503] and flushed == [{sid: 1}]
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.3
+    assert db.query(models.Attendance).filter_by(session_id=sid, student_id=ids[0], status=1).count() == 1
+    db.close()
+
+def test_async_session_runs_sync_helpers(tmp_path):
+    # DB_MODE=async 경로: AsyncSession(aiosqlite) 에서 기존 동기 조회 함수를 run_sync 로 실행
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    course, sessions, students = seed_course(db, 3, n_weeks=2)
+    db.add(models.Attendance(session_id=sessions[1].id, student_id=students[0].id, status=2))
+    db.commit()
+    course_id, me_id, email = course.id, students[0].id, students[0].email
+    expected = reports.build_student_sessions(db, course_id, me_id)
+    db.close()
+
+    async def run():
+        async_engine = create_async_engine(database.to_async_url(url))
+        try:
+            async with async_sessionmaker(async_engine, expire_on_commit=False)() as adb:
+                user = await adb.run_sync(auth.load_user, email)
+                rows = await adb.run_sync(reports.build_student_sessions, course_id, user.id)
+            threaded = database.ThreadedSession(sessionmaker(bind=engine)())
+            try: same = await threaded.run_sync(reports.build_student_sessions, course_id, me_id)
+            finally: await threaded.close()
+            return rows, same
+        finally:
+            await async_engine.dispose()
+    rows, same = asyncio.run(run())
+    assert rows == expected == same
+    assert [r["my_status"] for r in rows] == [0, 2]
+
+def test_principal_cache_and_token_claims():
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 1)
+    email, uid = students[0].email, students[0].id
+    auth.invalidate_user(email)
+    with count_queries(engine) as stmts:
+        first = auth.load_principal(db, email)
+        again = auth.load_principal(db, email)
+    assert len(stmts) == 1 and again is first and first.name == students[0].name
+    # 캐시에 있으면 토큰의 ver 와 token_version 만 비교 (DB 없음)
+    payload = auth.decode_token(auth.create_access_token({"sub": email, "role": "STUDENT", "ver": 0}))
+    with count_queries(engine) as stmts:
+        p = auth.cached_principal(payload)
+        assert auth.resolve_principal(db, payload) is p
+    assert stmts == [] and (p.id, p.role) == (uid, "STUDENT")
+    # 권한이 바뀌면 token_version 이 올라가 이전 토큰은 (다른 워커/재시작 후에도) DB 기준으로 거부
+    students[0].role = "INSTRUCTOR"
+    students[0].token_version += 1
+    db.commit()
+    auth.principal_cache.clear()   # 다른 워커: 캐시 만료(PRINCIPAL_TTL) 후와 같음
+    assert auth.cached_principal(payload) is None
+    try: auth.resolve_principal(db, payload)
+    except HTTPException as e: assert e.status_code == 401
+    else: assert False
+    fresh = auth.decode_token(auth.create_access_token({"sub": email, "role": "INSTRUCTOR", "ver": 1}))
+    assert auth.resolve_principal(db, fresh).role == "INSTRUCTOR"
+    # 관리자는 캐시가 있어도 매번 DB 에서 확인 -> 강등 즉시 반영
+    students[0].role = "ADMIN"
+    db.commit()
+    auth.principal_cache.clear()
+    with count_queries(engine) as stmts:
+        assert auth.resolve_principal(db, fresh).role == "ADMIN"
+    assert len(stmts) == 1   # 캐시가 비어 있어도 한 번만 조회
+    assert auth.cached_principal(fresh) is None
+    students[0].role = "STUDENT"
+    db.commit()
+    assert auth.resolve_principal(db, fresh).role == "STUDENT"
+    auth.invalidate_user(email)
+    db.close()
+
+def test_password_pool_verifies_and_rehashes_on_cost_change():
+    from passlib.context import CryptContext
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=auth.BCRYPT_ROUNDS - 1).hash("pw1234")
+    try:
+        assert asyncio.run(auth.verify_and_update_async("wrong", old_hash)) == (False, None)
+        valid, new_hash = asyncio.run(auth.verify_and_update_async("pw1234", old_hash))
+        assert valid and new_hash and new_hash != old_hash
+        assert auth.verify_and_update("pw1234", new_hash) == (True, None)
+    finally:
+        auth.stop_password_pool()
+        auth.password_slots = None
+
+def test_index_migration_dedupes_and_hot_queries_use_indexes():
+    import migrate_indexes
+    from sqlalchemy import MetaData, UniqueConstraint, inspect, insert
+    engine, db = make_db()
+    db.close()
+    assert migrate_indexes.check_plans(engine) == []
+    assert migrate_indexes.migrate(engine) == []
+
+    # 인덱스/유니크 제약 없이 만들어진 기존 DB
+    old = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    meta = MetaData()
+    for table in models.Base.metadata.sorted_tables:
+        t = table.to_metadata(meta)
+        t.indexes.clear()
+        t.constraints = {c for c in t.constraints if not isinstance(c, UniqueConstraint)}
+    meta.create_all(old)
+    with old.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "email": "s@x", "password": "x", "name": "s", "role": "STUDENT"}])
+        conn.execute(insert(models.Course), [{"id": 1, "title": "c", "semester": "2025-2"}])
+        conn.execute(insert(models.ClassSession), [{"id": 1, "course_id": 1, "week_number": 1, "session_date": datetime(2025, 9, 1)}])
+        conn.execute(insert(models.Enrollment), [{"id": i, "user_id": 1, "course_id": 1} for i in (1, 2, 3)])
+        conn.execute(insert(models.Attendance), [{"id": i, "session_id": 1, "student_id": 1, "status": i} for i in (1, 2)])
+    assert {name for name, _ in migrate_indexes.check_plans(old)} >= {"출석 인원 (세션+상태)", "수강생 목록 (강의)", "학번 조회"}
+
+    assert migrate_indexes.migrate(old, dry_run=True)
+    assert inspect(old).get_indexes("enrollments") == []
+    created = migrate_indexes.migrate(old)
+    assert {"uq_attendance_session_student", "uq_enrollment_user_course", "ix_attendance_session_status"} <= set(created)
+    with old.connect() as conn:
+        assert [r.id for r in conn.execute(select(models.Enrollment.id))] == [1]
+        assert [(r.id, r.status) for r in conn.execute(select(models.Attendance.id, models.Attendance.status))] == [(1, 1)]
+    assert migrate_indexes.check_plans(old) == []
+    assert migrate_indexes.migrate(old) == []
+
+def test_admin_lists_keyset_pages_with_filters():
+    import listing
+    engine, db = make_db()
+    course, _, students = seed_course(db, 25)
+    db.add(models.User(email="x@test.com", password="x", name="100%_학생", role="STUDENT"))
+    db.commit()
+
+    seen = []
+    with count_queries(engine) as stmts:
+        first = listing.user_page(db, role="STUDENT", limit=10)
+    assert len(stmts) == 2 and first["total"] == 26 and len(first["items"]) == 10
+    assert set(first["items"][0]) == {"id", "email", "name", "student_number", "role", "department_id"}
+    page = first
+    while True:
+        seen += [u["id"] for u in page["items"]]
+        if page["next_cursor"] is None: break
+        with count_queries(engine) as stmts:
+            page = listing.user_page(db, role="STUDENT", cursor=page["next_cursor"], limit=10)
+        assert len(stmts) == 1 and page["total"] is None
+    assert seen == sorted(seen) and len(seen) == 26
+
+    assert listing.user_page(db, q="학생1")["total"] == 11
+    assert [u["name"] for u in listing.user_page(db, q="100%")["items"]] == ["100%_학생"]
+    assert listing.user_page(db, q="2025000")["total"] == 10
+    assert listing.course_page(db, semester="2025-2", q="테스트")["items"][0]["id"] == course.id
+    assert listing.course_page(db, semester="2024-1")["total"] == 0
+
+def test_department_overview_grouped_and_cached():
+    import stats
+    engine, db = make_db()
+    depts = [models.Department(name=f"학과{i}") for i in range(20)]
+    db.add_all(depts)
+    db.flush()
+    db.add_all([models.User(email=f"u{i}@test.com", password="x", name="u", role="STUDENT", department_id=depts[i % 4].id) for i in range(12)])
+    db.add(models.User(email="nodept@test.com", password="x", name="u", role="ADMIN"))
+    db.add(models.Course(title="c", semester="2025-2", department_id=depts[0].id))
+    db.commit()
+    stats.invalidate()
+
+    with count_queries(engine) as stmts:
+        overview = stats.get_overview(db)
+        assert stats.get_overview(db) is overview
+    assert len(stmts) == 3
+    assert overview["users"] == 13 and overview["courses"] == 1 and len(overview["departments"]) == 20
+    assert [(d["user_count"], d["course_count"]) for d in overview["departments"][:5]] == [(3, 1), (3, 0), (3, 0), (3, 0), (0, 0)]
+    assert tuple(stats.department_counts(db, depts[0].id)) == (3, 1)
+
+    db.add(models.User(email="new@test.com", password="x", name="u", role="STUDENT", department_id=depts[4].id))
+    db.commit()
+    stats.invalidate()
+    assert stats.get_overview(db)["departments"][4]["user_count"] == 1
+    stats.invalidate()
+
+def test_bulk_import_users_and_enrollments():
+    import io
+    import bulk_import
+    engine, db = make_db()
+    course, _, students = seed_course(db, 3)
+    db.add(models.Department(name="컴퓨터공학과"))
+    db.commit()
+
+    users_csv = ("email,name,password,role,student_number,department\n"
+                 "n1@test.com,신입1,pw1,student,20260001,컴퓨터공학과\n"
+                 "s0@test.com,중복,pw,STUDENT,20260002,\n"
+                 "n2@test.com,신입2,pw2,STUDENT,20260003,없는학과\n"
+                 "n3@test.com,신입3,pw3,INSTRUCTOR,,\n"
+                 "n1@test.com,파일내중복,pw,STUDENT,,\n"
+                 ",이름만,,STUDENT,,\n")
+    try:
+        with count_queries(engine) as stmts:
+            report = bulk_import.import_users(db, io.BytesIO(users_csv.encode("cp949")), actor_id=1)
+    finally:
+        auth.stop_password_pool()
+    assert (report["total"], report["created"], report["error_count"]) == (6, 2, 4)
+    assert [e["line"] for e in report["errors"]] == [3, 4, 6, 7]
+    assert len([s for s in stmts if s.startswith("INSERT INTO users")]) == 1
+    n1 = db.query(models.User).filter_by(email="n1@test.com").one()
+    assert n1.department_id is not None and auth.verify_password("pw1", n1.password)
+    assert db.query(models.AuditLog).filter_by(action="BULK_CREATE").count() == 1
+
+    enroll_csv = "student_number,course_id\n20260001,{c}\n20250000,{c}\n99999999,{c}\n20260001,{c}\n20250001,999\n".format(c=course.id)
+    report, user_ids, course_ids = bulk_import.import_enrollments(db, io.BytesIO(enroll_csv.encode()), actor_id=1)
+    assert (report["created"], report["error_count"]) == (1, 4)
+    assert user_ids == {n1.id} and course_ids == {course.id}
+    report, _, _ = bulk_import.import_enrollments(db, io.BytesIO(b"student_number\n20250001\n20250002\n"), actor_id=1, course_id=course.id)
+    assert report["error_count"] == 2 and "이미 수강 중" in report["errors"][0]["error"]
+    # 인코딩 추정 구간(앞 64KB) 뒤에 CP949 바이트가 섞이면 그 행만 오류
+    body = "".join(f"u{i}@test.com,사용자{i},pw,STUDENT,,\n" for i in range(2500)).encode()
+    mixed = b"email,name,password,role,student_number,department\n" + body + "late@test.com,늦은행,pw,STUDENT,,\n".encode("cp949")
+    hash_passwords, auth.hash_passwords = auth.hash_passwords, lambda passwords: ["x"] * len(passwords)   # bcrypt 생략
+    try: report = bulk_import.import_users(db, io.BytesIO(mixed), actor_id=1)
+    finally: auth.hash_passwords = hash_passwords
+    assert (report["total"], report["created"], report["error_count"]) == (2501, 2500, 1)
+    assert report["errors"][0]["line"] == 2502 and "인코딩" in report["errors"][0]["error"]
+
+def test_bulk_import_reads_upload_file_without_readable():
+    import tempfile
+    from fastapi import UploadFile
+    import bulk_import
+
+    class Spooled(tempfile.SpooledTemporaryFile):   # 파이썬 3.9 의 SpooledTemporaryFile: readable() 등이 없음
+        def __getattribute__(self, name):
+            if name in ("readable", "writable", "seekable", "read1"): raise AttributeError(name)
+            return super().__getattribute__(name)
+
+    engine, db = make_db()
+    spooled = Spooled(max_size=1024 * 1024)
+    spooled.write("\ufeffemail,name,password,role,student_number,department\nup@test.com,업로드,pw,STUDENT,,\n".encode("utf-8"))
+    spooled.seek(0)
+    upload = UploadFile(file=spooled, filename="users.csv")
+    hash_passwords, auth.hash_passwords = auth.hash_passwords, lambda passwords: ["x"] * len(passwords)   # bcrypt 생략
+    try: report = bulk_import.import_users(db, upload.file, actor_id=1)
+    finally: auth.hash_passwords = hash_passwords
+    assert (report["total"], report["created"], report["error_count"]) == (1, 1, 0)
+    assert db.query(models.User).filter_by(email="up@test.com").one().name == "업로드"
+
+def test_semester_calendar_bulk_generation_and_updates():
+    from datetime import date, timedelta
+    import semesters
+    engine, db = make_db()
+    semesters.grid_cache.clear()
+    courses = [models.Course(title=f"c{i}", semester="2025-2", day_of_week=day) for i, day in enumerate(["Mon", "Wed", "Fri"] * 10)]
+    courses.append(models.Course(title="미등록", semester="2030-1", day_of_week="Mon"))
+    db.add_all(courses)
+    db.flush()
+    with count_queries(engine) as stmts:
+        n = semesters.generate_sessions(db, [(c.id, c.semester, c.day_of_week) for c in courses])
+    db.commit()
+    assert n == 30 * 17 and len([s for s in stmts if s.startswith("INSERT INTO class_sessions")]) == 1
+
+    # 기존 하드코딩 로직과 같은 날짜/공휴일 (2025-09-01 월요일 개강, 17주)
+    wed = db.query(models.ClassSession).filter_by(course_id=courses[1].id).order_by(models.ClassSession.week_number).all()
+    assert [s.session_date.date() for s in wed] == [date(2025, 9, 3) + timedelta(weeks=w) for w in range(17)]
+    assert [s.week_number for s in wed if s.is_holiday] == [6]
+    assert db.query(models.ClassSession).filter_by(course_id=courses[-1].id).count() == 0
+
+    sem = semesters.get_semester(db, "2025-2")
+    with count_queries(engine) as stmts:
+        assert semesters.set_holidays(db, sem, [(date(2025, 9, 3), "개교기념일")]) == 30 * 17
+    db.commit()
+    assert len([s for s in stmts if s.startswith("UPDATE class_sessions")]) == 1
+    assert [s.week_number for s in db.query(models.ClassSession).filter_by(course_id=courses[1].id, is_holiday=True)] == [1]
+    assert semesters.get_grid(db, "2025-2").days["Wed"][0][1] is True
+
+    moved = semesters.reschedule(db, sem, date(2025, 9, 3), date(2025, 9, 6))
+    db.commit()
+    assert len(moved) == 10
+    db.expire_all()
+    first = db.query(models.ClassSession).filter_by(course_id=courses[1].id, week_number=1).one()
+    assert first.session_date == datetime(2025, 9, 6, 9, 0) and first.is_holiday is False
+    # 기본 학기를 동시에 처음 만드는 경우: 조회 뒤 다른 요청이 먼저 넣었으면 SAVEPOINT 만 되돌리고 그 행을 사용
+    class Missed:
+        def filter(self, *args): return self
+        def first(self): return None
+    query, missed = db.query, []
+    db.query = lambda *args: (missed.append(1), Missed())[1] if args[0] is models.Semester and not missed else query(*args)
+    late = models.Course(title="동시", semester="2025-2", day_of_week="Tue")
+    db.add(late)
+    db.flush()
+    try: assert semesters.get_semester(db, "2025-2").id == sem.id
+    finally: del db.query
+    db.commit()
+    assert missed and db.query(models.Course).filter_by(title="동시").count() == 1
+    semesters.grid_cache.clear()
+
+def test_audit_writer_batches_and_counts_overflow(monkeypatch):
+    engine, db = make_db()
+    writer = audit.AuditWriter(sessionmaker(bind=engine))
+    with count_queries(engine) as stmts:
+        for i in range(20): assert writer.record(1, "SESSION", i, "UPDATE_STATUS", "True")
+    assert stmts == []  # 요청 쪽에서는 DB 접근 없음
+    with count_queries(engine) as stmts:
+        writer.stop()
+    assert len([s for s in stmts if s.startswith("INSERT")]) == 1
+    assert db.query(models.AuditLog).count() == 20
+    assert db.query(models.AuditLog).filter(models.AuditLog.created_at.is_(None)).count() == 0   # DB 기본값(NOW())
+    m = writer.metrics()
+    assert (m["enqueued"], m["written"], m["batches"], m["dropped"], m["depth"]) == (20, 20, 1, 0, 0)
+    # 종료 뒤에 들어온 기록은 writer 를 다시 띄우지 않고 바로 저장
+    assert writer.record(1, "SESSION", 99, "UPDATE_STATUS", "late")
+    assert not writer._writer.is_alive() and writer._stopping.is_set()
+    assert db.query(models.AuditLog).count() == 21
+    writer = audit.AuditWriter(sessionmaker(bind=engine))
+    monkeypatch.setattr(writer, "start", lambda: None)  # writer 없이 큐만 채움
+    writer._queue.maxsize = 2
+    assert [writer.record(1, "VOTE", 1, "CAST_VOTE", "A") for _ in range(3)] == [True, True, False]
+    assert writer.metrics()["dropped"] == 1 and writer.pending() == 2
+    db.close()
+
+def test_audit_search_keyset_filters_and_archive():
+    from datetime import timedelta
+    import listing
+    import archive_audit
+    engine, db = make_db()
+    t0 = datetime(2025, 3, 1)
+    db.execute(models.AuditLog.__table__.insert(), [
+        {"actor_id": i % 3, "target_type": "SESSION" if i % 2 else "VOTE", "target_id": i % 5, "action": "CAST_VOTE" if i % 2 == 0 else "UPDATE_STATUS",
+         "details": str(i), "created_at": t0 + timedelta(days=i // 4)} for i in range(40)])  # 같은 시각이 4건씩
+    db.commit()
+    seen, cursor = [], None
+    while True:
+        page = listing.audit_page(db, actor_id=1, cursor=cursor, limit=3)
+        seen += [(r["created_at"], r["id"]) for r in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None: break
+    expected = db.query(models.AuditLog.created_at, models.AuditLog.id).filter_by(actor_id=1)\
+        .order_by(models.AuditLog.created_at.desc(), models.AuditLog.id.desc()).all()
+    assert seen == [tuple(r) for r in expected] and len(seen) == 13
+    page = listing.audit_page(db, target_type="VOTE", action="CAST_VOTE", since=t0 + timedelta(days=5), until=t0 + timedelta(days=7))
+    assert [r["details"] for r in page["items"]] == ["26", "24", "22", "20"]
+    try:
+        listing.audit_page(db, cursor="garbage")
+        assert False
+    except ValueError:
+        pass
+    assert archive_audit.archive(db, t0 + timedelta(days=5), chunk=7) == 20
+    assert db.query(models.AuditLog).count() == 20 and db.query(models.AuditLogArchive).count() == 20
+    old = listing.audit_page(db, models.AuditLogArchive, limit=100)["items"]
+    assert [r["details"] for r in old[:2]] == ["19", "18"] and old[-1]["id"] == 1
+    assert archive_audit.archive(db, t0 + timedelta(days=5)) == 0
+    db.close()
+
+def test_upload_storage_dedups_limits_and_thumbnails(tmp_path, monkeypatch):
+    import io
+    from fastapi import FastAPI, UploadFile
+    from fastapi.testclient import TestClient
+    import storage
+    monkeypatch.setattr(storage, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(storage, "THUMB_DIR", str(tmp_path / "thumbs"))
+    data = b"proof" * 1000
+    name1, size = asyncio.run(storage.save_upload(UploadFile(io.BytesIO(data), filename="a.PDF")))
+    name2, _ = asyncio.run(storage.save_upload(UploadFile(io.BytesIO(data), filename="b.pdf")))
+    assert name1 == name2 and name1.endswith(".pdf") and size == len(data)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [name1]
+    try:
+        asyncio.run(storage.save_upload(UploadFile(io.BytesIO(data), filename="c.pdf"), max_bytes=len(data) - 1))
+        assert False
+    except HTTPException as e:
+        assert e.status_code == 413
+    assert sorted(p.name for p in tmp_path.iterdir()) == [name1]  # 임시 파일 정리
+    assert storage.thumb_url(name1) is None
+
+    app = FastAPI()
+    app.add_middleware(storage.UploadSizeLimit, path_pattern=r"/up", max_bytes=1000)
+    @app.post("/up")
+    async def up(file: UploadFile):
+        return {"size": len(await file.read())}
+    client = TestClient(app)
+    assert client.post("/up", files={"file": ("x.bin", b"x" * 500)}).json() == {"size": 500}
+    assert client.post("/up", files={"file": ("x.bin", b"x" * 200000)}).status_code == 413
+    assert client.post("/up", content=iter([b"x" * 50000] * 4), headers={"content-type": "multipart/form-data; boundary=b"}).status_code == 413
+
+    if storage.Image is None: return
+    img = io.BytesIO()
+    storage.Image.new("RGB", (1200, 800), "red").save(img, "PNG")
+    img.seek(0)
+    name, _ = asyncio.run(storage.save_upload(UploadFile(img, filename="p.png")))
+    assert storage.make_thumbnail(name) in (True, False)  # 백그라운드에서 먼저 만들었을 수도 있음
+    storage.thumbnailer.stop()
+    assert storage.thumb_url(name) == f"thumbs/{name}.jpg"
+    with storage.Image.open(tmp_path / storage.thumb_url(name)) as thumb:
+        assert thumb.size == (320, 213)
+
+def test_static_precompressed_etag_and_protected_uploads(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import static_assets
+    import storage
+    (tmp_path / "page.html").write_text("<html>" + "출석 " * 2000 + "</html>", encoding="utf-8")
+    assert static_assets.build(str(tmp_path)) >= 1
+    assert static_assets.build(str(tmp_path)) == 0   # 원본이 그대로면 다시 만들지 않음
+    app = FastAPI()
+    app.mount("/static", static_assets.CachedStatic(directory=str(tmp_path)))
+    client = TestClient(app)
+    r = client.get("/static/page.html", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and r.headers["cache-control"] == "no-cache"
+    assert r.headers["content-type"].startswith("text/html") and "출석" in r.text
+    assert int(r.headers["content-length"]) < len((tmp_path / "page.html").read_bytes())
+    assert client.get("/static/page.html", headers={"Accept-Encoding": "gzip", "If-None-Match": r.headers["etag"]}).status_code == 304
+    plain = client.get("/static/page.html", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.headers["etag"] != r.headers["etag"]
+
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 2)
+    name = "a" * 64 + ".png"
+    db.add(models.Attendance(session_id=sessions[0].id, student_id=students[0].id, status=5, proof_file=name))
+    db.commit()
+    who = lambda uid, role="STUDENT": SimpleNamespace(id=uid, role=role)
+    assert storage.can_view(db, who(students[0].id), name)
+    assert storage.can_view(db, who(course.instructor_id, "INSTRUCTOR"), f"thumbs/{name}.jpg")
+    assert not storage.can_view(db, who(students[1].id), name)
+    monkeypatch.setattr(storage, "ACCEL_PREFIX", "/_protected_uploads/")
+    r = storage.upload_response(name)
+    assert r.headers["x-accel-redirect"] == f"/_protected_uploads/{name}" and "immutable" in r.headers["cache-control"]
+    assert "immutable" not in storage.upload_response("1_2_3.png").headers["cache-control"]
+    for bad in ("../main.py", ".tmp-x", "thumbs/../x"):
+        try:
+            storage.upload_response(bad)
+            assert False
+        except HTTPException as e:
+            assert e.status_code == 404
+    db.close()
+
+def test_http_cache_etag_304_and_version_bumps():
+    from starlette.requests import Request
+    import http_cache
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 1, n_weeks=2)
+    calls = []
+    async def build():
+        calls.append(1)
+        return [{"id": s.id, "week": s.week_number} for s in sessions]
+    def request(etag=None):
+        headers = [(b"if-none-match", etag.encode())] if etag else []
+        return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+    scopes, view = [("course", course.id)], ("instructor_sessions", course.id)
+    first = asyncio.run(http_cache.respond(request(), scopes, view, build))
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and json.loads(first.body)[0]["week"] == 1
+    assert asyncio.run(http_cache.respond(request(etag), scopes, view, build)).status_code == 304
+    assert asyncio.run(http_cache.respond(request(), scopes, view, build)).body == first.body   # 캐시된 본문 재사용
+    assert len(calls) == 1
+    http_cache.bump_sessions(db, sessions[1].id)   # 세션 -> 강의 버전
+    second = asyncio.run(http_cache.respond(request(etag), scopes, view, build))
+    assert second.status_code == 200 and second.headers["etag"] != etag and len(calls) == 2
+    other = asyncio.run(http_cache.respond(request(), scopes, ("student_sessions", course.id, 1), build))
+    assert other.headers["etag"] != second.headers["etag"]
+    with count_queries(engine) as stmts:
+        http_cache.bump_sessions(db, sessions[1].id)
+    assert stmts == []   # 세션의 강의는 캐시
+    before = http_cache.make_etag(scopes, view)
+    http_cache.bump_all()
+    assert http_cache.make_etag(scopes, view) != before
+    db.close()
+
+def test_db_startup_backoff_readiness_and_pool_metrics(tmp_path, monkeypatch):
+    import db_lifecycle
+    monkeypatch.setattr(db_lifecycle, "BACKOFF_BASE", 0.01)
+    engine = create_engine(f"sqlite:///{tmp_path}/app.db", poolclass=db_lifecycle.QueuePool, pool_size=2, max_overflow=1)
+    monitor = db_lifecycle.PoolMonitor(engine)
+    startup = db_lifecycle.DatabaseStartup(engine)
+    assert startup.readiness()[0] is False   # 시작 전에는 준비 안 됨
+    startup.start(models.Base.metadata)
+    assert startup.wait(5) and startup.state == "ready" and startup.attempts == 1
+    with engine.connect() as conn: assert "users" in engine.dialect.get_table_names(conn)   # 테이블 생성은 시작 단계에서
+    assert startup.readiness() == (True, {"status": "ready", "attempts": 1})
+    conns = [engine.connect(), engine.connect()]
+    status = monitor.status()
+    assert status["capacity"] == 3 and status["checked_out"] == 2 and status["saturation"] == round(2 / 3, 3)
+    for conn in conns: conn.close()
+    assert monitor.status()["checked_out"] == 0 and monitor.status()["max_checked_out"] >= 2
+    # 닿지 않는 DB: 무한 대기 없이 상한 안에서 재시도 후 failed
+    bad = db_lifecycle.DatabaseStartup(create_engine(f"sqlite:///{tmp_path}/missing/dir/x.db"))
+    t0 = datetime.now()
+    assert bad.run(timeout=0.3) is False
+    assert bad.state == "failed" and bad.attempts > 1 and (datetime.now() - t0).total_seconds() < 2
+    ok, body = bad.readiness()
+    assert ok is False and body["status"] == "failed" and "unable to open" in body["error"]
+
+def test_request_metrics_route_latency_and_sql_counts():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+    import metrics
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 4)
+    metrics.instrument(engine)
+    app = FastAPI()
+    registry = metrics.Registry()
+    app.add_middleware(metrics.RequestMetrics, registry=registry)
+
+    @app.get("/courses/{course_id}/names")
+    def names(course_id: int):   # 학생마다 한 번씩 조회하는 N+1 모양
+        with engine.connect() as conn:
+            ids = [r[0] for r in conn.execute(text("SELECT user_id FROM enrollments WHERE course_id = :c"), {"c": course_id})]
+            return [conn.execute(text("SELECT name FROM users WHERE id = :i"), {"i": i}).scalar() for i in ids]
+
+    @app.get("/boom")
+    def boom(): raise HTTPException(status_code=503)
+
+    with TestClient(app) as client:
+        assert len(client.get(f"/courses/{course.id}/names").json()) == 4
+        client.get(f"/courses/{course.id}/names")
+        client.get("/boom")
+        client.get("/nope")
+    key = ("GET", "/courses/{course_id}/names")   # 경로 템플릿 기준 (id 마다 라벨이 생기지 않음)
+    assert registry.requests[("GET", "/courses/{course_id}/names", 200)] == 2
+    assert registry.requests[("GET", "/boom", 503)] == 1 and registry.requests[("GET", metrics.UNMATCHED, 404)] == 1
+    assert registry.queries[key].sum == 10 and registry.latency[key].count == 2 and registry.in_flight == 0
+    text_out = metrics.render(registry, extra={"db_pool_checked_out": ("풀", [({"engine": "sync"}, 1)])})
+    assert 'http_request_sql_statements_bucket{method="GET",route="/courses/{course_id}/names",le="5"} 2' in text_out
+    assert 'http_requests_total{method="GET",route="/boom",status="503"} 1' in text_out
+    assert 'db_pool_checked_out{engine="sync"} 1' in text_out
+    top = metrics.summary(registry)
+    assert top["most_queries"][0]["route"] == "GET /courses/{course_id}/names" and top["most_queries"][0]["avg_queries"] == 5.0
+    assert top["errors_5xx"] == 1 and top["requests"] == 4
+    before = metrics.registry.background[0]
+    db.query(models.User).count()   # 요청 밖 SQL 은 백그라운드로 집계
+    assert metrics.registry.background[0] == before + 1
+    db.close()
+
+def test_metrics_aggregated_across_worker_snapshots(tmp_path):
+    import os, subprocess, sys
+    import metrics
+    mine, other = metrics.Registry(), metrics.Registry()
+    for registry, n in ((mine, 2), (other, 3)):
+        for _ in range(n):
+            registry.begin()
+            registry.end("GET", "/x", 200, 0.02, 4, 0.001)
+    other.begin()   # 끝난 워커의 처리 중 요청은 세지 않음
+    metrics.Exporter(str(tmp_path), mine, gauges=lambda: {"audit_queue_depth": ("큐", 1)}).write()
+    done = subprocess.Popen([sys.executable, "-c", "pass"])
+    done.wait()   # 이미 끝난 워커의 pid
+    (tmp_path / f"{done.pid}.json").write_text(json.dumps({"pid": done.pid, "registry": other.snapshot(), "gauges": {"audit_queue_depth": ["큐", 7]}}))
+    (tmp_path / "999.json.tmp").write_text("{")   # 쓰는 중인 파일은 무시
+    merged, gauges = metrics.collect(str(tmp_path))
+    assert merged.requests[("GET", "/x", 200)] == 5 and merged.latency[("GET", "/x")].count == 5
+    assert merged.queries[("GET", "/x")].sum == 20 and merged.in_flight == 0
+    assert gauges == {"audit_queue_depth": ("큐", [({"pid": os.getpid()}, 1)])}
+    text_out = metrics.render(merged, extra=gauges)
+    assert 'http_requests_total{method="GET",route="/x",status="200"} 5' in text_out
+    assert f'audit_queue_depth{{pid="{os.getpid()}"}} 1' in text_out
+
+def test_sql_profiler_flags_repeated_queries_with_call_site(tmp_path):
+    import sql_profiler
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 6, n_weeks=3)
+    db.commit()
+    ids = [s.id for s in students]
+    with sql_profiler.capture(engine) as report:
+        for sid in ids: db.query(models.User).filter(models.User.id == sid).first()   # 일부러 N+1
+        db.query(models.User).filter(models.User.id.in_(ids)).all()
+    flagged = report.repeated(threshold=5)
+    assert len(flagged) == 1 and flagged[0]["count"] == 6
+    assert flagged[0]["sites"][0].startswith("test_queries.py:") and "test_sql_profiler" in flagged[0]["sites"][0]
+    assert sql_profiler.normalize("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'a''b' LIMIT 5") == "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?"
+    assert sql_profiler.normalize("SELECT 1 FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == "SELECT ? FROM t WHERE id IN (...)"
+    data = report.to_dict(engine, status=200, threshold=5)
+    assert data["statements"] == 7 and data["slowest"][0]["explain"]   # 느린 SELECT 는 실행 계획 포함
+    path = sql_profiler.write_report(dict(data, method="GET", path="/courses/1/students"), str(tmp_path))
+    assert json.load(open(path, encoding="utf-8"))["repeated"][0]["count"] == 6
+
+def test_hot_handlers_have_no_n_plus_one():
+    # 학생/세션 수에 비례해서 같은 쿼리를 반복하는 핸들러가 다시 생기지 않도록 (회귀 방지)
+    import main
+    import sql_profiler
+    import stats
+    engine, db = make_db()
+    course, sessions, students = seed_course(db, 8, n_weeks=4)
+    db.commit()
+    admin = auth.Principal(1, "admin@test.com", "ADMIN")
+    cases = {
+        "get_course_students": lambda: main.get_course_students(course.id, me=admin, db=db),
+        "get_session_attendances": lambda: reports.build_session_roster(db, sessions[0]),
+        "get_student_sessions": lambda: reports.build_student_sessions(db, course.id, students[0].id),
+        "get_course_report": lambda: main.build_report(db, course.id),
+        "get_departments": lambda: stats.build_overview(db),
+    }
+    for name, call in cases.items():
+        with sql_profiler.capture(engine) as report:
+            call()
+        assert report.repeated(threshold=3) == [], (name, report.repeated(threshold=3))
+    db.close()
+
+def test_seed_generates_realistic_semester_in_bulk(tmp_path):
+    import seed
+    from sqlalchemy import func
+    engine, db = make_db()
+    as_of = datetime(2025, 11, 1)
+    with count_queries(engine) as stmts:
+        result = seed.generate(db, departments=3, instructors=4, students=60, courses=8, seed=3, as_of=as_of,
+                               proof_files=5, upload_dir=str(tmp_path))
+    counts = result["counts"]
+    assert counts["students"] == 60 and counts["courses"] == 8 and counts["sessions"] == 8 * 17
+    assert counts["enrollments"] == 60 * seed.COURSES_PER_STUDENT
+    assert len(stmts) < 60   # 행마다가 아니라 묶음 INSERT
+    A, S = models.Attendance, models.ClassSession
+    assert db.query(A).count() == counts["attendances"] > 0
+    # 공휴일/미래 주차에는 출석 기록 없음
+    assert db.query(A).join(S, S.id == A.session_id).filter((S.is_holiday.is_(True)) | (S.session_date >= as_of)).count() == 0
+    dist = dict(db.query(A.status, func.count()).group_by(A.status).all())
+    assert 0.75 < dist[1] / counts["attendances"] < 0.92 and set(dist) <= {1, 2, 3, 4, 5}
+    proofs = {p for (p,) in db.query(A.proof_file).filter(A.proof_file.isnot(None)).distinct()}
+    assert proofs and all((tmp_path / p).exists() for p in proofs)
+    assert db.query(models.AuditLog).count() == counts["audit_logs"] > 0
+    # 같은 seed 면 같은 배정 (이메일 태그만 다름)
+    _, db2 = make_db()
+    again = seed.generate(db2, departments=3, instructors=4, students=60, courses=8, seed=3, as_of=as_of,
+                          proof_files=5, upload_dir=str(tmp_path))
+    assert again["counts"] == counts
+    db.close()
+    db2.close()